@@ -0,0 +1,194 @@
+from SecurityDepartment import SecurityDepartment
+from SheetyClient import SheetyClient
+from GuardStore import GuardStore
+from ScheduleRules import ScheduleRules
+from main import search_optimal, worker_context
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import json
+import os
+import time
+
+
+def solve_site(department: SecurityDepartment, runs):
+    """
+    Make the optimal arrangement of one department, in a worker process.
+    The worker solves a copy of the department, so the counters of the arrangement are returned with it and the
+    department of the batch posts them, see 'SecurityDepartment.post_arrangement'.
+    :param department: object from type SecurityDepartment
+    :param runs: The number of runs of the work arrangement
+    :return: The arrangement, the counters the guards carry into the next week, the amount of employees that are
+    short, the number of warnings and the solve time
+    """
+    start = time.perf_counter()
+    emp_shortness_amount, warnings_amount, state = search_optimal(department, runs, top_k=1)['top'][0]
+    department.restore_state(state)
+    return department.ready_arrangment()[0], department.next_counters(), emp_shortness_amount, warnings_amount, \
+        time.perf_counter() - start
+
+
+class BatchRunner:
+    """
+    Schedules many departments (sites) in one batch, from a manifest of the departments.
+    The departments are loaded and fetched concurrently in threads, solved over a pool of worker processes and
+    posted concurrently in threads, each department moves to the next step as soon as its former step is done.
+    A failure of one department is kept in its report and doesn't stop the other departments.
+    The manifest is a JSON file: {"departments": [site, ...]}, each site has:
+    name - the name of the site.
+    Roster - 'csv_file_path', or 'store' (path of a GuardStore database) with 'department_name' (default: name).
+    Availability - 'availability_file' (JSON in the format of the Sheety GET), or 'endpoint_get' with
+    'token_get_env' (the name of the environment variable of the token).
+    Output - 'output_file' (JSON of the rows of the arrangement sheet), or 'endpoint_put' with 'token_put_env'.
+    Optional - 'runs' (the runs of the work arrangement of the site), 'rules_file' (JSON rules of ScheduleRules),
+    'posted_state' (JSON file of the rows posted last, so only the changed rows are posted, see SheetyClient) and
+    'week' (the ISO week of the arrangement in the store, default: the current week).
+    """
+
+    def __init__(self, sites, runs=50, workers=None, io_workers=8, base_dir='.'):
+        """
+        :param sites: List of the sites of the manifest
+        :param runs: The number of runs of the work arrangement of a site without 'runs'
+        :param workers: The number of worker processes, None for the number of CPUs, 0 to solve in this process
+        :param io_workers: The number of threads of the loading and the posting
+        :param base_dir: The directory the relative paths of the manifest are relative to
+        """
+        self.sites = sites
+        self.runs = runs
+        self.workers = workers
+        self.io_workers = io_workers
+        self.base_dir = base_dir
+
+        # The report of each site by name, made in 'run'
+        self.reports = {}
+
+    @classmethod
+    def from_file(cls, manifest_path, **kwargs):
+        """ Make the runner from a manifest file, the relative paths are relative to the manifest."""
+        with open(manifest_path, encoding='utf-8') as file:
+            manifest = json.load(file)
+        return cls(manifest['departments'], base_dir=os.path.dirname(os.path.abspath(manifest_path)), **kwargs)
+
+    def path(self, site, key):
+        """ Returns the path of a file of the site, relative to the manifest, None if the site has no such file."""
+        if site.get(key) is None:
+            return None
+        return os.path.join(self.base_dir, site[key])
+
+    def make_client(self, site):
+        """ Returns the Sheety client of the site, the tokens are read from the environment variables."""
+        return SheetyClient(site.get('endpoint_get'), os.getenv(site.get('token_get_env', ''), ''),
+                            site.get('endpoint_put'), os.getenv(site.get('token_put_env', ''), ''),
+                            state_path=self.path(site, 'posted_state'))
+
+    def load_site(self, site):
+        """
+        Read the roster and the availability of a site and make its department.
+        :return: SecurityDepartment object
+        :raises ValueError: If the manifest of the site has no roster or no availability
+        """
+        client = self.make_client(site)
+        if self.path(site, 'availability_file') is not None:
+            with open(self.path(site, 'availability_file'), encoding='utf-8') as file:
+                data = json.load(file)
+        elif site.get('endpoint_get'):
+            data = client.fetch()
+        else:
+            raise ValueError("The site has no 'availability_file' and no 'endpoint_get'.")
+
+        if site.get('store') is None and site.get('csv_file_path') is None:
+            raise ValueError("The site has no 'csv_file_path' and no 'store'.")
+        store = GuardStore(self.path(site, 'store')) if site.get('store') is not None else None
+        rules = ScheduleRules.from_file(self.path(site, 'rules_file')) if site.get('rules_file') else None
+
+        return SecurityDepartment(data=data, csv_file_path=self.path(site, 'csv_file_path'), store=store,
+                                  department_name=site.get('department_name', site['name']), rules=rules,
+                                  client=client, week=site.get('week'))
+
+    def post_site(self, site, department, updates, counters):
+        """
+        Post the arrangement of a site to its sheet, or write it to its output file.
+        :param counters: The counters of the arrangement from 'solve_site', kept in the store of the site
+        :raises RuntimeError: If some rows of the sheet were not updated
+        """
+        if self.path(site, 'output_file') is not None:
+            with open(self.path(site, 'output_file'), 'w', encoding='utf-8') as file:
+                json.dump(department.arrangement_rows(updates), file, ensure_ascii=False, indent=2)
+        elif not department.post_arrangement(updates, counters):
+            raise RuntimeError("Some rows of the arrangement were not posted.")
+
+    def fail(self, name, step, error):
+        """ Keep the failure of a site in its report."""
+        self.reports[name].update({'status': 'failed', 'step': step, 'error': f"{type(error).__name__}: {error}"})
+
+    def run(self):
+        """
+        Load, solve and post all the sites.
+        :return: List of the reports of the sites, in the order of the manifest. Each report has the name, the
+        status ('ok' or 'failed'), the failed step and error, the time of each step in seconds, and the scores
+        """
+        self.reports = {site['name']: {'name': site['name'], 'status': 'ok', 'timings': {}} for site in self.sites}
+        if len(self.reports) != len(self.sites):
+            raise ValueError("The names of the sites in the manifest must be unique.")
+
+        def timed(step, name, func, *args):
+            start = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                self.reports[name]['timings'][step] = time.perf_counter() - start
+
+        # The worker processes are started while the threads load and post the sites
+        with ThreadPoolExecutor(max_workers=self.io_workers) as io_executor, \
+                ProcessPoolExecutor(max_workers=self.workers or os.cpu_count(),
+                                    mp_context=worker_context()) as solve_executor:
+            loads = {io_executor.submit(timed, 'load', site['name'], self.load_site, site): site
+                     for site in self.sites}
+
+            # Each site is solved as soon as it's loaded
+            solves = {}
+            for future in as_completed(loads):
+                site = loads[future]
+                try:
+                    department = future.result()
+                except Exception as e:
+                    self.fail(site['name'], 'load', e)
+                    continue
+                self.reports[site['name']]['ingest'] = {key: len(value)
+                                                        for key, value in department.ingest_report.items()}
+                runs = site.get('runs', self.runs)
+                if self.workers == 0:
+                    solves[io_executor.submit(solve_site, department, runs)] = (site, department)
+                else:
+                    solves[solve_executor.submit(solve_site, department, runs)] = (site, department)
+
+            # Each site is posted as soon as it's solved
+            posts = {}
+            for future in as_completed(solves):
+                site, department = solves[future]
+                try:
+                    updates, counters, emp_shortness_amount, warnings_amount, seconds = future.result()
+                except Exception as e:
+                    self.fail(site['name'], 'solve', e)
+                    continue
+                report = self.reports[site['name']]
+                report['timings']['solve'] = seconds
+                report.update({'shortness': emp_shortness_amount, 'warnings': warnings_amount})
+                posts[io_executor.submit(timed, 'post', site['name'], self.post_site, site, department,
+                                         updates, counters)] = site
+
+            for future in as_completed(posts):
+                try:
+                    future.result()
+                except Exception as e:
+                    self.fail(posts[future]['name'], 'post', e)
+
+        return [self.reports[site['name']] for site in self.sites]
+
+
+def print_reports(reports):
+    """ Print a line for each site of a batch."""
+    for report in reports:
+        timings = ' '.join(f"{step}={seconds:.2f}s" for step, seconds in report['timings'].items())
+        if report['status'] == 'ok':
+            print(f"{report['name']}: ok shortness={report['shortness']} warnings={report['warnings']} {timings}")
+        else:
+            print(f"{report['name']}: failed in {report['step']}: {report['error']} {timings}")
@@ -0,0 +1,155 @@
+class ExactSolver:
+    """
+    Makes the work arrangement with the CP-SAT solver of Google OR-Tools, as an alternative to the randomized
+    greedy 'do_work_arrangement' of SecurityDepartment.
+    The model has the same rules as the greedy, from the compiled rules of the department (ScheduleRules):
+    1. Up to the staffing of each shift (5 employees in a shift and 4 in the shabat morning by default).
+    2. A rest of at least one shift, no two shifts in a day and no night before a morning.
+    3. The maximum of night shifts, shabat shifts and shifts in a week, and the optimal number of shifts of each
+       employee.
+    4. No sunday morning after a shabat night.
+    The solver minimizes the same scores of 'ready_arrangment', the shortness of employees (with the 12-hour
+    replacements of the noon shift) and the number of warnings, weighted by SHORTNESS_WEIGHT and WARNING_WEIGHT
+    of the department.
+    OR-Tools is needed only for this solver: pip install ortools
+    """
+
+    def __init__(self, time_limit=10.0, num_workers=8):
+        """
+        :param time_limit: The maximum time of the solver in seconds
+        :param num_workers: The number of search workers of the solver
+        """
+        self.time_limit = time_limit
+        self.num_workers = num_workers
+
+        # The result of the last solve, the status name, the objective and the best bound of the objective
+        self.status = None
+        self.objective = None
+        self.bound = None
+
+    def get_gap(self):
+        """ Returns the relative gap between the objective and the bound of the last solve, 0 if it's optimal."""
+        if self.objective is None:
+            return None
+        if self.objective == 0:
+            return 0.0
+        return (self.objective - self.bound) / self.objective
+
+    def solve(self, department):
+        """
+        Make the work arrangement of the department.
+        The arrangement is stored in the department like after 'do_work_arrangement'.
+        :param department: object from type SecurityDepartment
+        :return: Updates, employee_shortness and warnings_amount, the same as 'ready_arrangment'
+        """
+        try:
+            from ortools.sat.python import cp_model
+        except ImportError:
+            raise ImportError("The exact solver needs OR-Tools, install it with 'pip install ortools'.")
+
+        department.reset_data_structure()
+        model = cp_model.CpModel()
+        rules = department.rules
+
+        # Variable for each employee that marks a shift and is allowed to work in it
+        works = {}
+        for day in range(7):
+            for shift in range(3):
+                bit = 1 << (day * 3 + shift)
+                for employee in department.dict_of_shifts[day][shift]:
+                    if rules.shabat_mask & bit and employee.get_shabat_counter() >= department.MAX_SHABAT_SHIFTS:
+                        continue
+                    if rules.shabat_night_mask & bit and employee.is_work_shabat_night():
+                        continue
+                    works[employee, day, shift] = model.NewBoolVar(f'{employee.get_id_number()}_{day}_{shift}')
+
+        # The rules of each employee
+        for employee in department.guards_objects_list:
+            week = [works.get((employee,) + divmod(slot, 3)) for slot in range(21)]
+
+            # Need a rest of at least one shift, each pair of conflicting shifts can't be both worked
+            for slot in range(21):
+                for other in range(slot + 1, 21):
+                    if rules.conflicts[slot] >> other & 1 and week[slot] is not None and week[other] is not None:
+                        model.Add(week[slot] + week[other] <= 1)
+
+            nights = [week[slot] for slot in range(21) if rules.nights_mask >> slot & 1 and week[slot] is not None]
+            model.Add(sum(nights) <= department.MAX_NIGHTS_SHIFTS - employee.get_nights_counter())
+
+            all_shifts = [var for var in week if var is not None]
+            model.Add(sum(all_shifts) <= min(employee.get_num_of_optimal_shifts(), department.MAX_SHIFTS))
+
+        # The scores of each shift
+        shortness = []
+        warnings = []
+        counts = {}
+        for day in range(7):
+            for shift in range(3):
+                employees = [(employee, var) for (employee, d, s), var in works.items() if d == day and s == shift]
+                count = sum(var for _, var in employees)
+                counts[day, shift] = count
+
+                # The number of employees the shift needs, from the staffing rules
+                slot = day * 3 + shift
+                required = rules.required[slot]
+                model.Add(count <= required)
+
+                # The warning of the shift is on if one of the staffing rules of 'shift_warning' is not met
+                warning = model.NewBoolVar(f'warning_{day}_{shift}')
+                officers = sum(var for employee, var in employees if employee.is_officer())
+                drivers = sum(var for employee, var in employees
+                              if employee.is_officer() or employee.is_allowed_to_drive())
+                heights = sum(var for employee, var in employees
+                              if employee.is_officer() or employee.is_allowed_to_work_on_height())
+                model.Add(officers + rules.min_officers[slot] * warning >= rules.min_officers[slot])
+                model.Add(count + required * warning >= required)
+                model.Add(drivers + rules.min_drivers[slot] * warning >= rules.min_drivers[slot])
+                model.Add(heights + rules.min_heights[slot] * warning >= rules.min_heights[slot])
+                warnings.append(warning)
+
+                if shift != 1:
+                    shortness.append(required - count)
+
+        # The noon shortness is reduced by the employees of the morning and the night that do 12 hours,
+        # the same as 'check_noon_shortage'
+        for day in range(7):
+            noon_required = rules.required[day * 3 + 1]
+            missing = noon_required - counts[day, 1]
+            replacements = []
+            for shift in (0, 2):
+                replacement = model.NewIntVar(0, noon_required, f'replacement_{day}_{shift}')
+                model.Add(replacement <= missing)
+                model.Add(replacement <= sum(var for (employee, d, s), var in works.items()
+                                             if d == day and s == shift and
+                                             employee in department.dict_of_shifts[day][1]))
+                replacements.append(replacement)
+            cover = model.NewIntVar(0, noon_required, f'cover_{day}')
+            model.Add(cover <= replacements[0])
+            model.Add(cover <= replacements[1])
+            shortness.append(missing - cover)
+
+        model.Minimize(department.SHORTNESS_WEIGHT * sum(shortness) + department.WARNING_WEIGHT * sum(warnings))
+
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = self.time_limit
+        solver.parameters.num_workers = self.num_workers
+        status = solver.Solve(model)
+
+        self.status = solver.StatusName(status)
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            self.objective = self.bound = None
+            raise RuntimeError(f"The solver didn't find an arrangement: {self.status}")
+        self.objective = solver.ObjectiveValue()
+        self.bound = solver.BestObjectiveBound()
+
+        # Store the arrangement in the department
+        for (employee, day, shift), var in works.items():
+            if solver.BooleanValue(var):
+                employee.add_shift(day, shift)
+                department.final_arrangement[day][shift].add(employee)
+
+        for day in range(7):
+            for shift in range(3):
+                department.warning_output[day][shift].add(department.shift_warning(day, shift))
+
+        return department.ready_arrangment()
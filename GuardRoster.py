@@ -0,0 +1,60 @@
+from array import array
+
+
+class GuardRoster:
+    """
+    The attributes of all the guards of a department kept as columns (struct of arrays), one contiguous array for
+    each attribute, indexed by the guard number: the order the guard was added, a stable integer from 0.
+    The flags and the small counters take one byte per guard and the shifts take one 4-byte integer per guard,
+    instead of a dictionary of attributes and a Shift object for each guard.
+    Each SecurityGuard is a view of one guard number, 'guards' keeps the single view of each number.
+    """
+
+    __slots__ = ('names', 'ids', 'is_officer', 'has_height', 'can_drive', 'work_shabat_night', 'shabat_counter',
+                 'nights_counter', 'optimal', 'shifts', 'guards')
+
+    def __init__(self):
+        self.names = []
+        self.ids = array('i')
+        # Flags, 1 for True and 0 for False
+        self.is_officer = bytearray()
+        self.has_height = bytearray()
+        self.can_drive = bytearray()
+        self.work_shabat_night = bytearray()
+        # Counters and the number of shifts each guard wants to work
+        self.shabat_counter = bytearray()
+        self.nights_counter = bytearray()
+        self.optimal = bytearray()
+        # The shifts of each guard in the week as a 21-bit integer, bit (day * 3 + shift) for each shift
+        self.shifts = array('i')
+        # The SecurityGuard view of each guard number
+        self.guards = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, guard, name, id_number, is_officer, has_height_permission, can_drive, shabat_counter,
+            nights_counter, work_shabat_night):
+        """
+        Add a guard to the roster, the values must be already validated.
+        :param guard: The SecurityGuard view of the new guard
+        :return: The guard number
+        """
+        self.names.append(name)
+        self.ids.append(id_number)
+        self.is_officer.append(is_officer)
+        self.has_height.append(has_height_permission)
+        self.can_drive.append(can_drive)
+        self.work_shabat_night.append(work_shabat_night)
+        self.shabat_counter.append(shabat_counter)
+        self.nights_counter.append(nights_counter)
+        self.optimal.append(0)
+        self.shifts.append(0)
+        self.guards.append(guard)
+        return len(self.guards) - 1
+
+    def nbytes(self):
+        """ Returns the number of bytes of the buffers of the arrays, without the names and the views."""
+        return sum(column.itemsize * len(column) if isinstance(column, array) else len(column)
+                   for column in (self.ids, self.is_officer, self.has_height, self.can_drive, self.work_shabat_night,
+                                  self.shabat_counter, self.nights_counter, self.optimal, self.shifts))
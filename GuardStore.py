@@ -0,0 +1,162 @@
+import csv
+import datetime
+import sqlite3
+import threading
+
+# The columns of a guard, in the order of 'employee_data.csv'
+GUARD_COLUMNS = ('eID', 'E_Name', 'Is_Officer', 'Has_Height', 'Can_Drive', 'Shabat_Night', 'Shabat_Count',
+                 'Nights_Count')
+
+# The rolling counters of a guard, updated after each week
+COUNTER_COLUMNS = ('Shabat_Count', 'Nights_Count', 'Shabat_Night')
+
+
+def current_week():
+    """ Returns the ISO week of today, like '2024-W07'."""
+    year, week, _ = datetime.date.today().isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+class GuardStore:
+    """
+    SQLite store of the guards of several departments, instead of one 'employee_data.csv' per department.
+    The guards are indexed by department and eID and by department and name.
+    The rolling counters (Shabat_Count, Nights_Count and Shabat_Night) are kept for each week in a history table.
+    The counters of the guards table are the counters before the history, they are not changed after a week: the
+    counters a guard carries into a week are read from the latest week before it in the history, so posting the
+    arrangement of a week again (or running it again) doesn't change the counters the week starts from.
+    The store can be used from several threads, like the posting threads of BatchRunner and the request threads
+    of SchedulerService: they share one connection and each operation holds the lock of the store.
+    """
+
+    def __init__(self, db_path='guards.db'):
+        """
+        :param db_path: The path of the SQLite database file, ':memory:' for a database in memory
+        """
+        self.db_path = db_path
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS guards (
+                department TEXT NOT NULL,
+                eID INTEGER NOT NULL,
+                E_Name TEXT NOT NULL,
+                Is_Officer INTEGER NOT NULL,
+                Has_Height INTEGER NOT NULL,
+                Can_Drive INTEGER NOT NULL,
+                Shabat_Night INTEGER NOT NULL DEFAULT 0,
+                Shabat_Count INTEGER NOT NULL DEFAULT 0,
+                Nights_Count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (department, eID)
+            );
+            CREATE INDEX IF NOT EXISTS guards_by_name ON guards (department, E_Name);
+            CREATE TABLE IF NOT EXISTS counters_history (
+                department TEXT NOT NULL,
+                week TEXT NOT NULL,
+                eID INTEGER NOT NULL,
+                Shabat_Count INTEGER NOT NULL,
+                Nights_Count INTEGER NOT NULL,
+                Shabat_Night INTEGER NOT NULL,
+                PRIMARY KEY (department, week, eID)
+            );
+        """)
+
+    def __getstate__(self):
+        """ The connection is not copied to other processes, each process connects to the database file again."""
+        return {'db_path': self.db_path}
+
+    def __setstate__(self, state):
+        self.__init__(state['db_path'])
+
+    def close(self):
+        """ Close the connection of the database."""
+        with self.lock:
+            self.connection.close()
+
+    def load_guards(self, department, week=None):
+        """
+        Load the guards of a department, only the columns the work arrangement needs.
+        :param department: The name of the department
+        :param week: The week the counters are carried into, the counters of the latest week before it in the
+        history, or of the guards table if there is no such week. None for the current week
+        :return: List of dictionaries with the columns of 'employee_data.csv', ordered by eID
+        """
+        week = week or current_week()
+        # The counters of the history override the counters of the guards table
+        columns = [f"COALESCE(h.{col_name}, g.{col_name})" if col_name in COUNTER_COLUMNS else f"g.{col_name}"
+                   for col_name in GUARD_COLUMNS]
+        with self.lock:
+            cursor = self.connection.execute(
+                f"SELECT {', '.join(columns)} FROM guards g LEFT JOIN counters_history h "
+                f"ON h.department = g.department AND h.eID = g.eID AND h.week = ("
+                f"SELECT MAX(week) FROM counters_history "
+                f"WHERE department = g.department AND eID = g.eID AND week < ?) "
+                f"WHERE g.department = ? ORDER BY g.eID", (week, department))
+            return [dict(zip(GUARD_COLUMNS, row)) for row in cursor]
+
+    def find_by_name(self, department, name):
+        """ Returns the row of the guard with the given name, None if there is no such guard."""
+        with self.lock:
+            row = self.connection.execute(f"SELECT {', '.join(GUARD_COLUMNS)} FROM guards "
+                                          f"WHERE department = ? AND E_Name = ?", (department, name)).fetchone()
+        return None if row is None else dict(zip(GUARD_COLUMNS, row))
+
+    def upsert_guards(self, department, rows):
+        """
+        Add or replace guards of a department in one transaction.
+        :param department: The name of the department
+        :param rows: Iterable of dictionaries with the columns of 'employee_data.csv'
+        """
+        with self.lock, self.connection:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO guards (department, {', '.join(GUARD_COLUMNS)}) "
+                f"VALUES (?, {', '.join('?' * len(GUARD_COLUMNS))})",
+                ((department, int(row['eID']), str(row['E_Name']).strip(),
+                  *(int(row[col_name]) for col_name in GUARD_COLUMNS[2:])) for row in rows))
+
+    def update_counters(self, department, counters, week=None):
+        """
+        Keep the rolling counters of the guards after a week in the history, in one transaction.
+        The counters of the week replace the counters written for it before, the next week starts from them.
+        :param department: The name of the department
+        :param counters: Dictionary of eID and (Shabat_Count, Nights_Count, Shabat_Night)
+        :param week: The week of the counters, None for the current week
+        """
+        week = week or current_week()
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO counters_history "
+                "(department, week, eID, Shabat_Count, Nights_Count, Shabat_Night) VALUES (?, ?, ?, ?, ?, ?)",
+                ((department, week, e_id, int(shabat_count), int(nights_count), int(shabat_night))
+                 for e_id, (shabat_count, nights_count, shabat_night) in counters.items()))
+
+    def counters_history(self, department, e_id):
+        """
+        Returns the counters of a guard in each week.
+        :return: List of (week, Shabat_Count, Nights_Count, Shabat_Night), the oldest week first
+        """
+        with self.lock:
+            return self.connection.execute(
+                "SELECT week, Shabat_Count, Nights_Count, Shabat_Night FROM counters_history "
+                "WHERE department = ? AND eID = ? ORDER BY week", (department, e_id)).fetchall()
+
+    def import_csv(self, department, csv_file_path):
+        """ Add or replace the guards of a department from a CSV file in the format of 'employee_data.csv'."""
+        with open(csv_file_path, newline='', encoding='utf-8') as file:
+            rows = list(csv.DictReader(file))
+        # Booleans may be written as True / False by pandas
+        for row in rows:
+            for col_name in GUARD_COLUMNS[2:]:
+                value = row[col_name].strip()
+                row[col_name] = {'true': 1, 'false': 0}.get(value.lower(), value)
+        self.upsert_guards(department, rows)
+
+    def export_csv(self, department, csv_file_path):
+        """
+        Write the guards of a department into a CSV file in the format of 'employee_data.csv', with the counters
+        they carry into the current week.
+        """
+        with open(csv_file_path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=GUARD_COLUMNS)
+            writer.writeheader()
+            writer.writerows(self.load_guards(department))
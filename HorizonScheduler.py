@@ -0,0 +1,161 @@
+import heapq
+
+
+class WeekPlan:
+    """
+    The arrangement of one week in a schedule of several weeks: the snapshot of the week, its scores and the counters
+    the guards carry into the next week.
+    """
+
+    __slots__ = ('state', 'emp_shortness_amount', 'warnings_amount', 'counters')
+
+    def __init__(self, state, emp_shortness_amount, warnings_amount, counters):
+        """
+        :param state: ScheduleState of the week
+        :param emp_shortness_amount: The number of employees that are short in the week
+        :param warnings_amount: The number of warnings in the week
+        :param counters: Dictionary of eID and (Shabat_Count, Nights_Count, Shabat_Night) after the week,
+        in the format of GuardStore.update_counters
+        """
+        self.state = state
+        self.emp_shortness_amount = emp_shortness_amount
+        self.warnings_amount = warnings_amount
+        self.counters = counters
+
+    def carry(self):
+        """ Returns the counters the guards carry into the next week, eID and (Shabat_Count, Shabat_Night)."""
+        return {e_id: (shabat_counter, shabat_night) for e_id, (shabat_counter, _, shabat_night)
+                in self.counters.items()}
+
+
+class HorizonScheduler:
+    """
+    Plans the work arrangements of K weeks in one search.
+    Each week is a SecurityDepartment with the shifts the guards marked for that week, and the weeks are linked
+    by the counters the guards carry over the boundary: the shabat counter (MAX_SHABAT_SHIFTS in a row) and the
+    shabat night (no sunday morning after it).
+    The search is a beam over the weeks: the 'beam_width' best partial schedules are extended by runs of the next
+    week, and the best extensions by total penalty are kept. Two partial schedules that end with the same counters
+    have the same future, so only the better one is kept.
+    The work is beam_width * runs_per_week runs in each week, split between the partial schedules of the beam (the
+    better ones get the remainder), so the first week, with a single partial schedule, gets all the runs too.
+    It's linear in the number of weeks, and the partial schedules are linked lists of weeks so extending one
+    doesn't copy it.
+    The default beam width is 1, the weeks are planned one by one with all the runs of each week. A wider beam
+    splits the runs between its schedules, it's worse on the rosters of bench_horizon, and can help only when the
+    carried counters decide the penalty, like a tight shabat rotation.
+    """
+
+    def __init__(self, weeks, beam_width=1, runs_per_week=100, base_seed=0):
+        """
+        :param weeks: List of SecurityDepartment objects, one for each week of the horizon, in order
+        :param beam_width: The number of partial schedules kept after each week, 1 to plan the weeks one by one
+        :param runs_per_week: The number of runs of the work arrangement for each partial schedule of a full beam,
+        each week has beam_width * runs_per_week runs
+        :param base_seed: The seed of the first run, the runs are numbered from it
+        """
+        if not weeks:
+            raise ValueError("The horizon needs at least one week.")
+        self.weeks = list(weeks)
+        self.beam_width = beam_width
+        self.runs_per_week = runs_per_week
+        self.base_seed = base_seed
+        # The counters the guards carry into the first week, before the runs change the guards
+        self.initial_carry = self.weeks[0].current_counters()
+
+    def get_horizon(self):
+        """ Returns the number of weeks of the horizon."""
+        return len(self.weeks)
+
+    def run_week(self, week, carry, seed):
+        """
+        Run the work arrangement of one week with the counters of the former week.
+        :param week: The index of the week
+        :param carry: Dictionary of eID and (Shabat_Count, Shabat_Night) from the former week
+        :param seed: The seed of the run
+        :return: The penalty of the run and its WeekPlan
+        """
+        department = self.weeks[week]
+        department.set_counters(carry)
+        department.reset_data_structure()
+        department.count_shifts()
+        department.set_seed(seed)
+        emp_shortness_amount, warnings_amount, _ = department.do_work_arrangement(render=False)
+        penalty = department.SHORTNESS_WEIGHT * emp_shortness_amount + department.WARNING_WEIGHT * warnings_amount
+        return penalty, WeekPlan(department.capture_state(), emp_shortness_amount, warnings_amount,
+                                 department.next_counters())
+
+    def plan(self, fixed=(), carry=None):
+        """
+        Search the schedule of all the weeks of the horizon.
+        :param fixed: WeekPlan objects of the first weeks that are kept as they are
+        :param carry: The counters before the first week, eID and (Shabat_Count, Shabat_Night). None for the
+        counters of the guards of the first week when the scheduler was made
+        :return: List of WeekPlan objects, one for each week of the horizon
+        """
+        if len(fixed) > len(self.weeks):
+            raise ValueError("More fixed weeks than weeks in the horizon.")
+        if fixed:
+            carry = fixed[-1].carry()
+        elif carry is None:
+            carry = self.initial_carry
+
+        # The fixed weeks as a linked list of (week plan, former weeks)
+        chain = None
+        for week_plan in fixed:
+            chain = (week_plan, chain)
+
+        # The beam: (total penalty, seed of the last run, chain of the weeks, counters carried into the next week)
+        beam = [(0, 0, chain, carry)]
+        seed = self.base_seed
+        budget = self.beam_width * self.runs_per_week
+        for week in range(len(fixed), len(self.weeks)):
+            # The best extensions by total penalty, one for each carried counters
+            extensions = {}
+            for idx, (total, _, chain, carry) in enumerate(beam):
+                for _ in range(budget // len(beam) + (idx < budget % len(beam))):
+                    penalty, week_plan = self.run_week(week, carry, seed)
+                    next_carry = week_plan.carry()
+                    key = tuple(sorted(next_carry.items()))
+                    if key not in extensions or total + penalty < extensions[key][0]:
+                        extensions[key] = (total + penalty, seed, (week_plan, chain), next_carry)
+                    seed += 1
+            beam = heapq.nsmallest(self.beam_width, extensions.values(), key=lambda x: (x[0], x[1]))
+
+        # Unroll the linked list of the best schedule
+        plans = []
+        chain = beam[0][2]
+        while chain is not None:
+            week_plan, chain = chain
+            plans.append(week_plan)
+        return plans[::-1]
+
+    def replan(self, plans, fixed_weeks=1, weeks=None):
+        """
+        Rolling plan: keep the first weeks of a schedule and search the rest of the horizon again,
+        for example after the guards changed the shifts they marked in the next weeks.
+        :param plans: The former schedule, from 'plan'
+        :param fixed_weeks: The number of first weeks that are kept
+        :param weeks: New SecurityDepartment objects of the horizon, None to keep the weeks of the scheduler.
+        The fixed weeks keep their departments, since their snapshots belong to them
+        :return: List of WeekPlan objects, one for each week of the horizon
+        """
+        if weeks is not None:
+            self.weeks = self.weeks[:fixed_weeks] + list(weeks)[fixed_weeks:]
+        return self.plan(plans[:fixed_weeks])
+
+    def apply(self, plans, week):
+        """
+        Restore the arrangement of one week of a schedule into its department, to be prepared and posted.
+        :param plans: The schedule, from 'plan'
+        :param week: The index of the week
+        :return: The department of the week, with the counters and the arrangement of the week
+        """
+        department = self.weeks[week]
+        department.set_counters(plans[week - 1].carry() if week else self.initial_carry)
+        department.restore_state(plans[week].state)
+        return department
+
+    def get_scores(self, plans):
+        """ Returns the employee shortness and the warnings amount of each week of a schedule."""
+        return [(week_plan.emp_shortness_amount, week_plan.warnings_amount) for week_plan in plans]
@@ -0,0 +1,129 @@
+from collections import Counter
+from contextlib import nullcontext
+import cProfile
+import json
+import time
+
+# The rules of 'filter_employees', in the order they are checked
+REJECTION_RULES = ('shabat_cap', 'shabat_night', 'night_cap', 'rest', 'target_reached', 'max_shifts')
+
+
+class Instrumentation:
+    """
+    Opt-in measurements of a run of the work arrangement:
+    timings - the total time and the number of calls of each phase: fetch, parse, solve (the whole search), score
+    (the scoring of each restart), render (preparing the winner to be posted) and post.
+    rejections - for each rule of 'filter_employees', the number of candidates it rejected in each of the 21 shifts
+    of the greedy, to see why shifts end up short. Both engines of the greedy count them, the batch mode and the
+    exact solver don't, 'rejection_runs' is the number of greedy runs that were counted.
+    scores - histogram of the penalties of the restarts.
+    And a cProfile of the whole run, when 'profile_path' is given.
+    A disabled instrumentation measures nothing, its phases are empty contexts and the greedy doesn't check the
+    rejected candidates again, so it costs almost nothing.
+    """
+
+    def __init__(self, enabled=True, profile_path=None):
+        """
+        :param enabled: False for an instrumentation that measures nothing
+        :param profile_path: The path of the cProfile stats file, None for no profile
+        """
+        self.enabled = enabled
+        self.profile_path = profile_path if enabled else None
+        self.timings = {}
+        self.rejections = {rule: [0] * 21 for rule in REJECTION_RULES}
+        # The number of greedy runs whose rejections were counted, 0 if the rejection tables are empty because
+        # the solve didn't count them
+        self.rejection_runs = 0
+        self.scores = Counter()
+        self.__profile = None
+
+    def __getstate__(self):
+        """ The profiler is not copied to worker processes, their measurements stay in the workers."""
+        state = self.__dict__.copy()
+        state['_Instrumentation__profile'] = None
+        return state
+
+    def phase(self, name):
+        """
+        Time a phase, use as a context manager: with instrumentation.phase('solve'): ...
+        The time of a phase that runs several times is summed.
+        """
+        if not self.enabled:
+            return nullcontext()
+        return _Phase(self, name)
+
+    def add_time(self, name, seconds):
+        """ Add the time of one call of a phase."""
+        timing = self.timings.setdefault(name, {'seconds': 0.0, 'calls': 0})
+        timing['seconds'] += seconds
+        timing['calls'] += 1
+
+    def reject(self, rule, day, shift, count=1):
+        """ Count candidates of the shift that were rejected by a rule of 'filter_employees'."""
+        self.rejections[rule][day * 3 + shift] += count
+
+    def record_score(self, penalty):
+        """ Count the penalty of a restart in the histogram of the scores."""
+        if self.enabled:
+            self.scores[penalty] += 1
+
+    def start_profile(self):
+        """ Start the cProfile of the run, if there is a profile path."""
+        if self.profile_path is not None and self.__profile is None:
+            self.__profile = cProfile.Profile()
+            self.__profile.enable()
+
+    def stop_profile(self):
+        """ Stop the cProfile of the run and write its stats to the profile path."""
+        if self.__profile is not None:
+            self.__profile.disable()
+            self.__profile.dump_stats(self.profile_path)
+            self.__profile = None
+
+    def report(self):
+        """
+        :return: Dictionary of the measurements: 'timings', 'rejections' (the 21 shifts of each rule and the total
+        of each rule), 'rejections_collected' and 'rejection_runs' (False and 0 when no greedy run counted the
+        rejections) and 'scores' (the histogram of the penalties, its minimum, mean and maximum)
+        """
+        runs = sum(self.scores.values())
+        return {
+            'timings': self.timings,
+            'rejections': {rule: {'total': sum(slots), 'shifts': slots} for rule, slots in self.rejections.items()},
+            'rejections_collected': self.rejection_runs > 0,
+            'rejection_runs': self.rejection_runs,
+            'scores': {
+                'runs': runs,
+                'min': min(self.scores) if runs else None,
+                'mean': sum(penalty * count for penalty, count in self.scores.items()) / runs if runs else None,
+                'max': max(self.scores) if runs else None,
+                'histogram': {str(penalty): count for penalty, count in sorted(self.scores.items())},
+            },
+        }
+
+    def save(self, path, **extra):
+        """
+        Write the report to a JSON file.
+        :param path: The path of the JSON file
+        :param extra: More entries of the report, their values must be JSON
+        """
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({**self.report(), **extra}, file, ensure_ascii=False, indent=2)
+
+
+class _Phase:
+    """ Context manager that adds its time to a phase of an instrumentation."""
+
+    __slots__ = ('instrumentation', 'name', 'start')
+
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.instrumentation.add_time(self.name, time.perf_counter() - self.start)
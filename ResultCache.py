@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import time
+
+# Changes when the format of the entries or the meaning of the key changes, so old entries are not used
+CACHE_VERSION = 2
+
+
+class ResultCache:
+    """
+    On-disk cache of the optimal arrangements, keyed by a hash of the inputs of the work arrangement.
+    The same roster, availability, rules and search parameters give the same key, so a run that sees unchanged
+    inputs takes the arrangement from the cache instead of solving, and doesn't post it again if it was posted.
+    Each entry is a JSON file '<key>.json' in the directory. The entries older than 'max_age' are removed, and
+    the least recently used entries are removed while there are more than 'max_entries' entries or 'max_bytes' bytes.
+    """
+
+    def __init__(self, directory='.schedule_cache', max_entries=64, max_bytes=16 * 2 ** 20, max_age=7 * 24 * 3600):
+        """
+        :param directory: The directory of the cache, made if it doesn't exist
+        :param max_entries: The maximum number of entries, None for no limit
+        :param max_bytes: The maximum total size of the entries in bytes, None for no limit
+        :param max_age: The maximum age of an entry in seconds, None for no limit
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(department, params=None):
+        """
+        Make the key of the inputs of a department: a SHA-256 of the canonical JSON of the roster, the
+        availability, the rules and the search parameters.
+        :param department: SecurityDepartment object
+        :param params: Dictionary of the parameters of the search (runs, seed, ...), its values must be JSON
+        :return: The key, a string of hex digits
+        """
+        roster = [[employee.get_id_number(), employee.get_name(), employee.is_officer(),
+                   employee.is_allowed_to_drive(), employee.is_allowed_to_work_on_height(),
+                   employee.is_work_shabat_night(), employee.get_shabat_counter(), employee.get_nights_counter()]
+                  for employee in sorted(department.guards_objects_list, key=lambda x: x.get_id_number())]
+        constants = {name: getattr(department, name) for name in
+                     ('MAX_SHIFTS', 'MAX_NIGHTS_SHIFTS', 'MAX_SHABAT_SHIFTS', 'MAX_EMPLOYEE_PER_SHIFT',
+                      'SHORTNESS_WEIGHT', 'WARNING_WEIGHT', 'LOCAL_SEARCH_ITERATIONS', 'ENGINE', 'SLOT_ORDER')}
+        inputs = {'version': CACHE_VERSION, 'roster': roster, 'availability': department.data,
+                  'constants': constants, 'rules': department.rules.config, 'params': params or {}}
+        # Sorted keys and no spaces, so the same inputs always give the same bytes
+        canonical = json.dumps(inputs, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        """ Returns the path of the entry of a key."""
+        return os.path.join(self.directory, key + '.json')
+
+    def get(self, key):
+        """
+        Read the entry of a key.
+        :return: Dictionary with 'updates' (the arrangement, in the format of 'ready_arrangment'), 'shortness',
+        'warnings', 'created' and 'posted' (True if the arrangement was posted). None if there is no entry
+        or it expired
+        """
+        try:
+            with open(self.path(key), encoding='utf-8') as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if self.max_age is not None and time.time() - entry['created'] > self.max_age:
+            self.remove(key)
+            return None
+
+        # Touch the entry, the least recently used entries are removed first
+        os.utime(self.path(key))
+        entry['updates'] = {(shift, day): text for shift, day, text in entry['updates']}
+        return entry
+
+    def put(self, key, updates, emp_shortness_amount, warnings_amount):
+        """
+        Keep the optimal arrangement of a key, then remove the expired and the least recently used entries.
+        :param key: The key of the inputs
+        :param updates: The arrangement, in the format of 'ready_arrangment'
+        :param emp_shortness_amount: The amount of employees that are short in the arrangement
+        :param warnings_amount: The number of warnings of the arrangement
+        """
+        entry = {'updates': [[shift, day, text] for (shift, day), text in sorted(updates.items())],
+                 'shortness': emp_shortness_amount, 'warnings': warnings_amount,
+                 'created': time.time(), 'posted': False}
+        self.write(key, entry)
+        self.evict()
+
+    def mark_posted(self, key):
+        """ Mark the arrangement of a key as posted, so a run with the same inputs doesn't post it again."""
+        try:
+            with open(self.path(key), encoding='utf-8') as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return
+        entry['posted'] = True
+        self.write(key, entry)
+
+    def write(self, key, entry):
+        """ Write an entry through a temporary file, so a crash doesn't leave a broken entry."""
+        temp_path = self.path(key) + f'.{os.getpid()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(entry, file, ensure_ascii=False)
+        os.replace(temp_path, self.path(key))
+
+    def remove(self, key):
+        """ Remove the entry of a key, if there is one."""
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        """
+        Remove the expired entries, then the least recently used entries until the cache is within its limits.
+        :return: The number of removed entries
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, name[:-len('.json')], stat.st_size))
+        entries.sort()
+
+        removed = 0
+        now = time.time()
+        total_bytes = sum(size for _, _, size in entries)
+        for used, key, size in entries:
+            # The time of the last use is at least the time the entry was made
+            expired = self.max_age is not None and now - used > self.max_age
+            too_many = self.max_entries is not None and len(entries) - removed > self.max_entries
+            too_big = self.max_bytes is not None and total_bytes > self.max_bytes
+            if not (expired or too_many or too_big):
+                break
+            self.remove(key)
+            removed += 1
+            total_bytes -= size
+        return removed
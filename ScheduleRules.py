@@ -0,0 +1,124 @@
+import json
+
+# The rules of the work arrangement of the security department.
+# The shifts of the week are slots, slot (day * 3 + shift), day 0 is sunday and shift 0 is the morning.
+DEFAULT_RULES = {
+    # The shifts an employee can't work in together with each shift, as (day offset, shift).
+    # Need a rest of at least one shift: one shift in a day and no night before a morning.
+    'rest': {
+        0: [(0, 1), (0, 2), (-1, 2)],
+        1: [(0, 0), (0, 2)],
+        2: [(0, 0), (0, 1), (1, 0)],
+    },
+    # The shifts that count as working on shabat, limited by MAX_SHABAT_SHIFTS
+    'shabat_slots': [(5, 1), (5, 2), (6, 0), (6, 1)],
+    # The shabat night, an employee that works in it can't work in the shifts of 'shabat_night_blocks' of the next
+    # week, the sunday morning
+    'shabat_night_slots': [(6, 2)],
+    'shabat_night_blocks': [(0, 0)],
+    # The shifts that count as nights, limited by MAX_NIGHTS_SHIFTS
+    'night_shifts': [2],
+    # The staffing of each shift: the number of employees, and the minimum of officers, drivers and employees with
+    # height permission (officers have drive permission and height permission)
+    'staffing': {'employees': 5, 'officers': 1, 'drivers': 2, 'heights': 2},
+    # The shifts with a different staffing, shabat morning need four employees
+    'staffing_overrides': [{'slot': (6, 0), 'employees': 4}],
+}
+
+
+def slots_mask(slots):
+    """
+    Returns the bitmask of a list of (day, shift), bit (day * 3 + shift) for each shift.
+    :raises ValueError: If one of the shifts is not in the week
+    """
+    mask = 0
+    for day, shift in slots:
+        if not (0 <= day < 7 and 0 <= shift < 3):
+            raise ValueError(f"The rules have a shift that is not in the week: ({day}, {shift})")
+        mask |= 1 << (day * 3 + shift)
+    return mask
+
+
+class ScheduleRules:
+    """
+    The rules of 'filter_employees' and 'assign_shift' compiled once from a config into tables of the 21 slots,
+    so each check is a single bitwise operation with the shifts mask of the employee:
+    conflicts - for each slot the bitmask of the slots that block it by the rest rules.
+    shabat_mask, shabat_night_mask, nights_mask - the bitmasks of the shabat shifts, of the shifts blocked after a
+    shabat night and of the night shifts.
+    shabat_night_work_mask - the bitmask of the shabat night, that blocks 'shabat_night_mask' in the next week.
+    required, min_officers, min_drivers, min_heights - the staffing of each slot.
+    A site with other shift patterns passes its own config, in the format of DEFAULT_RULES.
+    """
+
+    __slots__ = ('config', 'conflicts', 'shabat_mask', 'shabat_night_mask', 'shabat_night_work_mask', 'nights_mask',
+                 'required', 'min_officers', 'min_drivers', 'min_heights')
+
+    def __init__(self, config=None):
+        """
+        :param config: Dictionary in the format of DEFAULT_RULES, None for the default rules
+        :raises ValueError: If the config has a shift that is not in the week
+        """
+        self.config = DEFAULT_RULES if config is None else config
+
+        # The rest rules, the slots out of the week are ignored. A conflict blocks both of its shifts, so it's
+        # enough to declare it once
+        conflicts = [0] * 21
+        for shift, relations in self.config['rest'].items():
+            shift = int(shift)  # JSON keys are strings
+            slots_mask([(0, shift)])
+            for day in range(7):
+                for day_offset, other_shift in relations:
+                    if 0 <= day + day_offset < 7:
+                        other = (day + day_offset) * 3 + other_shift
+                        conflicts[day * 3 + shift] |= slots_mask([(day + day_offset, other_shift)])
+                        conflicts[other] |= 1 << (day * 3 + shift)
+        self.conflicts = tuple(conflicts)
+
+        self.shabat_mask = slots_mask(self.config['shabat_slots'])
+        self.shabat_night_mask = slots_mask(self.config['shabat_night_blocks'])
+        self.shabat_night_work_mask = slots_mask(self.config.get('shabat_night_slots', [(6, 2)]))
+        self.nights_mask = slots_mask((day, shift) for day in range(7) for shift in self.config['night_shifts'])
+
+        staffing = [dict(self.config['staffing']) for _ in range(21)]
+        for override in self.config.get('staffing_overrides', []):
+            day, shift = override['slot']
+            staffing[day * 3 + shift].update({key: value for key, value in override.items() if key != 'slot'})
+        self.required = tuple(slot['employees'] for slot in staffing)
+        self.min_officers = tuple(slot['officers'] for slot in staffing)
+        self.min_drivers = tuple(slot['drivers'] for slot in staffing)
+        self.min_heights = tuple(slot['heights'] for slot in staffing)
+
+    @classmethod
+    def from_file(cls, path):
+        """ Compile the rules from a JSON file in the format of DEFAULT_RULES."""
+        with open(path, encoding='utf-8') as file:
+            return cls(json.load(file))
+
+    def conflicting(self, day, shift):
+        """ Returns the (day, shift) of the slots that block the given shift by the rest rules."""
+        conflicts = self.conflicts[day * 3 + shift]
+        return [divmod(slot, 3) for slot in range(21) if conflicts >> slot & 1]
+
+    def shift_warning(self, day, shift, amount, officers_amount, count_drivers, count_height_permissions):
+        """
+        Check the counts of the employees of a shift against the staffing of the shift.
+        :param day: The day in number
+        :param shift: The shift in number
+        :param amount: The number of employees in the shift
+        :param officers_amount: The number of officers in the shift
+        :param count_drivers: The number of employees with drive permission in the shift, officers included
+        :param count_height_permissions: The number of employees with height permission in the shift,
+        officers included
+        :return: The warning output of the shift, an empty string if the shift is optimal
+        """
+        slot = day * 3 + shift
+        if officers_amount < self.min_officers[slot]:
+            return "* No Officers *\n"
+        if amount < self.required[slot]:
+            return "* Lack of Employees *\n"
+        if count_drivers < self.min_drivers[slot]:
+            return "* No Enough Drivers *\n"
+        if count_height_permissions < self.min_heights[slot]:
+            return "* No Enough Height permissions *\n"
+        return ""
@@ -0,0 +1,289 @@
+from SecurityDepartment import SecurityDepartment
+from main import _init_worker, _run_seed, calculate_accuracy, run_arrangement, worker_context
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import copy
+import json
+import os
+import threading
+import time
+
+
+class ServiceError(Exception):
+    """ An error of a request to the service, answered with its HTTP status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class SchedulerService:
+    """
+    Long running scheduler of one department, that keeps the roster, the availability and the compiled problem in
+    memory and answers HTTP/JSON requests on a local port:
+    GET /status - the state of the service.
+    POST /solve {"restarts", "seed", "post"} - the optimal arrangement of 'restarts' seeded runs, it becomes the
+    published arrangement, and is posted to the sheet if "post" is true.
+    POST /score {"shifts": [[eID, day, shift], ...]} - the scores and the broken rules of a given arrangement.
+    POST /repair {"unavailable": [[eID, day, shift], ...], "available": [...], "post"} - repair the published
+    arrangement with 'SecurityDepartment.repair'.
+    POST /refresh - read the availability from the sheet again, the department is built again only if it changed.
+    The restarts of a solve run over a pool of worker processes with a copy of the department, the pool is made
+    again after the department changes. The department itself is changed only under a lock, one request at a time.
+    A solve is pinned to the version of the department it started with, if a refresh or a repair changed the
+    department while the workers ran, the solve runs again on the new department, up to SOLVE_ATTEMPTS times.
+    """
+
+    # The number of times a solve runs before it gives up, when the department keeps changing under it
+    SOLVE_ATTEMPTS = 3
+
+    def __init__(self, department: SecurityDepartment, workers=None, refresh_interval=None, host='127.0.0.1',
+                 port=8080):
+        """
+        :param department: SecurityDepartment object, with the client of its sheets
+        :param workers: The number of worker processes, None for the number of CPUs, 0 to run in the service process
+        :param refresh_interval: Refresh the availability every this number of seconds, None for refresh on
+        request only
+        :param host: The host of the HTTP server
+        :param port: The port of the HTTP server, 0 for any free port
+        """
+        self.department = department
+        self.workers = workers
+        self.refresh_interval = refresh_interval
+        self.lock = threading.Lock()
+
+        # The published arrangement, a snapshot of the last solve or repair. None before the first solve
+        self.published = None
+        self.published_scores = None
+        # The version of the department, increased when it changes, and the pool of the workers of a version
+        self.version = 0
+        self.executor = None
+        self.executor_version = None
+        self.refreshed = time.time()
+
+        self.server = ThreadingHTTPServer((host, port), self.make_handler())
+        self.__stop = threading.Event()
+
+    @property
+    def url(self):
+        """ The base URL of the service."""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self):
+        """ Answer requests until 'shutdown', and refresh the availability on the timer if there is one."""
+        if self.refresh_interval is not None:
+            threading.Thread(target=self.refresh_loop, daemon=True).start()
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if self.executor is not None:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        """ Stop the server and the timer, from another thread."""
+        self.__stop.set()
+        self.server.shutdown()
+
+    def refresh_loop(self):
+        """ Refresh the availability every 'refresh_interval' seconds, a failed refresh is tried on the next time."""
+        while not self.__stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing the availability: {e}")
+
+    def get_executor(self):
+        """ Returns the pool of the workers of the current department, made again if the department changed."""
+        if self.executor_version != self.version:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False)
+            # The workers get a copy, so the department can change while they work. The store and the client
+            # are shared, they are not copied
+            department = copy.deepcopy(self.department, {id(self.department.store): self.department.store,
+                                                         id(self.department.client): self.department.client})
+            # The pool is made in a request thread, while other requests may run
+            self.executor = ProcessPoolExecutor(max_workers=self.workers or os.cpu_count(), mp_context=worker_context(),
+                                                initializer=_init_worker, initargs=(department,))
+            self.executor_version = self.version
+        return self.executor
+
+    def status(self):
+        """ Returns the state of the service."""
+        return {'version': self.version, 'guards': len(self.department.guards_objects_list),
+                'published': self.published is not None, 'scores': self.published_scores,
+                'refreshed': self.refreshed}
+
+    def solve(self, restarts=100, seed=0, post=False):
+        """
+        Run the work arrangement with the seeds seed ... seed + restarts - 1 and publish the optimal arrangement.
+        On a tie the lowest seed wins, so the result doesn't depend on the workers.
+        :return: Dictionary of the seed, the scores and the arrangement
+        :raises ServiceError: If the department changed during each of the SOLVE_ATTEMPTS solves
+        """
+        seeds = range(seed, seed + restarts)
+        for _ in range(self.SOLVE_ATTEMPTS):
+            if self.workers == 0:
+                with self.lock:
+                    version = self.version
+                    results = [(seed, calculate_accuracy(*run_arrangement(self.department, seed, render=False)))
+                               for seed in seeds]
+            else:
+                with self.lock:
+                    version = self.version
+                    executor = self.get_executor()
+                chunksize = max(1, restarts // (4 * (self.workers or os.cpu_count())))
+                results = list(executor.map(_run_seed, seeds, chunksize=chunksize))
+
+            # The highest accuracy score wins, like 'get_optimal_parallel'
+            best_seed = max(results, key=lambda x: (x[1][0] + x[1][1], -x[0]))[0]
+
+            # Rebuild the optimal arrangement from its seed and publish it, only on the department of the runs
+            with self.lock:
+                if self.version != version:
+                    continue
+                updates, emp_shortness_amount, warnings_amount = run_arrangement(self.department, best_seed)
+                self.publish(emp_shortness_amount, warnings_amount)
+                posted = self.department.post_arrangement(updates) if post else None
+                return {'seed': best_seed, **self.published_scores, 'posted': posted,
+                        'rows': self.department.arrangement_rows(updates), 'shifts': self.arrangement()}
+        raise ServiceError(409, "The department changed during the solve, solve again.")
+
+    def score(self, shifts):
+        """
+        Score an arrangement without changing the published arrangement.
+        :param shifts: List of [eID, day, shift]
+        :return: Dictionary of the scores and of the shifts that break the rules, with the rule they break
+        :raises ServiceError: If a shift is not [eID, day, shift] of an employee of the department and a shift in
+        the week
+        """
+        with self.lock:
+            department = self.department
+            for item in shifts:
+                if not (isinstance(item, (list, tuple)) and len(item) == 3):
+                    raise ServiceError(400, f"A shift must be [eID, day, shift], got {item!r}.")
+                e_id, day, shift = item
+                if e_id not in department.guards_by_id:
+                    raise ServiceError(400, f"There is no employee with the ID number {e_id}.")
+                if not (isinstance(day, int) and isinstance(shift, int) and 0 <= day <= 6 and 0 <= shift <= 2):
+                    raise ServiceError(400, f"There is no shift ({day}, {shift}) in the week.")
+
+            published = department.capture_state()
+            try:
+                department.reset_data_structure()
+                violations = []
+                for e_id, day, shift in sorted(set(map(tuple, shifts))):
+                    employee = department.guards_by_id[e_id]
+                    if employee not in department.dict_of_shifts[day][shift]:
+                        violations.append([e_id, day, shift, 'not_marked'])
+                    elif not department.filter_employees(employee, day, shift):
+                        violations.append([e_id, day, shift, department.rejection_rule(employee, day, shift)])
+                    department.add_to_shift(employee, day, shift)
+                for day in range(7):
+                    for shift in range(3):
+                        department.refresh_warning(day, shift)
+                emp_shortness_amount, warnings_amount, _ = department.score_arrangement()
+            finally:
+                department.restore_state(published)
+            return {'shortness': emp_shortness_amount, 'warnings': warnings_amount, 'violations': violations}
+
+    def repair(self, unavailable=(), available=(), post=False):
+        """
+        Repair the published arrangement after the availability of some employees changed.
+        :return: Dictionary of the changes, the scores and the arrangement
+        :raises ServiceError: If there is no published arrangement, or an eID is not of an employee
+        """
+        with self.lock:
+            if self.published is None:
+                raise ServiceError(409, "There is no published arrangement, solve first.")
+            department = self.department
+            department.restore_state(self.published)
+            try:
+                changes = department.repair([tuple(x) for x in unavailable], [tuple(x) for x in available])
+            except ValueError as e:
+                raise ServiceError(400, str(e))
+            # The marks changed, the workers need the new department
+            self.version += 1
+            emp_shortness_amount, warnings_amount, _ = department.score_arrangement()
+            self.publish(emp_shortness_amount, warnings_amount)
+            posted = department.post_arrangement(department.ready_arrangment()[0]) if post else None
+            return {'changes': changes, **self.published_scores, 'posted': posted, 'shifts': self.arrangement()}
+
+    def refresh(self):
+        """
+        Read the availability from the sheet, and build the department again if it changed.
+        The published arrangement is kept only if the availability didn't change.
+        :return: True if the availability changed
+        """
+        data = self.department.client.fetch()
+        self.refreshed = time.time()
+        if data == self.department.data:
+            return False
+
+        old = self.department
+        department = SecurityDepartment(data=data, csv_file_path=old.csv_file_path, store=old.store,
+                                        department_name=old.department_name, rules=old.rules, client=old.client,
+                                        instrumentation=old.instrumentation, week=old.week)
+        department.ENGINE = old.ENGINE
+        department.SLOT_ORDER = old.SLOT_ORDER
+        with self.lock:
+            self.department = department
+            self.published = self.published_scores = None
+            self.version += 1
+        return True
+
+    def publish(self, emp_shortness_amount, warnings_amount):
+        """ Keep the arrangement of the department as the published arrangement."""
+        self.published = self.department.capture_state()
+        self.published_scores = {'shortness': emp_shortness_amount, 'warnings': warnings_amount}
+
+    def arrangement(self):
+        """ Returns the published arrangement as a sorted list of [eID, day, shift]."""
+        return sorted([employee.get_id_number(), day, shift]
+                      for day, shifts in self.department.final_arrangement.items()
+                      for shift, employees in enumerate(shifts) for employee in employees)
+
+    def make_handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status, body):
+                payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                if self.path.rstrip('/') == '/status':
+                    return self.reply(200, service.status())
+                self.reply(404, {'error': f"Unknown path {self.path}"})
+
+            def do_POST(self):
+                routes = {
+                    '/solve': lambda body: service.solve(int(body.get('restarts', 100)), int(body.get('seed', 0)),
+                                                         bool(body.get('post', False))),
+                    '/score': lambda body: service.score(body['shifts']),
+                    '/repair': lambda body: service.repair(body.get('unavailable', ()), body.get('available', ()),
+                                                           bool(body.get('post', False))),
+                    '/refresh': lambda body: {'changed': service.refresh()},
+                }
+                route = routes.get(self.path.rstrip('/'))
+                if route is None:
+                    return self.reply(404, {'error': f"Unknown path {self.path}"})
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                    self.reply(200, route(body))
+                except ServiceError as e:
+                    self.reply(e.status, {'error': str(e)})
+                except (KeyError, TypeError, ValueError) as e:
+                    self.reply(400, {'error': f"Bad request: {type(e).__name__}: {e}"})
+                except Exception as e:
+                    self.reply(500, {'error': f"{type(e).__name__}: {e}"})
+
+        return Handler
@@ -0,0 +1,98 @@
+from array import array
+
+
+class SchedulingProblem:
+    """
+    The inputs of the work arrangement of a department that don't change between runs:
+    the guards, the employees that marked each shift and the initial order of the shifts.
+    It's computed once after the data is read, and shared by all the runs of the department.
+    """
+
+    __slots__ = ('guards', 'candidates', 'availability', 'employee_amount_in_shift', 'employee_amount_in_shift_noon')
+
+    def __init__(self, guards, dict_of_shifts):
+        """
+        :param guards: The guards of the department
+        :param dict_of_shifts: The employees that marked each shift, by day and shift
+        """
+        # Sorted by ID so the runs depend only on their seed and not on the order of the sets
+        self.guards = tuple(sorted(guards, key=lambda guard: guard.get_id_number()))
+        self.candidates = {(day, shift): tuple(sorted(employees, key=lambda guard: guard.get_id_number()))
+                           for day, shifts in dict_of_shifts.items() for shift, employees in enumerate(shifts)}
+
+        # The shifts each guard marked as a 21-bit integer, bit (day * 3 + shift) for each shift, in the order of guards
+        index = {guard: idx for idx, guard in enumerate(self.guards)}
+        availability = [0] * len(self.guards)
+        for (day, shift), employees in self.candidates.items():
+            for employee in employees:
+                availability[index[employee]] |= 1 << (day * 3 + shift)
+        self.availability = tuple(availability)
+
+        self.count_shifts()
+
+    def count_shifts(self):
+        """ Order the shifts by the number of employees that marked each shift."""
+        # The shifts by the number of employees in each shift, sorted lists are already heap queues
+        self.employee_amount_in_shift = tuple(sorted((len(self.candidates[day, shift]), day, shift)
+                                                     for day in range(7) for shift in (0, 2)))
+        self.employee_amount_in_shift_noon = tuple(sorted((len(self.candidates[day, 1]), day, 1)
+                                                          for day in range(7)))
+
+    def set_mark(self, guard, day, shift, marked):
+        """
+        Mark or unmark a shift of a guard, when the guard changed his row after the problem was computed.
+        Only the shift and the guard are computed again.
+        :param guard: The guard, one of the guards of the problem
+        :param day: The day in number
+        :param shift: The shift in number
+        :param marked: True if the guard can work in the shift, False otherwise
+        :return: True if the mark changed, False if it was already so
+        """
+        candidates = set(self.candidates[day, shift])
+        if (guard in candidates) == marked:
+            return False
+        if marked:
+            candidates.add(guard)
+        else:
+            candidates.discard(guard)
+        self.candidates[day, shift] = tuple(sorted(candidates, key=lambda employee: employee.get_id_number()))
+
+        idx = self.guards.index(guard)
+        availability = list(self.availability)
+        availability[idx] ^= 1 << (day * 3 + shift)
+        self.availability = tuple(availability)
+        self.count_shifts()
+        return True
+
+
+class ScheduleState:
+    """
+    The state of one run of the work arrangement: the final arrangement, the warnings, and the shifts and night
+    counter of each guard as copies of the columns of the GuardRoster (in the order of the guard numbers), so a
+    snapshot is taken and restored by copying two arrays.
+    """
+
+    __slots__ = ('final_arrangement', 'warning_output', 'shifts_masks', 'nights_counters')
+
+    def __init__(self, final_arrangement, warning_output, shifts_masks, nights_counters):
+        self.final_arrangement = final_arrangement
+        self.warning_output = warning_output
+        self.shifts_masks = shifts_masks
+        self.nights_counters = nights_counters
+
+    @classmethod
+    def empty(cls, num_of_guards):
+        """ Returns the state before the work arrangement, no shifts and no warnings."""
+        return cls({day: (set(), set(), set()) for day in range(7)},
+                   {day: (set(), set(), set()) for day in range(7)},
+                   array('i', bytes(4 * num_of_guards)),
+                   bytearray(num_of_guards))
+
+    def copy(self):
+        """ Returns a copy of the state that doesn't share any mutable object with it."""
+        return ScheduleState({day: (set(shifts[0]), set(shifts[1]), set(shifts[2]))
+                              for day, shifts in self.final_arrangement.items()},
+                             {day: (set(shifts[0]), set(shifts[1]), set(shifts[2]))
+                              for day, shifts in self.warning_output.items()},
+                             self.shifts_masks[:],
+                             self.nights_counters[:])
@@ -1,9 +1,15 @@
-import pandas as pd
 import SecurityGuard
-import requests
+from SheetyClient import SheetyClient
+from SchedulingProblem import SchedulingProblem, ScheduleState
+from SlotOrder import DynamicSlotOrder
+from ScheduleRules import ScheduleRules
+from Instrumentation import Instrumentation
+from UpdateCSV import CSVSession, read_rows
+from GuardRoster import GuardRoster
 import heapq
 import os
-from random import shuffle
+import random
+import time
 
 
 def check_shift(employee, day, shift):
@@ -31,22 +37,73 @@ class SecurityDepartment:
     Represents the security department in the company.
     """
 
-    def __init__(self):
+    def __init__(self, data=None, csv_file_path='employee_data.csv', store=None, department_name='security',
+                 rules=None, client=None, instrumentation=None, week=None):
         """ This class is responsible for the security department.
-            It contains all the information about the department and how to make a work arrangement """
+            It contains all the information about the department and how to make a work arrangement
+        :param data: The sheets data of the department, when None the data is read from Google sheets
+        :param csv_file_path: The path of the CSV file with the information of the employees
+        :param store: GuardStore object to read and update the employees instead of the CSV file, None for the CSV file
+        :param department_name: The name of the department in the store
+        :param rules: ScheduleRules object or a config in the format of DEFAULT_RULES, None for the default rules
+        :param client: SheetyClient of the sheets of the department, None for the endpoints of the environment variables
+        :param instrumentation: Instrumentation object to measure the phases and the rejections of the greedy,
+        None to measure nothing
+        :param week: The ISO week of the arrangement, like '2024-W07', None for the current week. The guards of the
+        store start from the counters of the week before it, and the counters of the arrangement are kept for it
+        """
         # permanent fields
         self.MAX_SHIFTS = 6
         self.MAX_NIGHTS_SHIFTS = 7
         self.MAX_SHABAT_SHIFTS = 3
         self.MAX_EMPLOYEE_PER_SHIFT = 5
+        # The weights of a missing employee and of a warning in the score of an arrangement,
+        # the same as the accuracy sum of 'get_optimal' (shortness / 100 + warnings / 21)
+        self.SHORTNESS_WEIGHT = 21
+        self.WARNING_WEIGHT = 100
+        # The number of moves of the local search after the greedy, 0 to skip the local search
+        self.LOCAL_SEARCH_ITERATIONS = 300
+        # The weight of a change to a published shift in the score of a repair, less than SHORTNESS_WEIGHT so a
+        # missing employee is replaced but the other shifts are not reshuffled. And the maximum moves of a repair
+        self.CHANGE_WEIGHT = 5
+        self.REPAIR_MOVES = 50
+        # The engine of the greedy: 'object' checks the guards one by one, 'numpy' checks all the guards of a shift
+        # at once with NumPy arrays (same arrangement for the same seed). Experimental: slower for small departments,
+        # and about 1.4-1.8x faster from a few hundred guards in bench_vector_engine
+        self.ENGINE = 'object'
+        # The order of the shifts in the greedy: 'static' by the number of employees that marked each shift,
+        # 'dynamic' by the number of employees that can still work in each shift, updated after each shift
+        self.SLOT_ORDER = 'static'
         # Environment variables for the API
         self.ENDPOINT_GET_DATA = os.getenv('ENDPOINT_GET')
         self.TOKEN_GET = os.getenv('TOKEN_GET')
         self.ENDPOINT_UPLOAD_DATA = os.getenv('ENDPOINT_PUT')
         self.TOKEN_PUT = os.getenv('TOKEN_PUT')
-
-        # Set of all the guards in the department, initialized in the method 'set_guards_objects_list'
-        self.guards_objects_list = set()
+        self.csv_file_path = csv_file_path
+        self.store = store
+        self.department_name = department_name
+        self.week = week
+        # The rest, shabat and staffing rules, compiled into tables of the 21 shifts
+        self.rules = rules if isinstance(rules, ScheduleRules) else ScheduleRules(rules)
+        # Client of the Sheety API, with a pooled session, timeouts and retries
+        if client is None:
+            client = SheetyClient(self.ENDPOINT_GET_DATA, self.TOKEN_GET, self.ENDPOINT_UPLOAD_DATA, self.TOKEN_PUT)
+        self.client = client
+        # The measurements of the run, a disabled instrumentation when not given
+        self.instrumentation = instrumentation if instrumentation is not None else Instrumentation(enabled=False)
+
+        # The attributes of all the guards in the department as arrays, and the list of the guards in the order of
+        # the roster (their guard numbers). Initialized in the method 'set_guards_objects_list'
+        self.roster = GuardRoster()
+        self.guards_objects_list = []
+        # The guards by name and by ID number, initialized in the method 'set_guards_objects_list'
+        self.guards_by_name = {}
+        self.guards_by_id = {}
+
+        # The shifts each guard marked by ID number, and the problems found in the sheets data.
+        # Initialized in the method 'set_data'
+        self.availability_masks = {}
+        self.ingest_report = {'unknown_names': [], 'malformed_cells': []}
 
         # Number of employees per shift. Initialized in the method 'count_shifts'
         self.employee_amount_in_shift = []
@@ -62,20 +119,50 @@ class SecurityDepartment:
         # The warning output of the shifts
         self.warning_output = {day: (set(), set(), set()) for day in range(7)}
 
-        try:
-            # Read the data from Google sheets using Sheety API
-            response = requests.get(url=self.ENDPOINT_GET_DATA,
-                                    headers={"Authorization": f"Bearer {self.TOKEN_GET}"})
-            response.raise_for_status()
-            self.data = response.json()
-            response.close()
-        except requests.exceptions.HTTPError as e:
-            raise requests.exceptions.HTTPError(f"Error: {e}")
-
-        # Set the attributes of the guards
-        self.set_guards_objects_list()
-        self.set_data()
-        # self.count_shifts()
+        # Random generator used to shuffle the candidates of each shift, seeded with 'set_seed' to reproduce a run
+        self.rng = random.Random()
+
+        if data is not None:
+            self.data = data
+        else:
+            import requests  # Only needed to read the data from Google sheets
+            try:
+                # Read the data from Google sheets using Sheety API
+                with self.instrumentation.phase('fetch'):
+                    self.data = self.client.fetch()
+            except requests.exceptions.HTTPError as e:
+                raise requests.exceptions.HTTPError(f"Error: {e}")
+
+        # The inputs that don't change between runs, and the state before the work arrangement
+        self.problem = None
+        self.initial_state = None
+        self.vector_engine = None
+
+        with self.instrumentation.phase('parse'):
+            # Set the attributes of the guards
+            self.set_guards_objects_list()
+            self.set_data()
+            # self.count_shifts()
+            self.compile_problem()
+
+    def compile_problem(self):
+        """
+        Compute the inputs of the work arrangement that don't change between runs, from the guards and the shifts
+        they marked. Must be called again if 'dict_of_shifts' changes.
+        """
+        self.problem = SchedulingProblem(self.guards_objects_list, self.dict_of_shifts)
+        self.initial_state = ScheduleState.empty(len(self.roster))
+        self.vector_engine = None
+
+    def get_vector_engine(self):
+        """
+        Returns the NumPy engine of the department, built on the first use after the problem is compiled.
+        NumPy is imported only by the 'numpy' engine.
+        """
+        if self.vector_engine is None:
+            from VectorEngine import VectorEngine
+            self.vector_engine = VectorEngine(self)
+        return self.vector_engine
 
     def reset_data_structure(self):
         """
@@ -83,95 +170,142 @@ class SecurityDepartment:
         """
         self.employee_amount_in_shift = []
         self.employee_amount_in_shift_noon = []
-        self.final_arrangement = {day: (set(), set(), set()) for day in range(7)}
-        self.warning_output = {day: (set(), set(), set()) for day in range(7)}
+        self.restore_state(self.initial_state)
 
-        # Reset all employee shifts
-        for employee in self.guards_objects_list:
-            employee.reset_all_shifts()
-            employee.reset_nigth_counter()
+    def capture_state(self):
+        """
+        Take a snapshot of the current run, to be restored later with 'restore_state'.
+        :return: ScheduleState object
+        """
+        state = ScheduleState(self.final_arrangement, self.warning_output, self.roster.shifts,
+                              self.roster.nights_counter)
+        return state.copy()
+
+    def restore_state(self, state):
+        """
+        Set the final arrangement, the warnings and the shifts of each guard from a snapshot.
+        The snapshot is copied, so it can be restored again.
+        :param state: ScheduleState object
+        """
+        state = state.copy()
+        self.final_arrangement = state.final_arrangement
+        self.warning_output = state.warning_output
+        # The shifts and the night counters of all the guards at once, by guard number
+        self.roster.shifts[:] = state.shifts_masks
+        self.roster.nights_counter[:] = state.nights_counters
+
+    def set_seed(self, seed):
+        """
+        Seed the random generator of the work arrangement, so the same seed gives the same arrangement.
+        :param seed: Integer seed of the run
+        """
+        self.rng.seed(seed)
 
     def set_guards_objects_list(self):
         """
-            Make a list of all the guards in the department from the CSV file.
+            Make a list of all the guards in the department from the CSV file, or from the store if there is one.
             Each guard is an object of the class 'SecurityGuard'.
         """
-        # Load data of all employees in the department into Pandas DataFrame from the CSV file
-        try:
-            df = pd.read_csv('employee_data.csv')
-        except FileNotFoundError:
-            raise FileNotFoundError("The file 'employee_data.csv' was not found.")
+        if self.store is not None:
+            rows = self.store.load_guards(self.department_name, self.week)
+        else:
+            # Load data of all employees in the department from the CSV file
+            try:
+                rows = read_rows(self.csv_file_path)
+            except FileNotFoundError:
+                raise FileNotFoundError(f"The file '{self.csv_file_path}' was not found.")
 
         # Create a list of objects with the guards in the department
-        for i in range(len(df)):
-            self.guards_objects_list.add(
-                SecurityGuard.SecurityGuard(
-                    name=str(df['E_Name'].iloc[i]).strip(),
-                    id_number=int(df['eID'].iloc[i]),
-                    is_officer=bool(df['Is_Officer'].iloc[i]),
-                    has_height_permission=bool(df['Has_Height'].iloc[i]),
-                    can_drive=bool(df['Can_Drive'].iloc[i]),
-                    shabat_counter=int(df['Shabat_Count'].iloc[i]),
-                    nights_counter=int(df['Nights_Count'].iloc[i]),
-                    work_shabat_night=bool(df['Shabat_Night'].iloc[i])
-                )
+        for row in rows:
+            guard = SecurityGuard.SecurityGuard(
+                name=str(row['E_Name']).strip(),
+                id_number=int(row['eID']),
+                is_officer=bool(row['Is_Officer']),
+                has_height_permission=bool(row['Has_Height']),
+                can_drive=bool(row['Can_Drive']),
+                shabat_counter=int(row['Shabat_Count']),
+                nights_counter=int(row['Nights_Count']),
+                work_shabat_night=bool(row['Shabat_Night']),
+                roster=self.roster
             )
+            self.guards_objects_list.append(guard)
+
+            # Index the guards by name and by ID
+            self.guards_by_name[guard.get_name()] = guard
+            self.guards_by_id[guard.get_id_number()] = guard
 
     def set_data(self):
         """
             Collect all information from 'sheets' input data,
             and store in each shift in the week, all the employee that marks the shift.
             This will help to arrange the shifts by the number of employees in each shift.
+            The columns are taken from the title row: the name column, then a column for each shift of the week
+            (Sunday morning first) and then the column of the number of shifts the employee wants to work.
+            The rows of names that are not in the CSV file and the cells with unexpected values are reported together.
         """
-        # Initial the dictionary shifts
-        for i in range(1, len(self.guards_objects_list) + 2):  # The first row is the title
-            employee = None
-            for obj in self.guards_objects_list:
-                if obj.get_name() == self.data['security'][i]["שם"]:  # The name of the employee in the sheets document
-                    employee = obj
-                    # print(employee.get_name())
-                    break
-            # The employee is not in the sheets document so continue to the next employee
-            if employee is None:
-                continue
+        rows = self.data['security']
+        if not rows:
+            return
 
-            count = -1  # -1 to skip the first value (name)
+        # Map each column of the sheets document to its day and shift, by the order of the title row
+        columns = [column for column in rows[0] if column not in ("שם", 'id')]
+        slot_columns = {column: divmod(idx, 3) for idx, column in enumerate(columns[:21])}
+        amount_column = columns[21] if len(columns) > 21 else None
 
-            # Iterate over the row of the employee in the sheets document to get the shifts and the number of shifts.
-            for val in self.data['security'][i].values():
-                # The first iteration is the title
-                if count == -1:
-                    count += 1
-                    continue
+        unknown_names = []
+        malformed_cells = []
+
+        # The shifts each employee marked as a 21-bit integer, bit (day * 3 + shift) for each shift
+        self.availability_masks = {}
 
-                day = count // 3  # Sunday is 0 and so on
-                shift = count % 3  # Morning is 0 and so on
+        for row in rows[1:]:  # The first row is the title
+            name = str(row.get("שם", '')).strip()
+            if not name:
+                continue
+            employee = self.guards_by_name.get(name)
+            # The employee is not in the CSV file, report it and continue to the next row
+            if employee is None:
+                unknown_names.append(name)
+                continue
 
-                # The employee opens the shift
-                if val != '' and type(val) is not int:  # We expected an 'X' or an empty string
-                    # Add the employee to the dictionary by day and shift
+            mask = 0
+            for column, (day, shift) in slot_columns.items():
+                val = row.get(column, '')
+                if type(val) is not str:  # We expected an 'X' or an empty string
+                    malformed_cells.append((name, column, val))
+                elif val.strip() != '':
+                    mask |= 1 << (day * 3 + shift)
+            self.availability_masks[employee.get_id_number()] = mask
+
+            # Set how many shifts the employee want to work this week
+            val = row.get(amount_column) if amount_column is not None else None
+            if type(val) is int and 0 <= val <= 6:
+                employee.set_optimal_num_of_shifts(val)
+            else:
+                malformed_cells.append((name, amount_column, val))
+
+        # Add the employees to the dictionary by day and shift
+        for employee_id, mask in self.availability_masks.items():
+            employee = self.guards_by_id[employee_id]
+            for slot in range(21):
+                if mask >> slot & 1:
+                    day, shift = divmod(slot, 3)
                     self.dict_of_shifts[day][shift].add(employee)
 
-                # Set how many shifts the employee want to work this week
-                elif type(val) is int and 0 <= val <= 6:
-                    employee.set_optimal_num_of_shifts(val)
-                    break
-                count += 1
+        self.ingest_report = {'unknown_names': unknown_names, 'malformed_cells': malformed_cells}
+        if unknown_names:
+            print(f"Names in the sheets document that are not in the CSV file: {', '.join(unknown_names)}")
+        if malformed_cells:
+            print("Unexpected values in the sheets document: " +
+                  ', '.join(f"{name} [{column}] = {val!r}" for name, column, val in malformed_cells))
 
     def count_shifts(self):
         """
          Set the attribute employee_amount_in_shift by the number of employees in each shift.
+         The heap queues are computed once in the problem, so each run copies them.
         """
-        for day, value in self.dict_of_shifts.items():
-            for shift in range(3):
-                if shift == 0 or shift == 2:
-                    self.employee_amount_in_shift.append((len(value[shift]), day, shift))
-                elif shift == 1:
-                    self.employee_amount_in_shift_noon.append((len(value[shift]), day, shift))
-
-        # Transform the list to a heap queue to find the minimum value in a more efficient way.
-        heapq.heapify(self.employee_amount_in_shift)
-        heapq.heapify(self.employee_amount_in_shift_noon)
+        self.employee_amount_in_shift = list(self.problem.employee_amount_in_shift)
+        self.employee_amount_in_shift_noon = list(self.problem.employee_amount_in_shift_noon)
 
     def find_min_shift(self, num):
         """
@@ -188,7 +322,7 @@ class SecurityDepartment:
 
         return day, shift, min_employee_amount
 
-    def do_work_arrangement(self):
+    def do_work_arrangement(self, render=True):
         """
         Do the work arrangement, the main function of the class.
         Iterate over all the shifts by the number of employees in the shift from the minimum to the maximum.
@@ -197,21 +331,47 @@ class SecurityDepartment:
         2. At least two drivers in the shift.
         3. At least two employees with height permission in the shift.
         4. The employee can't work in the shift if he worked in the previous shift.
+        :param render: True to return the arrangement of 'ready_arrangment', False to return only the scores of
+        'score_arrangement'
         """
+        if self.ENGINE == 'numpy':
+            self.get_vector_engine().do_greedy()
+        else:
+            self.greedy_arrangement()
+
+        self.optimize_assignment()
+        if not render:
+            with self.instrumentation.phase('score'):
+                return self.score_arrangement()
+        with self.instrumentation.phase('render'):
+            return self.ready_arrangment()
+
+    def greedy_arrangement(self):
+        """
+        The greedy of the work arrangement, checks the candidates of each shift one by one with 'filter_employees'.
+        The shifts are assigned in the order of 'find_min_shift', or the most constrained shift first when
+        'SLOT_ORDER' is 'dynamic'.
+        """
+        dynamic_order = DynamicSlotOrder(self) if self.SLOT_ORDER == 'dynamic' else None
+        if self.instrumentation.enabled:
+            self.instrumentation.rejection_runs += 1
+
         # Each iteration we complete one shift
         idx_of_shift = 0
         while idx_of_shift < 21:
-            min_shift = self.find_min_shift(idx_of_shift)
+            if dynamic_order is None:
+                min_shift = self.find_min_shift(idx_of_shift)
+            else:
+                min_shift = dynamic_order.next_slot()
             day = min_shift[0]
             shift = min_shift[1]
-            num_of_employee = min_shift[2]
             can_work_list = [[], []]  # [officers, guards]
 
-            employye_list = list(self.dict_of_shifts[day][shift])
-            for i in range(num_of_employee):
-                employee = employye_list[i]
-
+            # Sorted by ID so the order of the candidates depends only on the seed, not on the set order
+            for employee in self.problem.candidates[day, shift]:
                 if self.filter_employees(employee, day, shift) is False:
+                    if self.instrumentation.enabled:
+                        self.instrumentation.reject(self.rejection_rule(employee, day, shift), day, shift)
                     continue
 
                 # Add the employee to the list of employees that can work
@@ -227,40 +387,391 @@ class SecurityDepartment:
             else:
                 self.warning_output[day][shift].add("")
 
+            # The employees of the shift can't work in some of the other shifts anymore
+            if dynamic_order is not None:
+                dynamic_order.update(self.final_arrangement[day][shift])
+
             # Update the number of shifts
             idx_of_shift += 1
 
-        # self.optimize_assignment()
-        return self.ready_arrangment()
+    def optimize_assignment(self, iterations=None, time_limit=None):
+        """
+        Improve the final arrangement with a local search.
+        Each move puts an employee that marked a shift into it, and may take him out of another shift he works in,
+        and may take out another employee of the shift to make room for him.
+        Only the days of the changed shifts are scored again, a move is kept if the score is not worse.
+        :param iterations: The maximum number of moves, None for 'LOCAL_SEARCH_ITERATIONS'
+        :param time_limit: The maximum time of the search in seconds, None for no limit
+        :return: The score improvement of the search
+        """
+        if iterations is None:
+            iterations = self.LOCAL_SEARCH_ITERATIONS
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+
+        # The employees that marked each shift, sorted by ID so the search depends only on the seed
+        marks = self.problem.candidates
+        slots = [slot for slot, employees in marks.items() if employees]
+        improvement = 0
+
+        # No employee marked any shift, there is no move to make
+        if not slots or iterations <= 0:
+            return improvement
+
+        for _ in range(iterations):
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+
+            # Choose a shift and an employee that marked it and doesn't work in it
+            day, shift = self.rng.choice(slots)
+            employee = self.rng.choice(marks[day, shift])
+            if employee in self.final_arrangement[day][shift]:
+                continue
+
+            # The changes of the move, each one is (employee, day, shift)
+            removals = []
+
+            # Take the employee out of one of his shifts, or not at all
+            if employee.get_num_of_current_shifts() > 0 and self.rng.random() < 0.5:
+                mask = employee.get_shifts_mask()
+                own_shifts = [slot for slot in range(21) if mask >> slot & 1]
+                removals.append((employee,) + divmod(self.rng.choice(own_shifts), 3))
+
+            # Take out an employee of the shift if it's full, or sometimes even if it isn't
+            required = self.rules.required[day * 3 + shift]
+            members = self.final_arrangement[day][shift]
+            if members and (len(members) >= required or self.rng.random() < 0.2):
+                out = self.rng.choice(sorted(members, key=SecurityGuard.SecurityGuard.get_id_number))
+                removals.append((out, day, shift))
+
+            days = {day} | {d for _, d, _ in removals}
+            before = sum(self.day_penalty(d) for d in days)
+            changed = {(day, shift)} | {(d, s) for _, d, s in removals}
+            old_warnings = {(d, s): set(self.warning_output[d][s]) for d, s in changed}
+
+            for out, d, s in removals:
+                self.remove_from_shift(out, d, s)
+
+            # The employee must still meet all the rules of the shift
+            if not self.filter_employees(employee, day, shift):
+                for out, d, s in reversed(removals):
+                    self.add_to_shift(out, d, s)
+                continue
+            self.add_to_shift(employee, day, shift)
+
+            for d, s in changed:
+                self.warning_output[d][s].clear()
+                self.warning_output[d][s].add(self.shift_warning(d, s))
+            delta = sum(self.day_penalty(d) for d in days) - before
+
+            # Keep the move if the score is not worse, sideways moves help to leave a plateau
+            if delta <= 0:
+                improvement -= delta
+                continue
 
-    def post_arrangement(self, updates: dict):
+            # Undo the move
+            self.remove_from_shift(employee, day, shift)
+            for out, d, s in reversed(removals):
+                self.add_to_shift(out, d, s)
+            for (d, s), warning in old_warnings.items():
+                self.warning_output[d][s].clear()
+                self.warning_output[d][s].update(warning)
+
+        return improvement
+
+    def set_mark(self, employee, day, shift, marked):
         """
-        Post the final arrangement on Google Sheets and warn about the shifts that are not optimal
+        Mark or unmark a shift of an employee after the data was read, when he changed his row in the sheets.
+        :param employee: Employee object
+        :param day: The day in number
+        :param shift: The shift in number
+        :param marked: True if the employee can work in the shift, False otherwise
         """
-        # Batch update to Google Sheets
-        try:
+        # An employee without a row in the sheets has no marks yet
+        e_id = employee.get_id_number()
+        if marked:
+            self.dict_of_shifts[day][shift].add(employee)
+            self.availability_masks[e_id] = self.availability_masks.get(e_id, 0) | 1 << (day * 3 + shift)
+        else:
+            self.dict_of_shifts[day][shift].discard(employee)
+            self.availability_masks[e_id] = self.availability_masks.get(e_id, 0) & ~(1 << (day * 3 + shift))
+        if self.problem.set_mark(employee, day, shift, marked):
+            # The marks changed, the NumPy engine is built again on its next use
+            self.vector_engine = None
+
+    def refresh_warning(self, day, shift):
+        """ Set the warning output of the shift by the employees of the shift in the final arrangement."""
+        self.warning_output[day][shift].clear()
+        self.warning_output[day][shift].add(self.shift_warning(day, shift))
+
+    def repair(self, unavailable=(), available=(), max_moves=None):
+        """
+        Repair the published arrangement when employees change their availability in the middle of the week,
+        without running the work arrangement again.
+        The changes are applied to the marks, the employees that can't work in a shift anymore are taken out of it,
+        and only the changed shifts and the shifts next to them by the rest rules are improved: first the missing
+        employees are filled, then employees of shifts with warnings are replaced.
+        A move is kept only if it improves the score by more than CHANGE_WEIGHT for each published shift it
+        changes, so the rest of the arrangement stays as it was published.
+        :param unavailable: Iterable of (eID, day, shift) that the employees can't work in anymore
+        :param available: Iterable of (eID, day, shift) that the employees can work in now
+        :param max_moves: The maximum number of moves, None for 'REPAIR_MOVES'
+        :return: List of the changes to the published arrangement, (eID, day, shift, True if the employee was added
+        or False if he was taken out), sorted
+        :raises ValueError: If an eID is not of an employee of the department, or a shift is not in the week.
+        Nothing is changed then
+        """
+        if max_moves is None:
+            max_moves = self.REPAIR_MOVES
+
+        published = {(employee, day, shift) for day, shifts in self.final_arrangement.items()
+                     for shift, employees in enumerate(shifts) for employee in employees}
+
+        # Apply the changes of the availability
+        affected = set()
+        changes = [(e_id, day, shift, False) for e_id, day, shift in unavailable] + \
+                  [(e_id, day, shift, True) for e_id, day, shift in available]
+        # Check all the changes before applying any of them
+        for e_id, day, shift, _ in changes:
+            if e_id not in self.guards_by_id:
+                raise ValueError(f"There is no employee with the ID number {e_id}.")
+            if not (isinstance(day, int) and isinstance(shift, int) and 0 <= day <= 6 and 0 <= shift <= 2):
+                raise ValueError(f"There is no shift ({day}, {shift}) in the week.")
+        for e_id, day, shift, marked in changes:
+            employee = self.guards_by_id[e_id]
+            self.set_mark(employee, day, shift, marked)
+            if not marked and employee in self.final_arrangement[day][shift]:
+                self.remove_from_shift(employee, day, shift)
+            affected.add((day, shift))
+
+        # The shifts next to the changed shifts by the rest rules
+        for day, shift in list(affected):
+            affected.update(self.rules.conflicting(day, shift))
+        affected = sorted(affected)
+        for day, shift in affected:
+            self.refresh_warning(day, shift)
+
+        def change_cost(employee, day, shift, added):
+            """ The change of the number of changes to the published arrangement by adding or removing a shift."""
+            return self.CHANGE_WEIGHT * (1 if ((employee, day, shift) in published) != added else -1)
+
+        def best_move(day, shift, members):
+            """
+            Find the best move of the shift: add one of the candidates, after taking out one of the members
+            (None for not taking out).
+            :return: The gain of the move, the member to take out and the employee to add, None if no move gains
+            """
+            best = None
+            before = self.day_penalty(day)
+            for out in members:
+                if out is not None:
+                    self.remove_from_shift(out, day, shift)
+                for employee in self.problem.candidates[day, shift]:
+                    if employee in self.final_arrangement[day][shift] or employee is out or \
+                            not self.filter_employees(employee, day, shift):
+                        continue
+                    self.add_to_shift(employee, day, shift)
+                    self.refresh_warning(day, shift)
+                    gain = before - self.day_penalty(day) - change_cost(employee, day, shift, True)
+                    if out is not None:
+                        gain -= change_cost(out, day, shift, False)
+                    self.remove_from_shift(employee, day, shift)
+                    if gain > 0 and (best is None or gain > best[0]):
+                        best = (gain, out, employee)
+                if out is not None:
+                    self.add_to_shift(out, day, shift)
+            self.refresh_warning(day, shift)
+            return best
+
+        moves = 0
+        for replace in (False, True):
+            improved = True
+            while improved and moves < max_moves:
+                improved = False
+                for day, shift in affected:
+                    if moves >= max_moves:
+                        break
+                    if replace:
+                        # Replace an employee of a shift with a warning
+                        if self.shift_warning(day, shift) == "":
+                            continue
+                        members = sorted(self.final_arrangement[day][shift],
+                                         key=SecurityGuard.SecurityGuard.get_id_number)
+                    else:
+                        # Fill a missing employee
+                        if len(self.final_arrangement[day][shift]) >= self.rules.required[day * 3 + shift]:
+                            continue
+                        members = [None]
+
+                    move = best_move(day, shift, members)
+                    if move is not None:
+                        _, out, employee = move
+                        if out is not None:
+                            self.remove_from_shift(out, day, shift)
+                        self.add_to_shift(employee, day, shift)
+                        self.refresh_warning(day, shift)
+                        moves += 1
+                        improved = True
+
+        current = {(employee, day, shift) for day, shifts in self.final_arrangement.items()
+                   for shift, employees in enumerate(shifts) for employee in employees}
+        return sorted([(employee.get_id_number(), day, shift, False) for employee, day, shift in published - current] +
+                      [(employee.get_id_number(), day, shift, True) for employee, day, shift in current - published])
+
+    def add_to_shift(self, employee, day, shift):
+        """ Add the employee to the shift in his personal shift list and in the final arrangement."""
+        employee.add_shift(day, shift)
+        self.final_arrangement[day][shift].add(employee)
+
+    def remove_from_shift(self, employee, day, shift):
+        """ Remove the employee from the shift in his personal shift list and in the final arrangement."""
+        employee.remove_shift(day, shift)
+        self.final_arrangement[day][shift].discard(employee)
+
+    def day_penalty(self, day):
+        """
+        The score of one day in the final arrangement, the weighted shortness and warnings of its three shifts.
+        :param day: The day in number
+        :return: The penalty of the day, lower is better
+        """
+        employee_shortness, warnings_amount, _ = self.score_day(day)
+        return self.SHORTNESS_WEIGHT * employee_shortness + self.WARNING_WEIGHT * warnings_amount
+
+    def score_day(self, day):
+        """
+        Calculate the scores of one day in the final arrangement with integer counters only.
+        The shortness is calculated like 'ready_arrangment', including the 12-hour replacements of the noon shift.
+        :param day: The day in number
+        :return: Employee_shortness, warnings_amount and the number of 12-hour replacements of the noon shift
+        """
+        morning, noon, night = self.final_arrangement[day]
+        # The number of employees each shift of the day needs, from the staffing rules
+        required = self.rules.required[day * 3:day * 3 + 3]
+
+        warnings_amount = 0
+        for shift in range(3):
+            if "" not in self.warning_output[day][shift]:
+                warnings_amount += 1
+
+        # The employees from the morning and the night that can do 12 hours instead of the missing noon employees
+        missing_count = required[1] - len(noon)
+        cover = 0
+        if missing_count > 0:
+            noon_marks = self.dict_of_shifts[day][1]
+            morning_12 = night_12 = 0
+            for employee in morning:
+                if employee in noon_marks:
+                    morning_12 += 1
+            for employee in night:
+                if employee in noon_marks:
+                    night_12 += 1
+            cover = min(missing_count, morning_12, night_12)
+
+        employee_shortness = sum(required) - len(morning) - len(noon) - len(night) - cover
+        return employee_shortness, warnings_amount, cover
+
+    def score_lower_bound(self):
+        """
+        Calculate the best scores any arrangement can reach with the shifts the employees marked.
+        A shift that not enough employees marked is short for sure, and a shift whose marks can't meet one of the
+        rules of 'shift_warning' has a warning for sure. An arrangement with these scores can't be improved.
+        :return: Employee_shortness and warnings_amount of the bound
+        """
+        employee_shortness = warnings_amount = 0
+        for day in range(7):
             for shift in range(3):
-                sheet_params = {
-                    'chart1': {
-                        'shift': shift_name(shift),
-                        'ראשון': updates.get((shift, 0)),
-                        'שני': updates.get((shift, 1)),
-                        'שלישי': updates.get((shift, 2)),
-                        'רביעי': updates.get((shift, 3)),
-                        'חמישי': updates.get((shift, 4)),
-                        'שישי': updates.get((shift, 5)),
-                        'שבת': updates.get((shift, 6))
-                    }
-                }
-                response = requests.put(url=f"{self.ENDPOINT_UPLOAD_DATA}/{shift + 2}", json=sheet_params,
-                                        headers={"Authorization": f"Bearer {self.TOKEN_PUT}"})
-                response.raise_for_status()
-                response.close()
-            # Update the csv file with the new information
-            # self.update_csv_file()
+                candidates = self.dict_of_shifts[day][shift]
+                required = self.rules.required[day * 3 + shift]
+
+                officers_amount = count_drivers = count_height_permissions = 0
+                for employee in candidates:
+                    if employee.is_officer():
+                        officers_amount += 1
+                    if employee.is_officer() or employee.is_allowed_to_drive():
+                        count_drivers += 1
+                    if employee.is_officer() or employee.is_allowed_to_work_on_height():
+                        count_height_permissions += 1
+                if self.rules.shift_warning(day, shift, len(candidates), officers_amount, count_drivers,
+                                            count_height_permissions):
+                    warnings_amount += 1
+
+                if shift != 1:
+                    employee_shortness += required - min(len(candidates), required)
+
+            # The noon shortness, with the most 12-hour replacements the morning and the night can give
+            noon_marks = self.dict_of_shifts[day][1]
+            noon_required = self.rules.required[day * 3 + 1]
+            missing_count = noon_required - min(len(noon_marks), noon_required)
+            cover = min(missing_count, len(self.dict_of_shifts[day][0] & noon_marks),
+                        len(self.dict_of_shifts[day][2] & noon_marks))
+            employee_shortness += missing_count - cover
+        return employee_shortness, warnings_amount
+
+    def score_arrangement(self):
+        """
+        Calculate the accuracy scores of the final arrangement, the same as 'ready_arrangment' but without
+        preparing the arrangement to be posted on Google Sheets.
+        :return: Employee_shortness - The total number of employees that are short from all the week.
+        :return: Warnings_amount - The number of warnings from the week.
+        :return: Shifts_with_12 - The number of 12-hour replacements of the noon shifts in the week.
+        """
+        employee_shortness = warnings_amount = shifts_with_12 = 0
+        for day in range(7):
+            day_shortness, day_warnings, day_cover = self.score_day(day)
+            employee_shortness += day_shortness
+            warnings_amount += day_warnings
+            shifts_with_12 += day_cover
+        return employee_shortness, warnings_amount, shifts_with_12
+
+    def post_arrangement(self, updates: dict, counters=None):
+        """
+        Post the final arrangement on Google Sheets and warn about the shifts that are not optimal.
+        Only the rows that changed since the last post are sent, concurrently, each one with retries.
+        When the department has a store and all the rows were posted, the counters of the final arrangement are
+        kept in the history of the store for the week of the department. They replace the counters posted for
+        the week before, and the guards are loaded with the counters of the former week, so posting or solving
+        the same week again doesn't change the counters it starts from.
+        The CSV file is not changed, updating it stays a manual step with 'update_csv_file'.
+        :param updates: The arrangement from 'ready_arrangment'
+        :param counters: The counters of the arrangement from 'next_counters', None for the counters of the final
+        arrangement of the department. Given when the arrangement was made by a copy of the department
+        :return: True if all the rows were posted
+        """
+        # Batch update to Google Sheets
+        with self.instrumentation.phase('post'):
+            errors = self.client.put_changed_rows(self.arrangement_rows(updates))
         # Handle the exceptions
-        except requests.exceptions.RequestException as e:
-            print(f"Error posting updates: {e}")
+        for row, e in errors.items():
+            print(f"Error posting updates of row {row}: {e}")
+        # Update the store with the counters the guards carry into the next week
+        if not errors and self.store is not None:
+            if counters is None:
+                counters = self.next_counters()
+            self.store.update_counters(self.department_name, counters, self.week)
+        # Update the csv file with the new information
+        # self.update_csv_file()
+        return not errors
+
+    def arrangement_rows(self, updates: dict):
+        """
+        Make the rows of the arrangement sheet from the arrangement of 'ready_arrangment'.
+        :param updates: The arrangement, the employees of each (shift, day)
+        :return: Dictionary of row number and the JSON body of the row
+        """
+        rows = {}
+        for shift in range(3):
+            rows[shift + 2] = {
+                'chart1': {
+                    'shift': shift_name(shift),
+                    'ראשון': updates.get((shift, 0)),
+                    'שני': updates.get((shift, 1)),
+                    'שלישי': updates.get((shift, 2)),
+                    'רביעי': updates.get((shift, 3)),
+                    'חמישי': updates.get((shift, 4)),
+                    'שישי': updates.get((shift, 5)),
+                    'שבת': updates.get((shift, 6))
+                }
+            }
+        return rows
 
     def ready_arrangment(self):
         """
@@ -287,7 +798,8 @@ class SecurityDepartment:
                 count_12 = 0
                 shift_employees = []  # Employyes in the shift to be added
                 # Add the employees to the shift
-                for employee in self.final_arrangement[day][shift]:
+                for employee in sorted(self.final_arrangement[day][shift],
+                                       key=SecurityGuard.SecurityGuard.get_id_number):
                     name_line = employee.get_name()
                     # Try to fill the noon shift shortage with 12-hour shifts
                     if shift == 0 and employee in noon_shortages[day][0]:  # Morning shift
@@ -302,10 +814,14 @@ class SecurityDepartment:
                 # Update the number of 12-hour shifts in the shift
                 shifts_with_12[day][shift] = count_12
 
+                # The number of employees the shift needs, from the staffing rules
+                required = self.rules.required[day * 3 + shift]
+
                 # Add the warning output to the shift employees
                 if shift == 1:
                     e_in_shift = len(self.final_arrangement[day][1])
-                    if (e_in_shift + shifts_with_12[day][0] == 5) and (e_in_shift + shifts_with_12[day][2] == 5):
+                    if (e_in_shift + shifts_with_12[day][0] == required) and (
+                            e_in_shift + shifts_with_12[day][2] == required):
                         shift_employees.append('')
                     else:
                         shift_employees.append(list(self.warning_output[day][shift])[0])
@@ -317,9 +833,9 @@ class SecurityDepartment:
                     warnings_amount += 1
                 # -----------------------------------------------------
                 if shift != 1:
-                    employee_shortness += (5 - len(self.final_arrangement[day][shift]))
+                    employee_shortness += (required - len(self.final_arrangement[day][shift]))
                 if shift == 1:
-                    employee_shortness += (5 - len(self.final_arrangement[day][1]) -
+                    employee_shortness += (required - len(self.final_arrangement[day][1]) -
                                            min(shifts_with_12[day][0], shifts_with_12[day][2]))
                 # -----------------------------------------------------
 
@@ -333,54 +849,71 @@ class SecurityDepartment:
         The function assigns the shifts to the employees by the following conditions:
         1. The employee can't work in a morning shift if he worked on the previous day at night.
         2. The employee can't work in a night shift if he works in the next day in the morning.
+        The rest, shabat and night rules are the compiled tables of 'rules'.
         :param employee: Employee object
         :param day: The day in number
         :param shift: The shift in number
         :return: True if the employee can work in the shift by the following conditions, False otherwise
         """
+        slot = day * 3 + shift
+        bit = 1 << slot
+        # The attributes of the employee are read from the arrays of the roster by his guard number
+        roster = self.roster
+        gid = employee.get_guard_number()
 
         # The employee passed the maximum shabat shifts amount
-        shabat_conditions = {(5, 1), (5, 2), (6, 0), (6, 1)}
-        if (day, shift) in shabat_conditions:
-            if employee.get_shabat_counter() >= self.MAX_SHABAT_SHIFTS:
-                return False
-
-        # Morning shift
-        if shift == 0:
-            # The employee work in shabat night, so he can't work in Sunday morning.
-            if day == 0 and employee.is_work_shabat_night():
-                return False
-            # Need a rest of at least one shift
-            if (employee.get_shift(day, 1) or employee.get_shift(day, 2) or
-                    (day != 0 and employee.get_shift(day - 1, 2))):
-                return False
-
-        # Evening shift
-        elif shift == 1:
-            # Need a rest of at least one shift
-            if employee.get_shift(day, 0) or employee.get_shift(day, 2):
-                return False
-
-        # Night shift
-        elif shift == 2:
-            if employee.get_nights_counter() >= self.MAX_NIGHTS_SHIFTS:
-                return False
-            # Need a rest of at least one shift
-            if (employee.get_shift(day, 0) or employee.get_shift(day, 1) or
-                    (day != 6 and employee.get_shift(day + 1, 0))):
-                return False
+        if self.rules.shabat_mask & bit and roster.shabat_counter[gid] >= self.MAX_SHABAT_SHIFTS:
+            return False
+
+        # The employee work in shabat night, so he can't work in Sunday morning.
+        if self.rules.shabat_night_mask & bit and roster.work_shabat_night[gid]:
+            return False
+
+        # The employee passed the maximum night shifts amount
+        if self.rules.nights_mask & bit and roster.nights_counter[gid] >= self.MAX_NIGHTS_SHIFTS:
+            return False
+
+        # Need a rest of at least one shift, the shifts that block this shift are compiled in the rules
+        shifts_mask = roster.shifts[gid]
+        if shifts_mask & self.rules.conflicts[slot]:
+            return False
 
         # The employee already has the number of shifts he wants
-        if employee.get_num_of_optimal_shifts() == employee.get_num_of_current_shifts():
+        num_of_current_shifts = shifts_mask.bit_count()
+        if roster.optimal[gid] == num_of_current_shifts:
             return False
 
         # The employee passed the maximum work hours amount
-        if employee.get_num_of_current_shifts() >= self.MAX_SHIFTS:
+        if num_of_current_shifts >= self.MAX_SHIFTS:
             return False
 
         # All the conditions are met
         return True
 
+    def rejection_rule(self, employee, day, shift):
+        """
+        Find the rule of 'filter_employees' that rejects the employee from the shift, the rules are checked in the
+        same order. Used by the instrumentation, 'filter_employees' stays the fast check of the greedy.
+        :param employee: Employee object
+        :param day: The day in number
+        :param shift: The shift in number
+        :return: The name of the rule in REJECTION_RULES, None if the employee can work in the shift
+        """
+        bit = 1 << (day * 3 + shift)
+        if self.rules.shabat_mask & bit and employee.get_shabat_counter() >= self.MAX_SHABAT_SHIFTS:
+            return 'shabat_cap'
+        if self.rules.shabat_night_mask & bit and employee.is_work_shabat_night():
+            return 'shabat_night'
+        if self.rules.nights_mask & bit and employee.get_nights_counter() >= self.MAX_NIGHTS_SHIFTS:
+            return 'night_cap'
+        if employee.get_shifts_mask() & self.rules.conflicts[day * 3 + shift]:
+            return 'rest'
+        if employee.get_num_of_optimal_shifts() == employee.get_num_of_current_shifts():
+            return 'target_reached'
+        if employee.get_num_of_current_shifts() >= self.MAX_SHIFTS:
+            return 'max_shifts'
+        return None
+
     def assign_shift(self, employees_list, day, shift):
         """
         Assign to the shift the employees in the list while verifying that: at least one officer,
@@ -390,16 +923,14 @@ class SecurityDepartment:
         :param shift: the shift in number
         :return: warning_output - if the shift is not optimal
         """
-        # Sort the employees by the number of optimal shifts they want to work, Shuffle the list before sorting to avoid
-        # the same order of the employees as they registered in the sheets document
-        shuffle(employees_list[0])
-        officers_list = employees_list[0]
-
-        shuffle(employees_list[1])
-        guards_list = employees_list[1]
+        # The number of employees the shift needs, from the staffing rules
+        required = self.rules.required[day * 3 + shift]
 
-        # The Warning output of the method
-        warning_output = ""
+        # Shuffle the lists to avoid the same order of the employees as they registered in the sheets document.
+        # Only the first employees of the lists can be assigned (two officers and up to 'required' of each list),
+        # so only they are drawn, in a random order: the cost is the size of the shift and not of the lists
+        officers_list = self.rng.sample(employees_list[0], min(max(required, 2), len(employees_list[0])))
+        guards_list = self.rng.sample(employees_list[1], min(required, len(employees_list[1])))
 
         officers_amount = len(officers_list)
 
@@ -419,17 +950,16 @@ class SecurityDepartment:
             self.final_arrangement[day][shift].add(officers_list[0])
 
         # Officers hava drive permission and height permission
+        officers_in_shift = len(self.final_arrangement[day][shift])
         count_drivers = len(self.final_arrangement[day][shift])
         count_height_permissions = len(self.final_arrangement[day][shift])
 
-        # Assign the rest of the employees to the shift, up to 5 employees total.
+        # Assign the rest of the employees to the shift, up to the required number of employees.
         for employee in guards_list:
             # Count the number of employees in the shift
             count_shift = len(self.final_arrangement[day][shift])
 
-            # Shabat morning need four employees
-            if ((day == 6 and shift == 0 and count_shift == 4) or
-                    (count_shift == self.MAX_EMPLOYEE_PER_SHIFT)):
+            if count_shift >= required:
                 break
 
             # Add the employee to the shift
@@ -443,11 +973,7 @@ class SecurityDepartment:
                 count_height_permissions += 1
 
         # If the shift is not full, try to add more officers
-        shortage = self.MAX_EMPLOYEE_PER_SHIFT - len(self.final_arrangement[day][shift])  # The amount of shortage
-
-        # Shabat morning need one less employee
-        if day == 6 and shift == 0:
-            shortage -= 1
+        shortage = required - len(self.final_arrangement[day][shift])  # The amount of shortage
 
         if shortage > 0:
             # We need to have at least 3 officers in the list, because if we had 2 officers,
@@ -459,47 +985,110 @@ class SecurityDepartment:
                     employee = officers_list[i]
                     employee.add_shift(day, shift)
                     self.final_arrangement[day][shift].add(employee)
+                    officers_in_shift += 1
                     count_drivers += 1
                     count_height_permissions += 1
 
-        # Check if the shift is optimal
-        if officers_amount == 0:
-            warning_output += "* No Officers *\n"
-            return warning_output
+        # Check if the shift is optimal by the staffing rules
+        return self.rules.shift_warning(day, shift, len(self.final_arrangement[day][shift]), officers_in_shift,
+                                        count_drivers, count_height_permissions)
 
-        if day == 6 and shift == 0:
-            if len(self.final_arrangement[day][shift]) < 4:
-                warning_output += "* Lack of Employees *\n"
-                return warning_output
-        else:
-            if len(self.final_arrangement[day][shift]) < 5:
-                warning_output += "* Lack of Employees *\n"
-                return warning_output
+    def shift_warning(self, day, shift):
+        """
+        Check the employees of the shift in the final arrangement by the same staffing rules as 'assign_shift':
+        at least one officer, a full shift, at least two drivers and at least two employees with height permission.
+        Officers have drive permission and height permission.
+        :param day: the day in number
+        :param shift: the shift in number
+        :return: The warning output of the shift, an empty string if the shift is optimal
+        """
+        roster = self.roster
+        officers_amount = count_drivers = count_height_permissions = 0
+        for employee in self.final_arrangement[day][shift]:
+            gid = employee.get_guard_number()
+            if roster.is_officer[gid]:
+                officers_amount += 1
+                count_drivers += 1
+                count_height_permissions += 1
+                continue
+            count_drivers += roster.can_drive[gid]
+            count_height_permissions += roster.has_height[gid]
+
+        return self.rules.shift_warning(day, shift, len(self.final_arrangement[day][shift]), officers_amount,
+                                        count_drivers, count_height_permissions)
 
-        if count_drivers < 2:
-            warning_output += "* No Enough Drivers *\n"
-            return warning_output
+    def current_counters(self):
+        """
+        The counters each guard carries into this week.
+        :return: Dictionary of eID and (Shabat_Count, Shabat_Night)
+        """
+        return {employee.get_id_number(): (employee.get_shabat_counter(), int(employee.is_work_shabat_night()))
+                for employee in self.guards_objects_list}
+
+    def next_counters(self):
+        """
+        The counters each guard carries into the next week after the final arrangement, like 'update_csv_file'
+        but without changing the guards: the shabat counter grows if he works in shabat and is reset otherwise,
+        and the shabat night is on if he works in it.
+        :return: Dictionary of eID and (Shabat_Count, Nights_Count, Shabat_Night)
+        """
+        counters = {}
+        for employee in self.guards_objects_list:
+            mask = employee.get_shifts_mask()
+            shabat_counter = employee.get_shabat_counter() + 1 if mask & self.rules.shabat_mask else 0
+            counters[employee.get_id_number()] = (shabat_counter, (mask & self.rules.nights_mask).bit_count(),
+                                                  int(bool(mask & self.rules.shabat_night_work_mask)))
+        return counters
 
-        if count_height_permissions < 2:
-            warning_output += "* No Enough Height permissions *\n"
-            return warning_output
+    def set_counters(self, counters):
+        """
+        Set the counters the guards carry from the former week, for a schedule of several weeks.
+        :param counters: Dictionary of eID and (Shabat_Count, Shabat_Night), the guards that are not in it keep their
+        counters
+        """
+        changed = False
+        for employee in self.guards_objects_list:
+            if employee.get_id_number() in counters:
+                shabat_counter, shabat_night = counters[employee.get_id_number()]
+                if (shabat_counter, bool(shabat_night)) != (employee.get_shabat_counter(),
+                                                            employee.is_work_shabat_night()):
+                    employee.set_counters(shabat_counter, shabat_night)
+                    changed = True
+        # The shabat counters changed, the NumPy engine is built again on its next use
+        if changed:
+            self.vector_engine = None
+
+    def update_csv_file(self, week=None):
+        """
+        Update the csv file with the new information, or the store if there is one.
+        :param week: The week of the counters in the history of the store, None for the week of the department
+        """
+        # The new counters of each employee: Shabat_Count, Nights_Count and Shabat_Night
+        counters = {employee.get_id_number(): (employee.update_shabat_counter(), employee.count_weekly_nights(),
+                                               int(employee.get_shift(6, 2)))
+                    for employee in self.guards_objects_list}
+        # The shabat counters changed, the NumPy engine is built again on its next use
+        self.vector_engine = None
+
+        # Update all the employees in one transaction
+        if self.store is not None:
+            self.store.update_counters(self.department_name, counters, week or self.week)
+            return
 
-    def update_csv_file(self):
-        """ Update the csv file with the new information """
         try:
-            df = pd.read_csv('employee_data.csv')
+            session = CSVSession(self.csv_file_path)
 
         except FileNotFoundError:
-            raise FileNotFoundError("The file 'employee_data.csv' was not found.")
+            raise FileNotFoundError(f"The file '{self.csv_file_path}' was not found.")
 
-        for employee in self.guards_objects_list:
-            # Update the employee info
-            df.loc[df['eID'] == employee.get_id_number(), 'Shabat_Count'] = employee.update_shabat_counter()
-            df.loc[df['eID'] == employee.get_id_number(), 'Nights_Count'] = employee.count_weekly_nights()
-            df.loc[df['eID'] == employee.get_id_number(), 'Shabat_Night'] = int(employee.get_shift(6, 2))
+        # Update the employee info, the employees that are not in the department keep their values
+        for e_id, (shabat_counter, nights_counter, shabat_night) in counters.items():
+            if e_id in session.rows:
+                session.rows[e_id].update({'Shabat_Count': shabat_counter, 'Nights_Count': nights_counter,
+                                           'Shabat_Night': bool(shabat_night)})
 
-        # Save the new data to the csv file
-        df.to_csv('employee_data.csv', index=False)
+        # Save the new data to the csv file, at once
+        session.commit()
 
     def check_noon_shortage(self, day):
         """
@@ -513,8 +1102,8 @@ class SecurityDepartment:
         # Get the noon shift
         noon_shift = self.final_arrangement[day][1]
 
-        # Set the shotage of employees in the noon shift
-        missing_count = self.MAX_EMPLOYEE_PER_SHIFT - len(noon_shift)
+        # Set the shotage of employees in the noon shift, by the staffing rules
+        missing_count = self.rules.required[day * 3 + 1] - len(noon_shift)
 
         # Find potential replacements from morning (0) and night (2) shifts
         replacements = ([], [])  # [morning, night]
@@ -523,8 +1112,9 @@ class SecurityDepartment:
         if missing_count > 0:
 
             # Get the morning and night shifts
-            morning_shift = self.final_arrangement[day][0]
-            night_shift = self.final_arrangement[day][2]
+            # Sorted by ID so the same arrangement always gives the same replacements
+            morning_shift = sorted(self.final_arrangement[day][0], key=SecurityGuard.SecurityGuard.get_id_number)
+            night_shift = sorted(self.final_arrangement[day][2], key=SecurityGuard.SecurityGuard.get_id_number)
 
             # Find replacements from the morning shift
             for employee in morning_shift:
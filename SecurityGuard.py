@@ -1,13 +1,18 @@
 from Shift import Shift
+from GuardRoster import GuardRoster
 
 
 class SecurityGuard:
     """
     This class represents a security guard in the company.
+    The guard is a view of one guard number of a GuardRoster, all the attributes are kept in the arrays of the
+    roster. There is one view for each guard, so guards are compared and hashed by identity.
     """
 
+    __slots__ = ('__roster', '__gid')
+
     def __init__(self, name, id_number, is_officer, has_height_permission, can_drive,
-                 shabat_counter=0, nights_counter=0, work_shabat_night=False):
+                 shabat_counter=0, nights_counter=0, work_shabat_night=False, roster=None):
         """ This class represents a security guard in the company. The class has the following attributes:
             :param name: The name of the guard - string
             :param id_number: The ID number of the guard - 5 digits number
@@ -18,96 +23,133 @@ class SecurityGuard:
             :param shabat_counter: The number of shabat times the guard worked in a row.
                    after 3 shabat weeks need a break - integer
             :param nights_counter: The number of nights the guard worked in the last week.
+            :param roster: The GuardRoster of the department the guard is added to, None for a roster of its own
         """
         # Validate the input parameters
         validate_guard_input(name, id_number, is_officer, has_height_permission, can_drive, shabat_counter,
                              nights_counter, work_shabat_night)
-        self.__name = name
-        self.__id_number = id_number
-        self.__is_officer = is_officer
-        self.__has_height_permission = has_height_permission
-        self.__can_drive = can_drive
-        self.__shabat_counter = shabat_counter
-        self.__nights_counter = nights_counter
-        self.__work_shabat_night = work_shabat_night
-        self.__optimal_num_of_shifts = 0  # How many shifts the employee wants to work, initial from a sheets document
-        self.__shifts = Shift()  # Object of the class Shift that represents the shifts of the guard in the week.
+        self.__roster = roster if roster is not None else GuardRoster()
+        # The stable number of the guard in the roster, the index of its attributes in the arrays
+        self.__gid = self.__roster.add(self, name, id_number, is_officer, has_height_permission, can_drive,
+                                       shabat_counter, nights_counter, work_shabat_night)
+
+    def get_guard_number(self):
+        """ This method returns the number of the guard in its roster."""
+        return self.__gid
 
     def reset_all_shifts(self):
         """ This method resets all the shifts of the guard."""
-        self.__shifts.reset_all_shifts()
+        self.__roster.shifts[self.__gid] = 0
 
     def add_shift(self, day, shift):
-        """ This method adds a shift to the guard using the attribute self.shifts.
+        """ This method adds a shift to the guard.
             The method also updates the counters of the guard.
         :param day: The day of the shift - integer between zero and 6 (0 - Sunday, 1 - Monday, etc.)
         :param shift: The shift of the day - integer between 0 and 2 (0 - morning, 1 - evening, 2 - night)
         """
         # Assign the shift
-        self.__shifts.assign(day, shift)
+        self.__roster.shifts[self.__gid] |= Shift.bit(day, shift)
 
         # Update the night counter
         if shift == 2:
-            self.__nights_counter += 1
+            self.__roster.nights_counter[self.__gid] += 1
+
+    def remove_shift(self, day, shift):
+        """ This method removes a shift from the guard and updates the counters of the guard.
+        :param day: The day of the shift - integer between zero and 6 (0 - Sunday, 1 - Monday, etc.)
+        :param shift: The shift of the day - integer between 0 and 2 (0 - morning, 1 - evening, 2 - night)
+        """
+        bit = Shift.bit(day, shift)
+        if not self.__roster.shifts[self.__gid] & bit:
+            return
+
+        # Unassign the shift
+        self.__roster.shifts[self.__gid] &= ~bit
+
+        # Update the night counter
+        if shift == 2:
+            self.__roster.nights_counter[self.__gid] -= 1
+
+    def set_shifts(self, shifts_mask, nights_counter):
+        """ This method sets all the shifts of the guard and the night counter, used to restore a snapshot.
+        :param shifts_mask: The shifts as a 21-bit integer, bit (day * 3 + shift) for each shift
+        :param nights_counter: The night counter of the guard
+        """
+        self.__roster.shifts[self.__gid] = Shift.validate_mask(shifts_mask)
+        self.__roster.nights_counter[self.__gid] = nights_counter
+
+    def set_counters(self, shabat_counter, work_shabat_night):
+        """ This method sets the counters the guard carries from the former week.
+        :param shabat_counter: The number of shabat times the guard worked in a row - integer between 0 and 3
+        :param work_shabat_night: True if the guard worked in the shabat night of the former week - boolean
+        """
+        if not isinstance(shabat_counter, int) or not (0 <= shabat_counter <= 3):
+            raise ValueError("Shabat counter must be an integer between 0 and 3.")
+        self.__roster.shabat_counter[self.__gid] = shabat_counter
+        self.__roster.work_shabat_night[self.__gid] = bool(work_shabat_night)
 
     def reset_nigth_counter(self):
         """ This method resets the night counter of the guard."""
-        self.__nights_counter = 0
+        self.__roster.nights_counter[self.__gid] = 0
 
     def get_shift(self, day, shift):
         """ This method return if the guard worked in the given day and shift."""
-        return self.__shifts.get_shift(day, shift)
+        return bool(self.__roster.shifts[self.__gid] & Shift.bit(day, shift))
+
+    def get_shifts_mask(self):
+        """ This method returns the shifts of the guard as a 21-bit integer, bit (day * 3 + shift) for each shift."""
+        return self.__roster.shifts[self.__gid]
 
     def set_optimal_num_of_shifts(self, num):
         """ This method set the optimal amounts of shifts the guard wants to work this week."""
         if 0 <= num <= 6:
-            self.__optimal_num_of_shifts = int(num)
+            self.__roster.optimal[self.__gid] = int(num)
         elif num > 6:
-            self.__optimal_num_of_shifts = 6
+            self.__roster.optimal[self.__gid] = 6
 
     def get_num_of_optimal_shifts(self):
         """ This method returns the optimal amounts of shifts the guard wants to work this week."""
-        return self.__optimal_num_of_shifts
+        return self.__roster.optimal[self.__gid]
 
     def get_num_of_current_shifts(self):
         """ This method returns the number of shifts the guard already got."""
-        return self.__shifts.get_shifts_amount()
+        return self.__roster.shifts[self.__gid].bit_count()
 
     def get_nights_counter(self):
         """ This method returns the number of nights the guard worked the last two weeks."""
-        return self.__nights_counter
+        return self.__roster.nights_counter[self.__gid]
 
     def get_shabat_counter(self):
         """ This method returns the number of shabat times the guard worked in a row."""
-        return self.__shabat_counter
+        return self.__roster.shabat_counter[self.__gid]
 
     def get_id_number(self):
         """ This method returns the ID number of the guard."""
-        return self.__id_number
+        return self.__roster.ids[self.__gid]
 
     def get_name(self):
         """ This method returns the name of the guard."""
-        return self.__name
+        return self.__roster.names[self.__gid]
 
     def is_work_shabat_night(self):
         """ This method returns True if the guard work in shabat night, False otherwise."""
-        return self.__work_shabat_night
+        return self.__roster.work_shabat_night[self.__gid] == 1
 
     def is_allowed_to_drive(self):
         """ This method returns True if the guard has a driving approval, False otherwise."""
-        return self.__can_drive
+        return self.__roster.can_drive[self.__gid] == 1
 
     def is_allowed_to_work_on_height(self):
         """ This method returns True if the guard has a permission to work on height, False otherwise."""
-        return self.__has_height_permission
+        return self.__roster.has_height[self.__gid] == 1
 
     def is_officer(self):
         """ This method returns True if the guard is an officer, False otherwise."""
-        return self.__is_officer
+        return self.__roster.is_officer[self.__gid] == 1
 
     def count_weekly_nights(self):
         """ This method returns the number of nights the guard worked this week."""
-        return self.__shifts.count_nights()
+        return (self.__roster.shifts[self.__gid] & Shift.NIGHTS_MASK).bit_count()
 
     def update_shabat_counter(self):
         """
@@ -115,19 +157,19 @@ class SecurityGuard:
         if he didn't work on shabat, reset the shabat counter to zero.
         :return :shabat_counter - int
         """
-        if (self.__shifts.get_shift(5, 1) or
-                self.__shifts.get_shift(5, 2) or
-                self.__shifts.get_shift(6, 0) or
-                self.__shifts.get_shift(6, 1)):
-            self.__shabat_counter += 1
+        if (self.get_shift(5, 1) or
+                self.get_shift(5, 2) or
+                self.get_shift(6, 0) or
+                self.get_shift(6, 1)):
+            self.__roster.shabat_counter[self.__gid] += 1
         else:
-            self.__shabat_counter = 0
+            self.__roster.shabat_counter[self.__gid] = 0
 
-        return self.__shabat_counter
+        return self.__roster.shabat_counter[self.__gid]
 
     def __str__(self):
         """ This method returns a string representation of the guard."""
-        return self.__name
+        return self.get_name()
 
 
 def validate_guard_input(name, id_number, is_officer, has_height_permission, can_drive, shabat_counter, nights_counter,
@@ -0,0 +1,208 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import threading
+import time
+
+
+class SheetyClient:
+    """
+    Client of the Sheety API of the department sheets.
+    All the requests go through one pooled session with a timeout, and are retried with exponential backoff
+    on connection errors, timeouts and on 429 / 5xx responses. GET and PUT are idempotent, so a retry is safe.
+    The rows of the arrangement are sent concurrently. The latency of each request is kept in 'metrics'.
+    requests is imported on the first request, so a department that doesn't use the sheets doesn't load it.
+    The rows posted last are kept (in the file 'state_path' if given, so they are kept between runs), and
+    'put_changed_rows' sends only the rows that changed since then. The saved requests and bytes are kept in 'savings'.
+    """
+
+    # The response statuses that are worth another attempt
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    # The clients of several sheets may share one state file, each one writes it under the lock
+    STATE_LOCK = threading.Lock()
+
+    def __init__(self, endpoint_get, token_get, endpoint_put, token_put, timeout=10.0, retries=3, backoff=0.5,
+                 max_workers=3, state_path=None):
+        """
+        :param endpoint_get: The URL of the availability sheet
+        :param token_get: The bearer token of the availability sheet
+        :param endpoint_put: The URL of the arrangement sheet, the row number is added to it
+        :param token_put: The bearer token of the arrangement sheet
+        :param timeout: The timeout of each attempt in seconds
+        :param retries: The number of retries after the first attempt
+        :param backoff: The wait before the first retry in seconds, doubled on each retry
+        :param max_workers: The number of rows sent at the same time
+        :param state_path: The path of a JSON file of the rows posted last to each arrangement sheet,
+        None to keep them only in memory
+        """
+        self.endpoint_get = endpoint_get
+        self.token_get = token_get
+        self.endpoint_put = endpoint_put
+        self.token_put = token_put
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_workers = max_workers
+        self.state_path = state_path
+
+        # One record for each request: method, url, status, attempts and latency in seconds
+        self.metrics = []
+        # The rows posted last, row number and JSON body, read from 'state_path' on the first post
+        self.posted_rows = None
+        # The totals of 'put_changed_rows': the rows sent and skipped and their bytes
+        self.savings = {'requests_sent': 0, 'requests_saved': 0, 'bytes_sent': 0, 'bytes_saved': 0}
+        self.__session = None
+
+    def __getstate__(self):
+        """ The session is not copied to other processes, each process opens its own."""
+        state = self.__dict__.copy()
+        state['_SheetyClient__session'] = None
+        return state
+
+    def get_session(self):
+        """ Returns the pooled session of the client, opened on the first request."""
+        if self.__session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            self.__session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+            self.__session.mount('http://', adapter)
+            self.__session.mount('https://', adapter)
+        return self.__session
+
+    def close(self):
+        """ Close the connections of the session."""
+        if self.__session is not None:
+            self.__session.close()
+            self.__session = None
+
+    def fetch(self):
+        """
+        Read the availability sheet.
+        :return: The JSON data of the sheet
+        """
+        response = self.request('GET', self.endpoint_get, self.token_get)
+        data = response.json()
+        response.close()
+        return data
+
+    def put_rows(self, rows: dict):
+        """
+        Update rows of the arrangement sheet concurrently.
+        Every row is sent even if another row fails, so a failure doesn't stop the rest of the schedule.
+        :param rows: Dictionary of row number and the JSON body of the row
+        :return: Dictionary of row number and the exception of the row, empty if all the rows were updated
+        """
+        import requests
+
+        def put_row(row):
+            response = self.request('PUT', f"{self.endpoint_put}/{row}", self.token_put, rows[row])
+            response.close()
+
+        errors = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {row: executor.submit(put_row, row) for row in rows}
+            for row, future in futures.items():
+                try:
+                    future.result()
+                except requests.exceptions.RequestException as e:
+                    errors[row] = e
+        return errors
+
+    def load_posted_rows(self):
+        """ Returns the rows posted last to the arrangement sheet, read from 'state_path' on the first call."""
+        if self.posted_rows is None:
+            self.posted_rows = {}
+            if self.state_path is not None and os.path.exists(self.state_path):
+                try:
+                    with open(self.state_path, encoding='utf-8') as file:
+                        state = json.load(file)
+                    # JSON keys are strings
+                    self.posted_rows = {int(row): body for row, body in state.get(self.endpoint_put, {}).items()}
+                except (OSError, ValueError) as e:
+                    print(f"Error reading the posted rows, all the rows are posted: {e}")
+        return self.posted_rows
+
+    def save_posted_rows(self):
+        """ Write the rows posted last to 'state_path', next to the rows of the other arrangement sheets."""
+        if self.state_path is None:
+            return
+        with self.STATE_LOCK:
+            state = {}
+            if os.path.exists(self.state_path):
+                try:
+                    with open(self.state_path, encoding='utf-8') as file:
+                        state = json.load(file)
+                except (OSError, ValueError):
+                    state = {}
+            state[self.endpoint_put] = {str(row): body for row, body in sorted(self.posted_rows.items())}
+            # Write through a temporary file, so a crash doesn't leave a broken file
+            temp_path = f"{self.state_path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                json.dump(state, file, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.state_path)
+
+    def put_changed_rows(self, rows: dict):
+        """
+        Update only the rows of the arrangement sheet that changed since they were posted last.
+        Nothing is sent if no row changed. A row that failed is sent again on the next post.
+        :param rows: Dictionary of row number and the JSON body of the row
+        :return: Dictionary of row number and the exception of the row, empty if all the changed rows were updated
+        """
+        posted_rows = self.load_posted_rows()
+        changed = {row: body for row, body in rows.items() if posted_rows.get(row) != body}
+
+        # The size of the body of each row, as it's sent by 'requests'
+        sizes = {row: len(json.dumps(body).encode('utf-8')) for row, body in rows.items()}
+        self.savings['requests_sent'] += len(changed)
+        self.savings['requests_saved'] += len(rows) - len(changed)
+        self.savings['bytes_sent'] += sum(sizes[row] for row in changed)
+        self.savings['bytes_saved'] += sum(size for row, size in sizes.items() if row not in changed)
+        if not changed:
+            return {}
+
+        errors = self.put_rows(changed)
+        for row, body in changed.items():
+            if row in errors:
+                # The row may be changed or not, so it's not skipped next time
+                posted_rows.pop(row, None)
+            else:
+                posted_rows[row] = body
+        self.save_posted_rows()
+        return errors
+
+    def request(self, method, url, token, body=None):
+        """
+        Send a request with retries.
+        :param method: 'GET' or 'PUT'
+        :param url: The URL of the request
+        :param token: The bearer token of the request
+        :param body: The JSON body of the request, None for no body
+        :return: The response of the request
+        :raises requests.exceptions.RequestException: If the last attempt failed
+        """
+        import requests
+        session = self.get_session()
+        start = time.perf_counter()
+        status = None
+        attempt = 0
+        try:
+            while True:
+                attempt += 1
+                try:
+                    response = session.request(method, url, json=body, timeout=self.timeout,
+                                               headers={"Authorization": f"Bearer {token}"})
+                    status = response.status_code
+                    if status not in self.RETRY_STATUSES or attempt > self.retries:
+                        response.raise_for_status()
+                        return response
+                    response.close()
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                    if attempt > self.retries:
+                        raise
+
+                # Wait before the next attempt, twice as long each time
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+        finally:
+            self.metrics.append({'method': method, 'url': url, 'status': status, 'attempts': attempt,
+                                 'latency': time.perf_counter() - start})
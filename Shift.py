@@ -1,26 +1,24 @@
-import pandas as pd
-
-
 class Shift:
     """
     Represents a single work shift for a security guard.
+    The 21 shifts of the week are kept as bits of one integer, bit number (day * 3 + shift)
+    is set when the guard is assigned to that shift.
     """
 
+    # Mask of all the night shifts in the week (shift 2 of each day)
+    NIGHTS_MASK = sum(1 << (day * 3 + 2) for day in range(7))
+
     def __init__(self):
         """
         Initializes a Shift object.
         """
-        self.__shifts_df = pd.DataFrame({'day': [], 'shift': [], 'is_assigned': []})
-
         # initial shifts to False
-        for day in range(7):
-            for shift in range(3):
-                temp = pd.DataFrame({'day': day, 'shift': shift, 'is_assigned': False}, index=[0])
-                self.__shifts_df = pd.concat([self.__shifts_df, temp], ignore_index=True)
+        self.__shifts_mask = 0
 
-    def assign(self, day, shift):
+    @staticmethod
+    def bit(day, shift):
         """
-        Marks the shift as assigned.
+        Returns the bit of the shift in the mask, bit (day * 3 + shift).
         """
         if not (0 <= day <= 6):
             raise ValueError("Invalid day. Day must be an integer between 0 and 6.")
@@ -28,49 +26,62 @@ class Shift:
         if not (0 <= shift <= 2):
             raise ValueError("Invalid shift type. Shift type must be 'morning', 'evening', or 'night'.")
 
-        self.__shifts_df.loc[
-            (self.__shifts_df['day'] == day) & (self.__shifts_df['shift'] == shift), 'is_assigned'] = True
+        return 1 << (day * 3 + shift)
+
+    def assign(self, day, shift):
+        """
+        Marks the shift as assigned.
+        """
+        self.__shifts_mask |= self.bit(day, shift)
 
     def unassign(self, day, shift):
         """
         Marks the shift as unassigned.
         """
-        if not (0 <= day <= 6):
-            raise ValueError("Invalid day. Day must be an integer between 0 and 6.")
-
-        if not (0 <= shift <= 2):
-            raise ValueError("Invalid shift type. Shift type must be 'morning', 'evening', or 'night'.")
-
-        self.__shifts_df.loc[
-            (self.__shifts_df['day'] == day) & (self.__shifts_df['shift'] == shift), 'is_assigned'] = False
+        self.__shifts_mask &= ~self.bit(day, shift)
 
     def get_shift(self, day, shift):
         """
-        Returns a formatted string representing the details of the shift, including assignment status
+        Returns True if the shift is assigned, False otherwise.
         """
-        if not (0 <= day <= 6):
-            raise ValueError("Invalid day. Day must be an integer between 0 and 6.")
-
-        if not (0 <= shift <= 2):
-            raise ValueError("Invalid shift type. Shift type must be 'morning', 'evening', or 'night'.")
-
-        return self.__shifts_df[
-            (self.__shifts_df['day'] == day) & (self.__shifts_df['shift'] == shift)]['is_assigned'].values[0]
+        return bool(self.__shifts_mask & self.bit(day, shift))
 
     def get_shifts_amount(self):
         """
-        Returns the number of shifts in the shifts DataFrame.
+        Returns the number of assigned shifts in the week.
         """
-        return self.__shifts_df['is_assigned'].sum()
+        return self.__shifts_mask.bit_count()
 
     def count_nights(self):
         """
-        Returns the number of night shifts in the shifts DataFrame.
+        Returns the number of assigned night shifts in the week.
+        """
+        return (self.__shifts_mask & self.NIGHTS_MASK).bit_count()
+
+    def get_mask(self):
+        """
+        Returns the assigned shifts as a 21-bit integer, bit (day * 3 + shift) is set for an assigned shift.
+        """
+        return self.__shifts_mask
+
+    def set_mask(self, shifts_mask):
+        """
+        Sets all the shifts from a 21-bit integer, bit (day * 3 + shift) is set for an assigned shift.
         """
-        return self.__shifts_df[self.__shifts_df['shift'] == 2]['is_assigned'].sum()
+        self.__shifts_mask = self.validate_mask(shifts_mask)
+
+    @staticmethod
+    def validate_mask(shifts_mask):
+        """
+        Returns the mask if it's a valid 21-bit mask of shifts.
+        """
+        if not (0 <= shifts_mask < 1 << 21):
+            raise ValueError("Invalid shifts mask. The mask must be an integer between 0 and 2 ** 21 - 1.")
+
+        return shifts_mask
 
     def reset_all_shifts(self):
         """
         Reset all shifts to False.
         """
-        self.__shifts_df['is_assigned'] = False
+        self.__shifts_mask = 0
@@ -0,0 +1,125 @@
+class IndexedHeap:
+    """
+    Binary min heap of items with keys, that knows the position of each item so the key of an item can be changed
+    (decrease-key or increase-key) in O(log n) without searching for it.
+    """
+
+    def __init__(self):
+        self.__heap = []  # [key, item] pairs
+        self.__position = {}  # item: index in the heap
+
+    def __len__(self):
+        return len(self.__heap)
+
+    def __contains__(self, item):
+        return item in self.__position
+
+    def items(self):
+        """ Returns a list of the items in the heap, in no order."""
+        return list(self.__position)
+
+    def push(self, item, key):
+        """ Add an item with its key, the item must not be in the heap."""
+        self.__heap.append([key, item])
+        self.__position[item] = len(self.__heap) - 1
+        self.__sift_up(len(self.__heap) - 1)
+
+    def pop(self):
+        """
+        Remove the item with the minimum key.
+        :return: The item and its key
+        """
+        key, item = self.__heap[0]
+        last = self.__heap.pop()
+        del self.__position[item]
+        if self.__heap:
+            self.__heap[0] = last
+            self.__position[last[1]] = 0
+            self.__sift_down(0)
+        return item, key
+
+    def update(self, item, key):
+        """ Change the key of an item in the heap."""
+        idx = self.__position[item]
+        old_key = self.__heap[idx][0]
+        self.__heap[idx][0] = key
+        if key < old_key:
+            self.__sift_up(idx)
+        else:
+            self.__sift_down(idx)
+
+    def __swap(self, i, j):
+        heap = self.__heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self.__position[heap[i][1]] = i
+        self.__position[heap[j][1]] = j
+
+    def __sift_up(self, idx):
+        heap = self.__heap
+        while idx > 0:
+            parent = (idx - 1) // 2
+            if heap[idx][0] >= heap[parent][0]:
+                break
+            self.__swap(idx, parent)
+            idx = parent
+
+    def __sift_down(self, idx):
+        heap = self.__heap
+        size = len(heap)
+        while True:
+            smallest = idx
+            for child in (2 * idx + 1, 2 * idx + 2):
+                if child < size and heap[child][0] < heap[smallest][0]:
+                    smallest = child
+            if smallest == idx:
+                break
+            self.__swap(idx, smallest)
+            idx = smallest
+
+
+class DynamicSlotOrder:
+    """
+    Orders the shifts of the greedy by the most constrained shift first: the shift with the fewest employees that
+    can still work in it by the rules of 'filter_employees', instead of the fewest employees that marked it.
+    Each assignment only takes employees out of the other shifts (rest rules, caps and targets), so after each
+    shift the remaining shifts of its employees are checked again and their counts are decreased in the heap.
+    On a tie the earlier day and shift comes first, like the static order.
+    """
+
+    def __init__(self, department):
+        """
+        :param department: SecurityDepartment object before the greedy, after 'reset_data_structure'
+        """
+        self.department = department
+        # The employees that can still work in each shift that is not assigned yet
+        self.eligible = {slot: {employee for employee in candidates if department.filter_employees(employee, *slot)}
+                         for slot, candidates in department.problem.candidates.items()}
+        self.heap = IndexedHeap()
+        for (day, shift), employees in self.eligible.items():
+            self.heap.push((day, shift), (len(employees), day, shift))
+
+    def __len__(self):
+        return len(self.heap)
+
+    def next_slot(self):
+        """
+        Remove the most constrained shift from the order.
+        :return: Day, shift and the number of employees that can work in it
+        """
+        (day, shift), (amount, _, _) = self.heap.pop()
+        return day, shift, amount
+
+    def update(self, employees):
+        """
+        Check again the shifts that are not assigned yet of the employees that were just assigned.
+        :param employees: The employees of the shift that was just assigned
+        """
+        for slot in self.heap.items():
+            eligible = self.eligible[slot]
+            removed = False
+            for employee in employees:
+                if employee in eligible and not self.department.filter_employees(employee, *slot):
+                    eligible.discard(employee)
+                    removed = True
+            if removed:
+                self.heap.update(slot, (len(eligible), *slot))
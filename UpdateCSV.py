@@ -1,10 +1,182 @@
-import pandas as pd
+from csv import DictReader, writer as csv_writer
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from SecurityGuard import validate_guard_input
+
+# The columns of the CSV file and their types
+COLUMNS = {'eID': int, 'E_Name': str, 'Is_Officer': bool, 'Has_Height': bool, 'Can_Drive': bool,
+           'Shabat_Night': bool, 'Shabat_Count': int, 'Nights_Count': int}
+
+
+def parse_value(col_name, value):
+    """
+    Convert a value read from a CSV file to the type of its column.
+    Booleans may be written as 1 / 0 or True / False.
+    """
+    if COLUMNS[col_name] is bool:
+        if isinstance(value, str):
+            value = value.strip()
+            if value.lower() in ('true', 'false'):
+                return value.lower() == 'true'
+        return bool(int(value))
+    if COLUMNS[col_name] is int:
+        return int(value)
+    return str(value).strip()
+
+
+def read_rows(csv_file_path):
+    """
+    Read the rows of a CSV file of the employees with the csv module.
+    :return: List of dictionaries with the columns of the CSV file, converted to their types, in the order of the file
+    :raises ValueError: If a value doesn't match the type of its column
+    """
+    with open(csv_file_path, newline='', encoding='utf-8') as file:
+        return [{col_name: parse_value(col_name, line[col_name]) for col_name in COLUMNS} for line in DictReader(file)]
+
+
+def validate_row(row):
+    """ Validate a full row of the CSV file by the rules of a SecurityGuard."""
+    validate_guard_input(row['E_Name'], row['eID'], row['Is_Officer'], row['Has_Height'], row['Can_Drive'],
+                         row['Shabat_Count'], row['Nights_Count'], row['Shabat_Night'])
+
+
+class CSVSession:
+    """
+    A batch of changes to the CSV file, written at once by 'commit'.
+    The rows are kept in memory by eID. Each change is validated when it's made, so a bad change raises an error
+    before anything is written. The file is written to a temporary file and then renamed over the CSV file,
+    so a crash never leaves a half-written file.
+    """
+
+    def __init__(self, csv_file_path):
+        self.csv_file_path = csv_file_path
+        self.rows = {}  # The rows by eID, in the order of the file
+        self.changes = 0  # The number of changes since the file was read
+
+        for row in read_rows(csv_file_path):
+            self.rows[row['eID']] = row
+
+    def add_new_employee(self, e_id, name, is_officer=False, shabat_night=False, has_height=True, can_drive=True,
+                         shabat_count=0, nights_count=0):
+        """ Add a new employee, the same parameters as 'UpdateCSV.add_new_employee'."""
+        row = {'eID': e_id, 'E_Name': name, 'Is_Officer': is_officer, 'Has_Height': has_height,
+               'Can_Drive': can_drive, 'Shabat_Night': shabat_night, 'Shabat_Count': shabat_count,
+               'Nights_Count': nights_count}
+        validate_row(row)
+        if e_id in self.rows:
+            raise ValueError(f"An employee with the ID {e_id} already exists.")
+        self.rows[e_id] = row
+        self.changes += 1
+
+    def bulk_import(self, rows):
+        """
+        Add many employees at once. All the rows are validated before any of them is added,
+        and all the errors are reported together.
+        :param rows: Iterable of dictionaries with the columns of the CSV file, the values may be strings
+        """
+        new_rows = {}
+        errors = []
+        for i, line in enumerate(rows):
+            try:
+                row = {col_name: parse_value(col_name, line[col_name]) for col_name in COLUMNS}
+                validate_row(row)
+                if row['eID'] in self.rows or row['eID'] in new_rows:
+                    raise ValueError(f"An employee with the ID {row['eID']} already exists.")
+                new_rows[row['eID']] = row
+            except KeyError as e:
+                errors.append(f"row {i}: missing column {e}")
+            except (TypeError, ValueError) as e:
+                errors.append(f"row {i}: {e}")
+
+        if errors:
+            raise ValueError("Invalid rows, nothing was imported:\n" + '\n'.join(errors))
+        self.rows.update(new_rows)
+        self.changes += len(new_rows)
+
+    def update_col_value(self, e_id, col_name, value):
+        """ Update a column value of an employee, the same parameters as 'UpdateCSV.update_col_value'."""
+        if col_name not in COLUMNS or col_name == 'eID':
+            raise ValueError(f"Unknown column {col_name}.")
+        if e_id not in self.rows:
+            raise ValueError(f"No employee with the ID {e_id}.")
+        row = dict(self.rows[e_id], **{col_name: value})
+        validate_row(row)
+        self.rows[e_id] = row
+        self.changes += 1
+
+    def delete_employee_info(self, e_id):
+        """ Delete the employees with the IDs in the list."""
+        missing = [eid for eid in e_id if eid not in self.rows]
+        if missing:
+            raise ValueError(f"No employees with the IDs {missing}.")
+        for eid in e_id:
+            del self.rows[eid]
+        self.changes += len(e_id)
+
+    def reset_col_counter(self, col_name):
+        """ Reset a column of all the employees to zero."""
+        if col_name not in ('Shabat_Count', 'Nights_Count', 'Shabat_Night'):
+            raise ValueError(f"The column {col_name} is not a counter.")
+        for row in self.rows.values():
+            row[col_name] = COLUMNS[col_name](0)
+        self.changes += 1
+
+    def commit(self):
+        """
+        Write all the rows into the CSV file at once, through a temporary file that replaces it.
+        The temporary file is synced to the disk and gets the permissions of the CSV file before it replaces it.
+        """
+        directory = os.path.dirname(os.path.abspath(self.csv_file_path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.csv.tmp')
+        try:
+            with os.fdopen(fd, 'w', newline='', encoding='utf-8') as file:
+                writer = csv_writer(file)
+                writer.writerow(COLUMNS)
+                for row in self.rows.values():
+                    # Booleans are written as 1 / 0, like the rest of the file
+                    writer.writerow([int(row[col_name]) if COLUMNS[col_name] is bool else row[col_name]
+                                     for col_name in COLUMNS])
+                file.flush()
+                os.fsync(file.fileno())
+            # 'mkstemp' makes the file readable only by its owner, keep the permissions of the CSV file
+            if os.path.exists(self.csv_file_path):
+                shutil.copymode(self.csv_file_path, temp_path)
+            os.replace(temp_path, self.csv_file_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        self.changes = 0
 
 
 class UpdateCSV:
+    """
+    Changes to the CSV file of the employees. Each method is one change, written at once through a CSVSession,
+    and 'session' batches many changes into one write.
+    """
+
     def __init__(self, csv_file_path):
         self.csv_file_path = csv_file_path
-        self.df = pd.read_csv(self.csv_file_path)
+
+    @property
+    def df(self):
+        """ The CSV file as a pandas DataFrame, pandas is imported only when it's used."""
+        import pandas as pd
+        return pd.read_csv(self.csv_file_path)
+
+    @contextmanager
+    def session(self):
+        """
+        Batch many changes into one atomic write of the CSV file:
+            with csv.session() as session:
+                session.add_new_employee(...)
+                session.reset_col_counter('Nights_Count')
+        The changes are written when the block ends, and discarded if the block raises an error.
+        """
+        session = CSVSession(self.csv_file_path)
+        yield session
+        session.commit()
 
     def add_new_employee(self, e_id, name, is_officer=False, shabat_night=False, has_height=True, can_drive=True,
                          shabat_count=0, nights_count=0):
@@ -19,64 +191,42 @@ class UpdateCSV:
         :param shabat_count: The amount of shabat times the employee worked in a row
         :param nights_count: The amount of nights the employee worked the last two weeks
         """
-        temp = {'eID': e_id, 'E_Name': name, 'Is_Officer': is_officer, 'Has_Height': has_height,
-                'Can_Drive': can_drive, 'Shabat_Night': shabat_night, 'Shabat_Count': shabat_count,
-                'Nights_Count': nights_count
-                }
-        # Add the new employee to the CSV file
-        self.df = pd.concat([self.df, pd.DataFrame(temp, index=[0])], ignore_index=True)
-        # Save the updated CSV file
-        self.df.to_csv(self.csv_file_path, index=False)
+        with self.session() as session:
+            session.add_new_employee(e_id, name, is_officer, shabat_night, has_height, can_drive, shabat_count,
+                                     nights_count)
 
     def update_col_value(self, e_id, col_name, value):
         """
         This method updates a specific column value in the CSV file.
+        The value is validated by the rules of a SecurityGuard.
         :param e_id: The employee ID
         :param col_name: The column name
         :param value: The new value
         """
-        # Check if the column name exists in the CSV file and validate the value type
-        if col_name in self.df.columns:
-            if (col_name == 'Is_Officer' or col_name == 'Has_Height' or col_name == 'Can_Drive' or
-                    col_name == 'Shabat_Night'):
-                if type(value) is not bool:
-                    raise ValueError(f"Expected a boolean value for {col_name} column.")
-            elif col_name == 'Shabat_Count' or col_name == 'Nights_Count':
-                if type(value) is not int:
-                    raise ValueError(f"Expected an integer value for {col_name} column.")
-            elif col_name == 'E_Name':
-                if type(value) is not str:
-                    raise ValueError(f"Expected a string value for {col_name} column.")
-
-        # Update the column value
-        self.df.loc[self.df['eID'] == e_id, col_name] = value
-        # Save the updated CSV file
-        self.df.to_csv(self.csv_file_path, index=False)
+        with self.session() as session:
+            session.update_col_value(e_id, col_name, value)
 
     def delete_employee_info(self, e_id):
         """
         This method deletes the employee information from the CSV file.
         """
-        # Delete the employee information
-        for eid in e_id:
-            self.df = self.df[self.df['eID'] != eid]
-        # Save the updated CSV file
-        self.df.to_csv(self.csv_file_path, index=False)
+        with self.session() as session:
+            session.delete_employee_info(e_id)
 
     def reset_col_counter(self, col_name):
         """
         This method resets the shabat counter for all employees.
         """
-        # Reset the column counter
-        self.df.loc[:, col_name] = 0
-        # Save the updated CSV file
-        self.df.to_csv(self.csv_file_path, index=False)
+        with self.session() as session:
+            session.reset_col_counter(col_name)
 
 
-csv = UpdateCSV('employee_data.csv')
-csv.reset_col_counter('Nights_Count')
-csv.reset_col_counter('Shabat_Count')
-csv.reset_col_counter('Shabat_Night')
+if __name__ == '__main__':
+    # Reset the counters of all the employees, run it at the start of a new period: python UpdateCSV.py
+    with UpdateCSV('employee_data.csv').session() as csv:
+        csv.reset_col_counter('Nights_Count')
+        csv.reset_col_counter('Shabat_Count')
+        csv.reset_col_counter('Shabat_Night')
 
-# # Add new employee to the department
-# csv.add_new_employee(42350, 'רון פחימה', False, False, True, True, 0, 0)
+    # # Add new employee to the department
+    # csv.add_new_employee(42350, 'רון פחימה', False, False, True, True, 0, 0)
@@ -0,0 +1,378 @@
+import numpy as np
+from SlotOrder import IndexedHeap
+
+# The warning outputs of a shift by their code in the batch mode, 0 for an optimal shift
+WARNINGS = ("", "* No Officers *\n", "* Lack of Employees *\n", "* No Enough Drivers *\n",
+            "* No Enough Height permissions *\n")
+
+
+def take_smallest(keys, take):
+    """
+    Select the 'take' smallest keys of each row.
+    :param keys: Float array (runs x guards), the keys of the guards that can't be selected are infinite
+    :param take: Integer array (runs), the number of keys to select in each row, not more than the finite keys
+    :return: Boolean array (runs x guards), True for the selected keys
+    """
+    most = min(int(take.max(initial=0)), keys.shape[1])
+    if most == 0:
+        return np.zeros(keys.shape, dtype=bool)
+    # Only the smallest 'most' keys of each row are sorted, the selected keys are the ones up to the threshold
+    smallest = np.sort(np.partition(keys, most - 1, axis=1)[:, :most], axis=1)
+    threshold = smallest[np.arange(len(keys)), np.clip(take, 1, most) - 1]
+    return (keys <= threshold[:, None]) & (take[:, None] > 0)
+
+
+class VectorEngine:
+    """
+    The greedy of 'do_work_arrangement' on NumPy arrays, experimental.
+    The shifts each guard marked, the shifts he got and his attributes are arrays in the order of
+    SchedulingProblem.guards (guards x 21 shifts), so the rules of 'filter_employees' are checked for all the
+    guards of a shift at once, and the counts of 'assign_shift' are masked sums.
+    The employees of each shift are drawn with the random generator of the department in the same order as the
+    object path, so the same seed gives the same arrangement. Only the employees that can be assigned are drawn,
+    so the Python work of a shift is the size of the shift and the rest is array operations: bench_vector_engine
+    measures it slower for small departments and about 1.4-1.8x faster from a few hundred guards.
+    The shifts of the guards are read and written through the arrays of the roster.
+    """
+
+    def __init__(self, department):
+        """
+        :param department: SecurityDepartment object, its problem must be compiled
+        """
+        self.department = department
+        guards = department.problem.guards
+        num_of_guards = len(guards)
+
+        # The shifts each guard marked, bit (day * 3 + shift) of the availability masks
+        masks = np.array(department.problem.availability, dtype=np.int64).reshape(num_of_guards, 1)
+        self.availability = (masks >> np.arange(21) & 1).astype(bool)
+
+        # Officers have drive permission and height permission
+        self.is_officer = np.array([guard.is_officer() for guard in guards], dtype=bool).reshape(num_of_guards)
+        self.can_drive = self.is_officer | np.array([guard.is_allowed_to_drive() for guard in guards],
+                                                    dtype=bool).reshape(num_of_guards)
+        self.has_height = self.is_officer | np.array([guard.is_allowed_to_work_on_height() for guard in guards],
+                                                     dtype=bool).reshape(num_of_guards)
+        self.shabat_night = np.array([guard.is_work_shabat_night() for guard in guards],
+                                     dtype=bool).reshape(num_of_guards)
+        self.shabat_counter = np.array([guard.get_shabat_counter() for guard in guards],
+                                       dtype=np.int64).reshape(num_of_guards)
+        self.optimal = np.array([guard.get_num_of_optimal_shifts() for guard in guards],
+                                dtype=np.int64).reshape(num_of_guards)
+
+        # The guard number of each guard in the roster of the department, to read and write the shifts of all the
+        # guards at once through the arrays of the roster
+        self.guard_numbers = np.array([guard.get_guard_number() for guard in guards], dtype=np.intp)
+
+        # The columns of the shifts that block each shift, from the compiled rules of the department
+        self.conflicts = [[col for col in range(21) if conflicts >> col & 1]
+                          for conflicts in department.rules.conflicts]
+        self.bits = 1 << np.arange(21, dtype=np.int64)
+
+        # The state of the run, loaded from the roster in 'load_state'
+        self.assigned = np.zeros((num_of_guards, 21), dtype=bool)
+        self.shifts_amount = np.zeros(num_of_guards, dtype=np.int64)
+        self.nights_counter = np.zeros(num_of_guards, dtype=np.int64)
+
+    def roster_columns(self):
+        """
+        Returns the shifts and the night counters of all the guards of the roster as NumPy arrays that share the
+        memory of the roster, by guard number. Writing into them changes the guards.
+        The arrays must not be kept, the roster can't grow while they exist.
+        """
+        roster = self.department.roster
+        return np.frombuffer(roster.shifts, dtype=np.int32), np.frombuffer(roster.nights_counter, dtype=np.uint8)
+
+    def load_state(self):
+        """ Read the shifts and the night counter of each guard from the roster of the department."""
+        shifts, nights_counter = self.roster_columns()
+        masks = shifts[self.guard_numbers].astype(np.int64).reshape(len(self.guard_numbers), 1)
+        self.assigned = (masks >> np.arange(21) & 1).astype(bool)
+        self.shifts_amount = self.assigned.sum(axis=1)
+        self.nights_counter = nights_counter[self.guard_numbers].astype(np.int64)
+
+    def store_state(self, changed, masks, nights_counter):
+        """
+        Write the shifts and the night counter of some guards into the roster of the department.
+        :param changed: The indexes of the guards, in the order of SchedulingProblem.guards
+        :param masks: The shifts of the guards as 21-bit integers
+        :param nights_counter: The night counters of the guards
+        """
+        shifts, nights = self.roster_columns()
+        shifts[self.guard_numbers[changed]] = masks
+        nights[self.guard_numbers[changed]] = nights_counter
+
+    def eligible(self, day, shift):
+        """
+        The rules of 'filter_employees' for all the guards at once.
+        :param day: The day in number
+        :param shift: The shift in number
+        :return: Boolean array, True for each guard that marked the shift and can work in it
+        """
+        department = self.department
+        rules = department.rules
+        slot = day * 3 + shift
+        bit = 1 << slot
+        mask = self.availability[:, slot].copy()
+
+        # The employee passed the maximum shabat shifts amount
+        if rules.shabat_mask & bit:
+            mask &= self.shabat_counter < department.MAX_SHABAT_SHIFTS
+
+        # The employee work in shabat night, so he can't work in Sunday morning.
+        if rules.shabat_night_mask & bit:
+            mask &= ~self.shabat_night
+
+        if rules.nights_mask & bit:
+            mask &= self.nights_counter < department.MAX_NIGHTS_SHIFTS
+
+        # Need a rest of at least one shift
+        mask &= ~self.assigned[:, self.conflicts[slot]].any(axis=1)
+
+        # The employee already has the number of shifts he wants, or passed the maximum work hours amount
+        mask &= (self.shifts_amount != self.optimal) & (self.shifts_amount < department.MAX_SHIFTS)
+        return mask
+
+    def count_rejections(self, day, shift, eligible):
+        """
+        Count the guards that marked the shift and can't work in it by the rule that rejects each one, in the order
+        of 'rejection_rule' of the department, into its instrumentation.
+        :param day: The day in number
+        :param shift: The shift in number
+        :param eligible: The result of 'eligible' for the shift
+        """
+        department = self.department
+        rules = department.rules
+        slot = day * 3 + shift
+        bit = 1 << slot
+        rejected = self.availability[:, slot] & ~eligible
+
+        # The guards each rule rejects, a guard is counted by the first rule that rejects him
+        checks = []
+        if rules.shabat_mask & bit:
+            checks.append(('shabat_cap', self.shabat_counter >= department.MAX_SHABAT_SHIFTS))
+        if rules.shabat_night_mask & bit:
+            checks.append(('shabat_night', self.shabat_night))
+        if rules.nights_mask & bit:
+            checks.append(('night_cap', self.nights_counter >= department.MAX_NIGHTS_SHIFTS))
+        checks.append(('rest', self.assigned[:, self.conflicts[slot]].any(axis=1)))
+        checks.append(('target_reached', self.shifts_amount == self.optimal))
+        checks.append(('max_shifts', self.shifts_amount >= department.MAX_SHIFTS))
+
+        for rule, mask in checks:
+            count = int((rejected & mask).sum())
+            if count:
+                department.instrumentation.reject(rule, day, shift, count)
+                rejected &= ~mask
+
+    def assign_shift(self, day, shift):
+        """
+        Assign the shift like 'assign_shift' of the department: two officers if possible, then the guards up to a full
+        shift, then more officers if the shift is still not full.
+        :param day: The day in number
+        :param shift: The shift in number
+        :return: The indexes of the employees of the shift, and the warning output of the shift
+        """
+        department = self.department
+        eligible = self.eligible(day, shift)
+        if department.instrumentation.enabled:
+            self.count_rejections(day, shift, eligible)
+        candidates = np.flatnonzero(eligible)
+        officers = candidates[self.is_officer[candidates]].tolist()
+        guards = candidates[~self.is_officer[candidates]].tolist()
+
+        # The number of employees the shift needs, from the staffing rules
+        required = department.rules.required[day * 3 + shift]
+
+        # The same calls of the random generator as the object path, only the employees that can be assigned
+        officers_list = department.rng.sample(officers, min(max(required, 2), len(officers)))
+        guards_list = department.rng.sample(guards, min(required, len(guards)))
+
+        chosen = officers_list[:2]
+        chosen += guards_list[:max(required - len(chosen), 0)]
+
+        # If the shift is not full, add more officers
+        shortage = required - len(chosen)
+        if shortage > 0 and len(officers_list) >= 3:
+            chosen += officers_list[2:min(shortage + 2, len(officers_list))]
+
+        chosen = np.array(chosen, dtype=np.int64)
+        self.assigned[chosen, day * 3 + shift] = True
+        self.shifts_amount[chosen] += 1
+        if shift == 2:
+            self.nights_counter[chosen] += 1
+
+        # Check if the shift is optimal, the counts are masked sums of the employees of the shift
+        return chosen, department.rules.shift_warning(day, shift, len(chosen), int(self.is_officer[chosen].sum()),
+                                                      int(self.can_drive[chosen].sum()),
+                                                      int(self.has_height[chosen].sum()))
+
+    def do_greedy(self):
+        """
+        Run the greedy of 'do_work_arrangement' over all the shifts in the order of 'find_min_shift', or the most
+        constrained shift first when 'SLOT_ORDER' of the department is 'dynamic' (like DynamicSlotOrder),
+        and write the result into the final arrangement, the warnings and the guards of the department.
+        """
+        department = self.department
+        guards = department.problem.guards
+        self.load_state()
+        start_amount = self.shifts_amount.copy()
+        if department.instrumentation.enabled:
+            department.instrumentation.rejection_runs += 1
+
+        dynamic_order = None
+        if department.SLOT_ORDER == 'dynamic':
+            dynamic_order = IndexedHeap()
+            for day in range(7):
+                for shift in range(3):
+                    dynamic_order.push((day, shift), (int(self.eligible(day, shift).sum()), day, shift))
+
+        for idx_of_shift in range(21):
+            if dynamic_order is None:
+                day, shift, _ = department.find_min_shift(idx_of_shift)
+            else:
+                (day, shift), _ = dynamic_order.pop()
+            chosen, warning = self.assign_shift(day, shift)
+            department.final_arrangement[day][shift].update(guards[i] for i in chosen.tolist())
+            department.warning_output[day][shift].add(warning)
+
+            # Count again the employees that can work in the remaining shifts the employees of the shift marked
+            if dynamic_order is not None and len(chosen):
+                marked = self.availability[chosen].any(axis=0)
+                for slot in dynamic_order.items():
+                    if marked[slot[0] * 3 + slot[1]]:
+                        dynamic_order.update(slot, (int(self.eligible(*slot).sum()), *slot))
+
+        # Only the guards that got shifts are written back
+        changed = np.flatnonzero(self.shifts_amount != start_amount)
+        self.store_state(changed, (self.assigned[changed] @ self.bits), self.nights_counter[changed])
+
+    def shifts_order(self):
+        """ Returns the (day, shift) of the 21 shifts in the order of 'find_min_shift', without changing the heaps."""
+        problem = self.department.problem
+        heaps = (list(problem.employee_amount_in_shift), list(problem.employee_amount_in_shift_noon))
+        return [heaps[idx_of_shift % 3 == 2].pop(0)[1:] for idx_of_shift in range(21)]
+
+    def do_batch(self, runs, seed=None):
+        """
+        Run 'runs' independent greedy arrangements in lockstep, shift by shift in the order of 'find_min_shift'.
+        The state of each run is a row of arrays (runs x guards) and the shuffles of 'assign_shift' are replaced by
+        random keys of each run, so all the runs of a shift are assigned by the same array operations.
+        The runs start from the current shifts of the guards and don't change them, use 'load_run' to write one back.
+        The runs don't give the same arrangements as the seeds of the object engine, and the shifts are always in the
+        static order since the dynamic order is different in each run.
+        :param runs: The number of runs
+        :param seed: The seed of the batch, None for a random batch
+        :return: Dictionary with 'masks' - the shifts of each guard in each run as 21-bit integers (runs x guards),
+        'nights' - the night counter of each guard in each run (runs x guards), and 'warnings' - the warning code of
+        each shift in each run (runs x 21, an index of WARNINGS)
+        """
+        department = self.department
+        rules = department.rules
+        generator = np.random.default_rng(seed)
+        self.load_state()
+        num_of_guards = len(self.optimal)
+
+        masks = np.repeat((self.assigned @ self.bits)[None, :], runs, axis=0)
+        shifts_amount = np.repeat(self.shifts_amount[None, :], runs, axis=0)
+        nights = np.repeat(self.nights_counter[None, :], runs, axis=0)
+        warnings = np.zeros((runs, 21), dtype=np.int8)
+
+        for day, shift in self.shifts_order():
+            slot = day * 3 + shift
+            bit = 1 << slot
+
+            # The rules of 'eligible' that don't depend on the run
+            static = self.availability[:, slot].copy()
+            if rules.shabat_mask & bit:
+                static &= self.shabat_counter < department.MAX_SHABAT_SHIFTS
+            if rules.shabat_night_mask & bit:
+                static &= ~self.shabat_night
+
+            # The rules that depend on the shifts each run already assigned
+            mask = static & (masks & rules.conflicts[slot] == 0)
+            mask &= (shifts_amount != self.optimal) & (shifts_amount < department.MAX_SHIFTS)
+            if rules.nights_mask & bit:
+                mask &= nights < department.MAX_NIGHTS_SHIFTS
+
+            officers = mask & self.is_officer
+            guards = mask & ~self.is_officer
+            officers_amount = officers.sum(axis=1)
+            guards_amount = guards.sum(axis=1)
+
+            # The number of employees the shift needs, from the staffing rules
+            required = rules.required[slot]
+
+            # Two officers if possible, then the guards up to a full shift, then more officers if it's not full
+            take_officers = np.minimum(officers_amount, 2)
+            take_guards = np.minimum(guards_amount, np.maximum(required - take_officers, 0))
+            shortage = required - take_officers - take_guards
+            take_officers += np.where((shortage > 0) & (officers_amount >= 3),
+                                      np.maximum(np.minimum(shortage + 2, officers_amount) - 2, 0), 0)
+
+            # A random key for each guard in each run, the smallest keys are the first of the shuffled lists
+            keys = generator.random((runs, num_of_guards))
+            chosen = take_smallest(np.where(officers, keys, np.inf), take_officers)
+            chosen |= take_smallest(np.where(guards, keys, np.inf), take_guards)
+
+            masks[chosen] |= 1 << slot
+            shifts_amount += chosen
+            if shift == 2:
+                nights += chosen
+
+            # The warnings of the shift in all the runs by the staffing rules, the counts are masked sums
+            size = take_officers + take_guards
+            count_drivers = (chosen & self.can_drive).sum(axis=1)
+            count_height_permissions = (chosen & self.has_height).sum(axis=1)
+            warnings[:, slot] = np.select([take_officers < rules.min_officers[slot], size < required,
+                                           count_drivers < rules.min_drivers[slot],
+                                           count_height_permissions < rules.min_heights[slot]], [1, 2, 3, 4], 0)
+
+        return {'masks': masks, 'nights': nights, 'warnings': warnings}
+
+    def score_batch(self, batch):
+        """
+        Calculate the scores of all the runs of a batch at once, like 'score_arrangement'.
+        :param batch: The result of 'do_batch'
+        :return: Integer arrays (runs) of the employee shortness and of the warnings amount
+        """
+        department = self.department
+        masks = batch['masks']
+        warnings_amount = (batch['warnings'] != 0).sum(axis=1)
+
+        employee_shortness = np.zeros(len(masks), dtype=np.int64)
+        for day in range(7):
+            morning, noon, night = ((masks >> (day * 3 + shift) & 1).astype(bool) for shift in range(3))
+
+            # The employees from the morning and the night that can do 12 hours instead of the missing noon employees
+            noon_marks = self.availability[:, day * 3 + 1]
+            required = department.rules.required[day * 3:day * 3 + 3]
+            missing_count = required[1] - noon.sum(axis=1)
+            cover = np.minimum(np.minimum((morning & noon_marks).sum(axis=1), (night & noon_marks).sum(axis=1)),
+                               missing_count.clip(0))
+
+            employee_shortness += (sum(required) - morning.sum(axis=1) - noon.sum(axis=1) - night.sum(axis=1) -
+                                   cover)
+        return employee_shortness, warnings_amount
+
+    def load_run(self, batch, run):
+        """
+        Write one run of a batch into the final arrangement, the warnings and the guards of the department.
+        The department should be reset before.
+        :param batch: The result of 'do_batch'
+        :param run: The index of the run
+        """
+        department = self.department
+        guards = department.problem.guards
+        masks = batch['masks'][run]
+        nights = batch['nights'][run]
+
+        for day in range(7):
+            for shift in range(3):
+                slot = day * 3 + shift
+                department.final_arrangement[day][shift].update(
+                    guards[i] for i in np.flatnonzero(masks >> slot & 1).tolist())
+                department.warning_output[day][shift].add(WARNINGS[batch['warnings'][run, slot]])
+
+        changed = np.flatnonzero(masks)
+        self.store_state(changed, masks[changed], nights[changed])
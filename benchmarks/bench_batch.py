@@ -0,0 +1,54 @@
+"""
+Benchmark of the batch mode of the NumPy engine against the sequential restarts of the greedy.
+The batch runs all the restarts in lockstep as array operations and scores them at once, the sequential restarts
+run the object engine once per seed (both without the local search).
+Run from the project root: python benchmarks/bench_batch.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic  # noqa: E402
+from main import run_arrangement  # noqa: E402
+
+ROSTERS = [(28, 0.5), (100, 0.3), (500, 0.2)]  # (guards, availability density)
+RESTARTS = [50, 1000]
+
+
+def best_sequential(department, restarts):
+    """ Returns the best (shortness, warnings) of the sequential restarts and their time in seconds."""
+    start = time.perf_counter()
+    results = [run_arrangement(department, seed, render=False) for seed in range(restarts)]
+    return min(results, key=lambda x: department.SHORTNESS_WEIGHT * x[0] + department.WARNING_WEIGHT * x[1]), \
+        time.perf_counter() - start
+
+
+def best_batch(department, restarts):
+    """ Returns the best (shortness, warnings) of one batch of restarts and its time in seconds."""
+    start = time.perf_counter()
+    engine = department.get_vector_engine()
+    department.reset_data_structure()
+    emp_shortness_amount, warnings_amount = engine.score_batch(engine.do_batch(restarts, 0))
+    penalty = department.SHORTNESS_WEIGHT * emp_shortness_amount + department.WARNING_WEIGHT * warnings_amount
+    best = int(penalty.argmin())
+    return (int(emp_shortness_amount[best]), int(warnings_amount[best])), time.perf_counter() - start
+
+
+def main():
+    print(f"{'guards':>8}{'restarts':>10}{'sequential':>24}{'batch':>24}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size, density in ROSTERS:
+            department = synthetic.make_department(size, directory, density=density, seed=size)
+            department.LOCAL_SEARCH_ITERATIONS = 0
+            for restarts in RESTARTS:
+                sequential_score, sequential_seconds = best_sequential(department, restarts)
+                batch_score, batch_seconds = best_batch(department, restarts)
+                print(f"{size:>8}{restarts:>10}{f'{sequential_score} {sequential_seconds:.3f}s':>24}"
+                      f"{f'{batch_score} {batch_seconds:.3f}s':>24}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark of the exact solver against the 50 restarts greedy of 'get_optimal'.
+Compares the quality (shortness, warnings and the accuracy sum of 'get_optimal') and the wall time
+on synthetic rosters of 20 to 500 guards.
+Run from the project root: python benchmarks/bench_exact.py [time_limit]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic  # noqa: E402
+from ExactSolver import ExactSolver  # noqa: E402
+from main import calculate_accuracy, run_arrangement  # noqa: E402
+
+SIZES = [20, 50, 100, 200, 500]
+RESTARTS = 50
+
+
+def best_of_greedy(department, restarts):
+    """ Run the greedy 'restarts' times and return the best shortness and warnings."""
+    results = []
+    for seed in range(restarts):
+        results.append(run_arrangement(department, seed, render=False))
+    return max(results, key=lambda x: sum(calculate_accuracy(*x)))
+
+
+def main():
+    time_limit = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    print(f"{'guards':>8}{'greedy score':>16}{'greedy (s)':>12}{'exact score':>16}{'exact (s)':>12}"
+          f"{'status':>10}{'gap':>8}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in SIZES:
+            # Fewer marks per guard in the bigger rosters, so the shifts are not trivially full
+            department = synthetic.make_department(size, directory, density=min(0.5, 12 / size), seed=size)
+
+            start = time.perf_counter()
+            greedy = best_of_greedy(department, RESTARTS)
+            greedy_time = time.perf_counter() - start
+
+            solver = ExactSolver(time_limit=time_limit)
+            start = time.perf_counter()
+            _, emp_shortness_amount, warnings_amount = solver.solve(department)
+            exact_time = time.perf_counter() - start
+            exact = (emp_shortness_amount, warnings_amount)
+
+            print(f"{size:>8}{str(greedy):>16}{greedy_time:>12.2f}{str(exact):>16}{exact_time:>12.2f}"
+                  f"{solver.status:>10}{solver.get_gap():>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
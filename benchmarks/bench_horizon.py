@@ -0,0 +1,72 @@
+"""
+Benchmark of the multi-week HorizonScheduler.
+Times the search for a growing number of weeks (the time should grow linearly), and compares the total penalty
+of the beam search with planning the weeks one by one (beam width 1), with the same budget of 40 runs in each week.
+The number of runs each search made is counted and printed next to its penalty and time.
+On this roster the time grows linearly for both, but the beam is not better: it ties with the week by week search
+on short horizons and is worse from 4 weeks, since each of its schedules gets a quarter of the runs of the week.
+The beam can only help when the counters carried over the weeks decide the penalty, like a tight shabat rotation,
+and this roster is not such a case.
+Run from the project root: python benchmarks/bench_horizon.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic  # noqa: E402
+from HorizonScheduler import HorizonScheduler  # noqa: E402
+from SecurityDepartment import SecurityDepartment  # noqa: E402
+
+GUARDS = 40
+DENSITY = 0.3
+HORIZONS = [1, 2, 4, 8, 16]
+
+
+def make_weeks(num_of_weeks, directory):
+    """ Make a department for each week, the same roster with other shifts marked each week."""
+    rows = synthetic.make_roster(GUARDS, seed=1)
+    path = os.path.join(directory, 'roster.csv')
+    synthetic.write_roster_csv(rows, path)
+    return [SecurityDepartment(data=synthetic.make_availability(rows, DENSITY, seed=week), csv_file_path=path)
+            for week in range(num_of_weeks)]
+
+
+def total_penalty(weeks, plans):
+    """ Returns the total penalty of a schedule."""
+    return sum(weeks[0].SHORTNESS_WEIGHT * plan.emp_shortness_amount + weeks[0].WARNING_WEIGHT * plan.warnings_amount
+               for plan in plans)
+
+
+def count_runs(scheduler):
+    """ Count the runs of the scheduler in its 'runs' attribute."""
+    run_week = scheduler.run_week
+    scheduler.runs = 0
+
+    def counted(*args):
+        scheduler.runs += 1
+        return run_week(*args)
+    scheduler.run_week = counted
+
+
+def main():
+    print(f"{'weeks':>6}{'week by week (runs)':>30}{'beam of 4 (runs)':>30}")
+    with tempfile.TemporaryDirectory() as directory:
+        for num_of_weeks in HORIZONS:
+            weeks = make_weeks(num_of_weeks, directory)
+            line = f"{num_of_weeks:>6}"
+            # The same budget of 40 runs in each week for both searches
+            for beam_width, runs_per_week in ((1, 40), (4, 10)):
+                scheduler = HorizonScheduler(weeks, beam_width=beam_width, runs_per_week=runs_per_week)
+                count_runs(scheduler)
+                start = time.perf_counter()
+                plans = scheduler.plan()
+                seconds = time.perf_counter() - start
+                line += f"{f'{total_penalty(weeks, plans)} {seconds:.2f}s ({scheduler.runs})':>30}"
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark of reading the sheets data into the department ('set_data') with 5,000 rows.
+Compares the indexed ingestion against the former scan of all the guards for each row.
+Run from the project root: python benchmarks/bench_ingest.py [rows]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic  # noqa: E402
+
+
+def legacy_set_data(department):
+    """ The former 'set_data', kept here as the baseline of the benchmark."""
+    for i in range(1, len(department.guards_objects_list) + 2):
+        employee = None
+        for obj in department.guards_objects_list:
+            if obj.get_name() == department.data['security'][i]["שם"]:
+                employee = obj
+                break
+        if employee is None:
+            continue
+        count = -1
+        for val in department.data['security'][i].values():
+            if count == -1:
+                count += 1
+                continue
+            day = count // 3
+            shift = count % 3
+            if val != '' and type(val) is not int:
+                department.dict_of_shifts[day][shift].add(employee)
+            elif type(val) is int and 0 <= val <= 6:
+                employee.set_optimal_num_of_shifts(val)
+                break
+            count += 1
+
+
+def timed(func, department):
+    """ Clear the shifts of the department and time one call of func."""
+    department.dict_of_shifts = {day: (set(), set(), set()) for day in range(7)}
+    start = time.perf_counter()
+    func(department)
+    return time.perf_counter() - start
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    with tempfile.TemporaryDirectory() as directory:
+        department = synthetic.make_department(rows, directory, density=0.3)
+
+        indexed = timed(lambda d: d.set_data(), department)
+        indexed_shifts = {day: tuple(set(s) for s in shifts) for day, shifts in department.dict_of_shifts.items()}
+        print(f"indexed set_data: {indexed * 1000:.1f} ms for {rows} rows")
+
+        legacy = timed(legacy_set_data, department)
+        print(f"legacy set_data:  {legacy * 1000:.1f} ms for {rows} rows ({legacy / indexed:.0f}x slower)")
+        print("same shifts:", indexed_shifts == department.dict_of_shifts)
+
+
+if __name__ == '__main__':
+    main()
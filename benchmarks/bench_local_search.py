@@ -0,0 +1,46 @@
+"""
+Benchmark of the local search after the greedy.
+Compares the best of 50 greedy restarts without the local search against a few restarts with it.
+The last roster has no marked shifts at all, like an empty sheet early in the week.
+Run from the project root: python benchmarks/bench_local_search.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic  # noqa: E402
+from main import calculate_accuracy, run_arrangement  # noqa: E402
+
+ROSTERS = [(20, 0.5), (30, 0.35), (50, 0.2), (100, 0.1), (20, 0.0)]  # (guards, availability density)
+
+
+def best_of(department, restarts, iterations):
+    """
+    Run the work arrangement 'restarts' times with 'iterations' moves of local search.
+    :return: The best (shortness, warnings) and the run time in seconds
+    """
+    department.LOCAL_SEARCH_ITERATIONS = iterations
+    start = time.perf_counter()
+    results = [run_arrangement(department, seed, render=False) for seed in range(restarts)]
+    return max(results, key=lambda x: sum(calculate_accuracy(*x))), time.perf_counter() - start
+
+
+def main():
+    runs = [(50, 0), (1, 2000), (5, 2000), (10, 2000)]  # (restarts, local search iterations)
+    print(f"{'guards':>8}" + ''.join(f"{f'{r} x {i} moves':>24}" for r, i in runs))
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size, density in ROSTERS:
+            department = synthetic.make_department(size, directory, density=density, seed=size)
+            line = f"{size:>8}"
+            for restarts, iterations in runs:
+                score, seconds = best_of(department, restarts, iterations)
+                line += f"{f'{score} {seconds:.2f}s':>24}"
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
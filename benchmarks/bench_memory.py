@@ -0,0 +1,92 @@
+"""
+Memory benchmark of the guard records.
+Compares the per-guard footprint of the GuardRoster columns and their SecurityGuard views against the former
+records, an object with a dictionary of attributes and a Shift object of its own for each guard.
+The footprint is measured with tracemalloc while the records of a synthetic roster are built, the names are
+made before the measurement so both sides share them.
+Run from the project root: python benchmarks/bench_memory.py [--sizes 1000 5000 20000]
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from GuardRoster import GuardRoster  # noqa: E402
+from SecurityGuard import SecurityGuard  # noqa: E402
+from synthetic import make_roster  # noqa: E402
+
+
+class DictShift:
+    """ The former Shift record, kept here as the baseline of the benchmark."""
+
+    def __init__(self):
+        self.shifts_mask = 0
+
+
+class DictGuard:
+    """ The former SecurityGuard record, kept here as the baseline of the benchmark."""
+
+    def __init__(self, name, id_number, is_officer, has_height_permission, can_drive, shabat_counter=0,
+                 nights_counter=0, work_shabat_night=False):
+        self.name = name
+        self.id_number = id_number
+        self.is_officer = is_officer
+        self.has_height_permission = has_height_permission
+        self.can_drive = can_drive
+        self.shabat_counter = shabat_counter
+        self.nights_counter = nights_counter
+        self.work_shabat_night = work_shabat_night
+        self.optimal_num_of_shifts = 0
+        self.shifts = DictShift()
+
+
+def guard_arguments(rows):
+    """ The arguments of the guard constructors of the roster rows, in the types 'SecurityDepartment' passes."""
+    return [(row['E_Name'], row['eID'], bool(row['Is_Officer']), bool(row['Has_Height']), bool(row['Can_Drive']),
+             row['Shabat_Count'], row['Nights_Count'], bool(row['Shabat_Night'])) for row in rows]
+
+
+def measure(build, arguments):
+    """
+    Build the records of all the guards under tracemalloc.
+    :return: The records and the number of bytes they took
+    """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        records = build(arguments)
+        return records, tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def build_dict_guards(arguments):
+    return [DictGuard(*args) for args in arguments]
+
+
+def build_roster(arguments):
+    roster = GuardRoster()
+    for args in arguments:
+        SecurityGuard(*args, roster=roster)
+    return roster
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory benchmark of the guard records.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000],
+                        help="The numbers of guards of the rosters.")
+    args = parser.parse_args()
+
+    print(f"{'guards':>8} {'former B/guard':>15} {'roster B/guard':>15} {'arrays B/guard':>15} {'ratio':>7}")
+    for size in args.sizes:
+        arguments = guard_arguments(make_roster(size))
+        _, former = measure(build_dict_guards, arguments)
+        roster, compact = measure(build_roster, arguments)
+        print(f"{size:>8} {former / size:>15.1f} {compact / size:>15.1f} {roster.nbytes() / size:>15.1f} "
+              f"{former / compact:>6.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark of 'repair' against running the work arrangement again, when guards call in sick after the
+arrangement was published.
+For each roster, guards are taken out of some of their published shifts, and the arrangement is repaired
+in place or made again from the same seed. Prints the mean time, the mean number of changed shifts of the published
+arrangement and the mean penalty (SHORTNESS_WEIGHT * shortness + WARNING_WEIGHT * warnings, lower is better).
+Run from the project root: python benchmarks/bench_repair.py [trials] [sick shifts]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic  # noqa: E402
+from main import run_arrangement  # noqa: E402
+
+ROSTERS = [(20, 0.5), (30, 0.35), (50, 0.2), (100, 0.1), (500, 0.03)]  # (guards, availability density)
+
+
+def arrangement(department):
+    """ Returns the set of (eID, day, shift) of the final arrangement."""
+    return {(employee.get_id_number(), day, shift) for day, shifts in department.final_arrangement.items()
+            for shift, employees in enumerate(shifts) for employee in employees}
+
+
+def penalty(department):
+    """ Returns the penalty of the final arrangement."""
+    emp_shortness_amount, warnings_amount, _ = department.score_arrangement()
+    return department.SHORTNESS_WEIGHT * emp_shortness_amount + department.WARNING_WEIGHT * warnings_amount
+
+
+def trial(department, seed, sick_shifts):
+    """
+    Publish an arrangement, take guards out of some of its shifts, and repair it or make it again.
+    :return: Dictionary of the method and its time in milliseconds, the changed shifts and the penalty
+    """
+    rng = random.Random(seed)
+    run_arrangement(department, seed, render=False)
+    published = arrangement(department)
+    sick = rng.sample(sorted(published), min(sick_shifts, len(published)))
+
+    results = {}
+    start = time.perf_counter()
+    department.repair(unavailable=sick)
+    results['repair'] = ((time.perf_counter() - start) * 1e3, len(published ^ arrangement(department)),
+                         penalty(department))
+
+    start = time.perf_counter()
+    run_arrangement(department, seed, render=False)
+    results['rerun'] = ((time.perf_counter() - start) * 1e3, len(published ^ arrangement(department)),
+                        penalty(department))
+
+    # Mark the shifts again for the next trial
+    for e_id, day, shift in sick:
+        department.set_mark(department.guards_by_id[e_id], day, shift, True)
+    return results
+
+
+def main():
+    trials = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    sick_shifts = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    print(f"{'guards':>8}{'repair ms/changes/penalty':>30}{'rerun ms/changes/penalty':>30}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size, density in ROSTERS:
+            department = synthetic.make_department(size, directory, density=density, seed=size)
+            results = [trial(department, seed, sick_shifts) for seed in range(trials)]
+            line = f"{size:>8}"
+            for method in ('repair', 'rerun'):
+                ms, changes, method_penalty = (statistics.mean(result[method][i] for result in results)
+                                               for i in range(3))
+                line += f"{f'{ms:.2f} / {changes:.1f} / {method_penalty:.0f}':>30}"
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+Benchmark of the cost of one restart of 'get_optimal', with the arrangement prepared to be posted on
+Google Sheets ('ready_arrangment') against scoring only ('score_arrangement').
+Run from the project root: python benchmarks/bench_scoring.py
+"""
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic  # noqa: E402
+from main import run_arrangement  # noqa: E402
+
+SIZES = [28, 100, 500]
+NUMBER = 200
+
+
+def main():
+    print(f"{'guards':>8}{'ready (us)':>14}{'score (us)':>14}{'restart+ready (us)':>22}{'restart+score (us)':>22}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in SIZES:
+            department = synthetic.make_department(size, directory, density=min(0.5, 14 / size * 2), seed=size)
+            department.LOCAL_SEARCH_ITERATIONS = 0
+            run_arrangement(department, 0)
+
+            # The final step alone, on the same arrangement
+            ready = timeit.timeit(department.ready_arrangment, number=NUMBER) / NUMBER * 1e6
+            score = timeit.timeit(department.score_arrangement, number=NUMBER) / NUMBER * 1e6
+
+            # A full restart of 'get_optimal'
+            restart_ready = timeit.timeit(lambda: run_arrangement(department, 0), number=NUMBER) / NUMBER * 1e6
+            restart_score = timeit.timeit(lambda: run_arrangement(department, 0, render=False),
+                                          number=NUMBER) / NUMBER * 1e6
+
+            print(f"{size:>8}{ready:>14.1f}{score:>14.1f}{restart_ready:>22.1f}{restart_score:>22.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark of posting the arrangement through the Sheety client, against a local stand-in of the Sheety API.
+Compares the three row PUTs one after another against the concurrent client, shows the retries, and the requests
+and bytes saved by posting only the changed rows.
+Run from the project root: python benchmarks/bench_sheety_client.py [delay]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import requests  # noqa: E402
+from SheetyClient import SheetyClient  # noqa: E402
+from stub_sheety import StubSheety  # noqa: E402
+
+ROWS = {row: {'chart1': {'shift': str(row), 'ראשון': 'guard\n' * 5}} for row in (2, 3, 4)}
+
+
+def sequential_put(url):
+    """ The former posting, a new connection for each row and no retries."""
+    start = time.perf_counter()
+    for row, body in ROWS.items():
+        response = requests.put(url=f"{url}/{row}", json=body, headers={"Authorization": "Bearer token"})
+        response.raise_for_status()
+        response.close()
+    return time.perf_counter() - start
+
+
+def main():
+    delay = float(sys.argv[1]) if len(sys.argv) > 1 else 0.2
+
+    with StubSheety({'security': []}, delay=delay) as stub:
+        print(f"sequential PUTs: {sequential_put(stub.url):.3f} s")
+
+        client = SheetyClient(stub.url, 'token', stub.url, 'token')
+        start = time.perf_counter()
+        errors = client.put_rows(ROWS)
+        print(f"concurrent PUTs: {time.perf_counter() - start:.3f} s, errors: {errors}")
+        assert stub.rows == ROWS
+
+    # Every row fails once before it's stored
+    with StubSheety({'security': []}, fail_first=3) as stub:
+        client = SheetyClient(stub.url, 'token', stub.url, 'token', backoff=0.05)
+        errors = client.put_rows(ROWS)
+        print(f"with 3 failures: errors: {errors}, rows stored: {sorted(stub.rows)}")
+        for record in client.metrics:
+            print(f"  {record['method']} {record['url']} status={record['status']} "
+                  f"attempts={record['attempts']} latency={record['latency'] * 1000:.1f} ms")
+
+    # Post the same rows again and again with one changed row, the posted rows are kept in a file between runs
+    with StubSheety({'security': []}) as stub, tempfile.TemporaryDirectory() as directory:
+        state_path = os.path.join(directory, 'posted_rows.json')
+        changed_rows = {**ROWS, 3: {'chart1': {'shift': '3', 'ראשון': 'guard\n' * 4}}}
+        for rows in (ROWS, ROWS, changed_rows):
+            client = SheetyClient(stub.url, 'token', stub.url, 'token', state_path=state_path)
+            before = len(stub.requests)
+            errors = client.put_changed_rows(rows)
+            print(f"changed rows PUTs: requests={len(stub.requests) - before} errors: {errors} {client.savings}")
+        assert stub.rows == changed_rows
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Micro-benchmark of the Shift operations.
+Compares the bitmask based Shift class against the former pandas DataFrame implementation.
+Run from the project root: python benchmarks/bench_shift.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Shift import Shift  # noqa: E402
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+
+class PandasShift:
+    """ The former pandas based Shift implementation, kept here as the baseline of the benchmark."""
+
+    def __init__(self):
+        self.shifts_df = pd.DataFrame({'day': [], 'shift': [], 'is_assigned': []})
+        for day in range(7):
+            for shift in range(3):
+                temp = pd.DataFrame({'day': day, 'shift': shift, 'is_assigned': False}, index=[0])
+                self.shifts_df = pd.concat([self.shifts_df, temp], ignore_index=True)
+        self.shifts_df['is_assigned'] = self.shifts_df['is_assigned'].astype(bool)
+
+    def assign(self, day, shift):
+        self.shifts_df.loc[(self.shifts_df['day'] == day) & (self.shifts_df['shift'] == shift), 'is_assigned'] = True
+
+    def get_shift(self, day, shift):
+        return self.shifts_df[
+            (self.shifts_df['day'] == day) & (self.shifts_df['shift'] == shift)]['is_assigned'].values[0]
+
+    def get_shifts_amount(self):
+        return self.shifts_df['is_assigned'].sum()
+
+    def count_nights(self):
+        return self.shifts_df[self.shifts_df['shift'] == 2]['is_assigned'].sum()
+
+    def reset_all_shifts(self):
+        self.shifts_df['is_assigned'] = False
+
+
+def time_operations(shift_class, number):
+    """
+    Time every Shift operation.
+    :return: Dictionary of operation name and the average time of one call in microseconds
+    """
+    obj = shift_class()
+    obj.assign(3, 1)
+    operations = {
+        '__init__': lambda: shift_class(),
+        'assign': lambda: obj.assign(4, 2),
+        'get_shift': lambda: obj.get_shift(3, 1),
+        'get_shifts_amount': lambda: obj.get_shifts_amount(),
+        'count_nights': lambda: obj.count_nights(),
+        'reset_all_shifts': lambda: obj.reset_all_shifts(),
+    }
+    return {name: timeit.timeit(func, number=number) / number * 1e6 for name, func in operations.items()}
+
+
+def main():
+    bitmask = time_operations(Shift, 100000)
+    if pd is None:
+        print("pandas is not installed, showing the bitmask timings only.")
+        for name, value in bitmask.items():
+            print(f"{name:<20}{value:>12.3f} us")
+        return
+
+    baseline = time_operations(PandasShift, 200)
+    print(f"{'operation':<20}{'pandas (us)':>14}{'bitmask (us)':>14}{'speedup':>12}")
+    for name in bitmask:
+        print(f"{name:<20}{baseline[name]:>14.2f}{bitmask[name]:>14.3f}{baseline[name] / bitmask[name]:>11.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Benchmark of the orders of the shifts in the greedy: the static order of 'find_min_shift' against the dynamic
+order of DynamicSlotOrder (the most constrained shift first).
+Prints the mean and the best penalty of the restarts (SHORTNESS_WEIGHT * shortness + WARNING_WEIGHT * warnings,
+lower is better) and the time of one restart, without the local search and with it.
+Run from the project root: python benchmarks/bench_slot_order.py [restarts]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic  # noqa: E402
+from main import run_arrangement  # noqa: E402
+
+ROSTERS = [(20, 0.5), (30, 0.35), (50, 0.2), (100, 0.1), (500, 0.03)]  # (guards, availability density)
+
+
+def restarts_quality(department, order, restarts):
+    """ Returns the mean and the best penalty of the restarts with the given order, and the time of one restart."""
+    department.SLOT_ORDER = order
+    start = time.perf_counter()
+    penalties = []
+    for seed in range(restarts):
+        emp_shortness_amount, warnings_amount = run_arrangement(department, seed, render=False)
+        penalties.append(department.SHORTNESS_WEIGHT * emp_shortness_amount +
+                         department.WARNING_WEIGHT * warnings_amount)
+    return statistics.mean(penalties), min(penalties), (time.perf_counter() - start) / restarts * 1e3
+
+
+def main():
+    restarts = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    print(f"{'guards':>8}{'moves':>7}{'static mean/best/ms':>26}{'dynamic mean/best/ms':>26}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size, density in ROSTERS:
+            department = synthetic.make_department(size, directory, density=density, seed=size)
+            for iterations in (0, department.LOCAL_SEARCH_ITERATIONS):
+                department.LOCAL_SEARCH_ITERATIONS = iterations
+                line = f"{size:>8}{iterations:>7}"
+                for order in ('static', 'dynamic'):
+                    mean, best, ms = restarts_quality(department, order, restarts)
+                    line += f"{f'{mean:.0f} / {best} / {ms:.2f}':>26}"
+                print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Startup benchmark of the cron entry point: the import time of 'main' measured by 'python -X importtime' in a fresh
+interpreter, and the heavy modules it loaded.
+Exits with 1 if the import time is over the budget or one of the heavy modules was loaded at import time,
+so it can guard against a regression of the cold start.
+Run from the project root: python benchmarks/bench_startup.py [--budget ms] [--repeat n]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Modules that only optional features need, they must not be loaded by importing the core
+HEAVY_MODULES = ('pandas', 'numpy', 'requests', 'ortools')
+
+
+def import_times(module):
+    """
+    Import a module in a fresh interpreter with '-X importtime'.
+    :return: Dictionary of each imported module and its cumulative import time in microseconds
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup benchmark of the cron entry point.")
+    parser.add_argument('--module', default='main', help="The module to import.")
+    parser.add_argument('--budget', type=float, default=150.0, help="The budget of the import time in ms.")
+    parser.add_argument('--repeat', type=int, default=5, help="The number of fresh interpreters, the median counts.")
+    parser.add_argument('--top', type=int, default=10, help="The number of slowest modules to print.")
+    args = parser.parse_args()
+
+    runs = [import_times(args.module) for _ in range(args.repeat)]
+    total = statistics.median(run[args.module] for run in runs) / 1e3
+    heavy = sorted({name.split('.')[0] for run in runs for name in run} & set(HEAVY_MODULES))
+
+    last = runs[-1]
+    print(f"import {args.module}: {total:.1f} ms (median of {args.repeat}), budget {args.budget:.0f} ms")
+    for name, cumulative in sorted(last.items(), key=lambda x: -x[1])[:args.top]:
+        print(f"  {cumulative / 1e3:>8.1f} ms  {name}")
+    print(f"heavy modules loaded: {heavy or 'none'}")
+
+    if total > args.budget or heavy:
+        print("FAILED")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
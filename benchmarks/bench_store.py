@@ -0,0 +1,224 @@
+"""
+Check of posting the arrangements of departments with a GuardStore, through the stub Sheety server.
+Runs BatchRunner over several sites that share one store database and post from the threads of the batch, and
+checks that every site was posted and that the store has the counters of the posted arrangement: the counters are
+computed again from the names in the posted rows of each site.
+The batch is run several times for the same week, each time the guards must start from the counters they had
+before the week, and the store must have the counters of the last post.
+Then a SchedulerService of a department with a store posts from its request threads: solves, concurrent solves,
+a repair and a solve after a refresh, all of the same week, with the same checks after each one.
+Exits with 1 if a check fails.
+Run from the project root: python benchmarks/bench_store.py [--sites n] [--guards n] [--repeats n]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests  # noqa: E402
+import synthetic  # noqa: E402
+from stub_sheety import StubSheety  # noqa: E402
+from BatchRunner import BatchRunner  # noqa: E402
+from GuardStore import COUNTER_COLUMNS, GuardStore, current_week  # noqa: E402
+from ScheduleRules import DEFAULT_RULES  # noqa: E402
+from SchedulerService import SchedulerService  # noqa: E402
+from SecurityDepartment import SecurityDepartment  # noqa: E402
+from SheetyClient import SheetyClient  # noqa: E402
+
+# All the guards start with one shabat in a row, so a wrong counter is seen both when it grows and when it resets
+START_SHABAT_COUNT = 1
+
+
+def make_sites(num_of_sites, num_of_guards, directory):
+    """
+    Write the availability of each site and import the rosters into one store.
+    :return: The sites of the manifest (without the endpoints) and the roster rows of each site by name
+    """
+    store = GuardStore(os.path.join(directory, 'guards.db'))
+    sites, rosters = [], {}
+    for idx in range(num_of_sites):
+        name = f'site{idx}'
+        rows = synthetic.make_roster(num_of_guards, seed=idx)
+        for row in rows:
+            row['Shabat_Count'] = START_SHABAT_COUNT
+        store.upsert_guards(name, rows)
+        with open(os.path.join(directory, f'{name}.json'), 'w', encoding='utf-8') as file:
+            json.dump(synthetic.make_availability(rows, 0.4, seed=idx), file, ensure_ascii=False)
+        sites.append({'name': name, 'store': 'guards.db', 'availability_file': f'{name}.json', 'runs': 10})
+        rosters[name] = rows
+    store.close()
+    return sites, rosters
+
+
+def posted_shifts(sheet_rows, roster):
+    """
+    Read the shifts of each guard from the posted rows of the arrangement sheet.
+    :return: Dictionary of eID and the set of (day, shift) the guard works in
+    """
+    by_name = {row['E_Name']: row['eID'] for row in roster}
+    shifts = {row['eID']: set() for row in roster}
+    for shift in range(3):
+        chart = sheet_rows[shift + 2]['chart1']
+        for day, day_name in enumerate(synthetic.DAYS):
+            for line in (chart[day_name] or '').split('\n'):
+                # The warning lines start with '*', the 12-hour replacements end with ' * 12 *'
+                name = line.replace(' * 12 *', '').strip()
+                if name and not name.startswith('*'):
+                    shifts[by_name[name]].add((day, shift))
+    return shifts
+
+
+def expected_counters(shifts):
+    """ Returns the counters after the week of each guard, eID and (Shabat_Count, Nights_Count, Shabat_Night)."""
+    shabat = {tuple(slot) for slot in DEFAULT_RULES['shabat_slots']}
+    shabat_night = {tuple(slot) for slot in DEFAULT_RULES['shabat_night_slots']}
+    return {e_id: (START_SHABAT_COUNT + 1 if slots & shabat else 0,
+                   sum(1 for _, shift in slots if shift in DEFAULT_RULES['night_shifts']),
+                   int(bool(slots & shabat_night)))
+            for e_id, slots in shifts.items()}
+
+
+def check_site(store, name, sheet_rows, roster):
+    """
+    Check the counters of a site in the store against its posted rows.
+    :return: List of the failed checks
+    """
+    failures = []
+    week = current_week()
+    def counters(rows):
+        return {row['eID']: tuple(row[col_name] for col_name in COUNTER_COLUMNS) for row in rows}
+
+    if counters(store.load_guards(name, week)) != counters(roster):
+        failures.append(f"{name}: the counters carried into the week changed")
+
+    expected = expected_counters(posted_shifts(sheet_rows, roster))
+    stored = {e_id: tuple(counters) for e_id in expected
+              for history_week, *counters in store.counters_history(name, e_id) if history_week == week}
+    if stored != expected:
+        wrong = sorted(e_id for e_id in expected if stored.get(e_id) != expected[e_id])
+        failures.append(f"{name}: wrong counters in the store for {len(wrong)} guards, e.g. {wrong[:3]}")
+    return failures
+
+
+def run_batch(sites, rosters, directory, workers):
+    """
+    Run the batch with a stub Sheety server for each site and check the posts and the store.
+    :return: List of the failed checks and the time of the batch in seconds
+    """
+    failures = []
+    with ExitStack() as stack:
+        stubs = {site['name']: stack.enter_context(StubSheety({})) for site in sites}
+        manifest = [dict(site, endpoint_put=stubs[site['name']].url) for site in sites]
+        start = time.perf_counter()
+        reports = BatchRunner(manifest, workers=workers, base_dir=directory).run()
+        seconds = time.perf_counter() - start
+
+    store = GuardStore(os.path.join(directory, 'guards.db'))
+    for report in reports:
+        name = report['name']
+        if report['status'] != 'ok':
+            failures.append(f"{name}: failed in {report['step']}: {report['error']}")
+            continue
+        failures += check_site(store, name, stubs[name].rows, rosters[name])
+    store.close()
+    return failures, seconds
+
+
+def run_service(sites, rosters, directory, workers):
+    """
+    Post the arrangements of the first site through the requests of a SchedulerService, and check the store after
+    each post.
+    :return: List of the failed checks and the time of the requests in seconds
+    """
+    site = sites[0]
+    name = site['name']
+    with open(os.path.join(directory, site['availability_file']), encoding='utf-8') as file:
+        data = json.load(file)
+
+    failures = []
+    store = GuardStore(os.path.join(directory, site['store']))
+    with StubSheety(data) as stub:
+        department = SecurityDepartment(data=data, store=store, department_name=name,
+                                        client=SheetyClient(stub.url, '', stub.url, ''))
+        service = SchedulerService(department, workers=workers, port=0)
+        thread = threading.Thread(target=service.serve_forever, daemon=True)
+        thread.start()
+
+        def post(path, **body):
+            """ Send a request that posts, and check its answer and the store."""
+            responses = [requests.post(service.url + path, json=dict(body, post=True), timeout=60)]
+            return check(path, responses)
+
+        def check(path, responses):
+            for response in responses:
+                if response.status_code != 200 or response.json()['posted'] is not True:
+                    failures.append(f"service {path}: {response.status_code} {response.text[:200]}")
+            failures.extend(f"service {path}: {failure}" for failure in check_site(store, name, stub.rows,
+                                                                                     rosters[name]))
+            return responses[-1].json() if responses[-1].status_code == 200 else None
+
+        start = time.perf_counter()
+        solved = post('/solve', restarts=20, seed=0)
+        post('/solve', restarts=20, seed=100)
+        # The solves post from the request threads at the same time
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            check('/solve concurrent', list(executor.map(
+                lambda seed: requests.post(service.url + '/solve', json={'restarts': 10, 'seed': seed, 'post': True},
+                                           timeout=60), range(4))))
+        if solved is not None:
+            post('/repair', unavailable=solved['shifts'][:1])
+        stub.data = synthetic.make_availability(rosters[name], 0.4, seed=len(sites))
+        requests.post(service.url + '/refresh', timeout=60)
+        post('/solve', restarts=20, seed=0)
+        seconds = time.perf_counter() - start
+
+        service.shutdown()
+        thread.join()
+    store.close()
+    return failures, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check of posting with a GuardStore.")
+    parser.add_argument('--sites', type=int, default=6, help="The number of sites of the batch.")
+    parser.add_argument('--guards', type=int, default=40, help="The number of guards of each site.")
+    parser.add_argument('--repeats', type=int, default=3, help="The number of batches of the same week.")
+    args = parser.parse_args()
+
+    failed = False
+    # The sites are solved and posted in the threads of the batch, then solved in worker processes
+    for workers in (0, 2):
+        with tempfile.TemporaryDirectory() as directory:
+            sites, rosters = make_sites(args.sites, args.guards, directory)
+            for repeat in range(args.repeats):
+                failures, seconds = run_batch(sites, rosters, directory, workers)
+                print(f"workers={workers} batch {repeat + 1}: {args.sites - len(failures)}/{args.sites} sites ok "
+                      f"{seconds:.2f}s")
+                for failure in failures:
+                    print(f"  {failure}")
+                failed |= bool(failures)
+
+    # The service posts from its request threads, and solves in the service process or in worker processes
+    for workers in (0, 2):
+        with tempfile.TemporaryDirectory() as directory:
+            sites, rosters = make_sites(1, args.guards, directory)
+            failures, seconds = run_service(sites, rosters, directory, workers)
+        print(f"service workers={workers}: {'ok' if not failures else 'failed'} {seconds:.2f}s")
+        for failure in failures:
+            print(f"  {failure}")
+        failed |= bool(failures)
+
+    if failed:
+        print("FAILED")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
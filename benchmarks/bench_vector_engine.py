@@ -0,0 +1,48 @@
+"""
+Benchmark of the NumPy engine of the greedy against the object engine.
+Both engines give the same arrangement for the same seed, the benchmark checks it and times one greedy pass
+(without the local search) on rosters of growing size.
+Run from the project root: python benchmarks/bench_vector_engine.py
+"""
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic  # noqa: E402
+from main import run_arrangement  # noqa: E402
+
+ROSTERS = [(28, 0.5), (100, 0.3), (500, 0.2), (2000, 0.1), (5000, 0.05)]  # (guards, availability density)
+
+
+def snapshot(department):
+    """ Returns the employees of each shift by ID number, to compare the arrangements of the engines."""
+    return {(day, shift): sorted(employee.get_id_number() for employee in employees)
+            for day, shifts in department.final_arrangement.items() for shift, employees in enumerate(shifts)}
+
+
+def time_engine(department, engine, number):
+    """ Returns the average time of one greedy pass of the engine in milliseconds, and its arrangement."""
+    department.ENGINE = engine
+    run_arrangement(department, 0, render=False)  # The NumPy arrays are built on the first run
+    seconds = timeit.timeit(lambda: run_arrangement(department, 0, render=False), number=number) / number
+    return seconds * 1e3, snapshot(department)
+
+
+def main():
+    print(f"{'guards':>8}{'object ms':>14}{'numpy ms':>14}{'speedup':>10}{'same':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size, density in ROSTERS:
+            department = synthetic.make_department(size, directory, density=density, seed=size)
+            department.LOCAL_SEARCH_ITERATIONS = 0
+            number = max(1, 2000 // size)
+            object_ms, object_arrangement = time_engine(department, 'object', number)
+            numpy_ms, numpy_arrangement = time_engine(department, 'numpy', number)
+            print(f"{size:>8}{object_ms:>14.2f}{numpy_ms:>14.2f}{object_ms / numpy_ms:>9.1f}x"
+                  f"{str(object_arrangement == numpy_arrangement):>8}")
+
+
+if __name__ == '__main__':
+    main()
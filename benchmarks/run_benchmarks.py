@@ -0,0 +1,162 @@
+"""
+Benchmark suite of the scheduling pipeline on synthetic rosters, fully offline.
+Times the Shift operations, 'filter_employees', 'assign_shift', one 'do_work_arrangement' pass and the full
+'get_optimal' (with the department built through its fetch path, the Sheety GET replaced by a fixture).
+The results are saved as JSON, and compared with the results of a former run to catch regressions.
+Run from the project root:
+python benchmarks/run_benchmarks.py [--output results.json] [--compare former.json] [--sizes 28 100 500]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic  # noqa: E402
+from SecurityDepartment import SecurityDepartment  # noqa: E402
+from Shift import Shift  # noqa: E402
+from main import get_optimal, run_arrangement  # noqa: E402
+
+
+def per_call(func, number):
+    """ Returns the average time of one call of func in microseconds."""
+    return timeit.timeit(func, number=number) / number * 1e6
+
+
+def bench_shift(number=100000):
+    """ Time the Shift operations."""
+    shift = Shift()
+    shift.assign(3, 1)
+    return {
+        'assign': per_call(lambda: shift.assign(4, 2), number),
+        'get_shift': per_call(lambda: shift.get_shift(3, 1), number),
+        'get_shifts_amount': per_call(shift.get_shifts_amount, number),
+        'count_nights': per_call(shift.count_nights, number),
+    }
+
+
+def bench_department(department, number):
+    """ Time the steps of the work arrangement of one department."""
+    results = {}
+
+    # 'filter_employees' over all the candidates of every shift, in the middle of a run
+    run_arrangement(department, 0, render=False)
+    checks = [(employee, day, shift) for (day, shift), employees in department.problem.candidates.items()
+              for employee in employees]
+    if checks:
+        total = per_call(lambda: [department.filter_employees(*check) for check in checks], max(1, number // 10))
+        results['filter_employees'] = total / len(checks)
+
+    # 'assign_shift' of the most marked shift, from an empty arrangement
+    day, shift = max(department.problem.candidates, key=lambda slot: len(department.problem.candidates[slot]))
+    candidates = department.problem.candidates[day, shift]
+
+    def assign():
+        department.reset_data_structure()
+        department.assign_shift([[e for e in candidates if e.is_officer()],
+                                 [e for e in candidates if not e.is_officer()]], day, shift)
+
+    results['reset_data_structure'] = per_call(department.reset_data_structure, number)
+    results['assign_shift'] = per_call(assign, number) - results['reset_data_structure']
+
+    # One pass of the work arrangement, with and without the local search
+    iterations = department.LOCAL_SEARCH_ITERATIONS
+    department.LOCAL_SEARCH_ITERATIONS = 0
+    results['do_work_arrangement_greedy'] = per_call(lambda: run_arrangement(department, 0, render=False), number)
+    department.LOCAL_SEARCH_ITERATIONS = iterations
+    results['do_work_arrangement'] = per_call(lambda: run_arrangement(department, 0, render=False), number)
+    return results
+
+
+def bench_pipeline(num_guards, directory, density, seed):
+    """ Time building the department through its fetch path and the full 'get_optimal'."""
+    rows = synthetic.make_roster(num_guards, seed=seed)
+    path = os.path.join(directory, f'pipeline_{num_guards}.csv')
+    synthetic.write_roster_csv(rows, path)
+    data = synthetic.make_availability(rows, density, seed)
+
+    start = time.perf_counter()
+    with synthetic.offline_fetch(data):
+        department = SecurityDepartment(csv_file_path=path)
+    load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        get_optimal(department)
+    return department, {'load': load * 1e6, 'get_optimal': (time.perf_counter() - start) * 1e6}
+
+
+def git_revision():
+    """ Returns the current git commit, None if it's not available."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, former, threshold):
+    """
+    Print the timings that got slower than the former results by more than the threshold.
+    :return: The number of regressions
+    """
+    regressions = 0
+    for group, timings in results['timings'].items():
+        for name, value in timings.items():
+            old = former.get('timings', {}).get(group, {}).get(name)
+            if old and value > old * (1 + threshold):
+                print(f"REGRESSION {group}.{name}: {old:.1f} us -> {value:.1f} us ({value / old:.2f}x)")
+                regressions += 1
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite of the scheduling pipeline.")
+    parser.add_argument('--output', default='bench_results.json', help="The JSON file of the results.")
+    parser.add_argument('--compare', help="JSON results of a former run to compare with.")
+    parser.add_argument('--threshold', type=float, default=0.2, help="The slowdown that counts as a regression.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[28, 100, 500], help="The sizes of the rosters.")
+    parser.add_argument('--density', type=float, default=0.4, help="The availability density of the rosters.")
+    parser.add_argument('--number', type=int, default=50, help="The number of calls of each timing.")
+    parser.add_argument('--seed', type=int, default=0, help="The seed of the rosters.")
+    args = parser.parse_args()
+
+    results = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'parameters': {'sizes': args.sizes, 'density': args.density, 'number': args.number, 'seed': args.seed},
+        'timings': {'shift': bench_shift()},
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            department, pipeline = bench_pipeline(size, directory, args.density, args.seed)
+            timings = bench_department(department, args.number)
+            timings.update(pipeline)
+            results['timings'][f'guards_{size}'] = timings
+
+    for group, timings in results['timings'].items():
+        print(group)
+        for name, value in timings.items():
+            print(f"  {name:<28}{value:>14.2f} us")
+
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2)
+    print(f"Results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
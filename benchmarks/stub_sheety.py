@@ -0,0 +1,83 @@
+"""
+A local stand-in of the Sheety API, for running the client and the department without Google sheets.
+GET on any path returns the availability data, PUT on /<row> stores the JSON body of the row.
+It can answer the first requests with 503 and delay every response, to check the retries and the concurrency.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubSheety:
+    """ Local HTTP server that imitates the Sheety GET and PUT endpoints."""
+
+    def __init__(self, data, fail_first=0, delay=0.0):
+        """
+        :param data: The JSON data returned on GET
+        :param fail_first: The number of requests answered with 503 before the server works
+        :param delay: The delay of each response in seconds
+        """
+        self.data = data
+        self.fail_first = fail_first
+        self.delay = delay
+        self.rows = {}  # The JSON bodies of the PUT requests by row number
+        self.requests = []  # (method, path) of each request
+        self.__lock = threading.Lock()
+        self.__server = ThreadingHTTPServer(('127.0.0.1', 0), self.__make_handler())
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        """ The base URL of the server."""
+        return f"http://127.0.0.1:{self.__server.server_address[1]}"
+
+    def __enter__(self):
+        self.__thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def __should_fail(self, method, path):
+        """ Record the request and return True if it should be answered with 503."""
+        with self.__lock:
+            self.requests.append((method, path))
+            if self.fail_first > 0:
+                self.fail_first -= 1
+                return True
+        return False
+
+    def __make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status, body):
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                time.sleep(stub.delay)
+                if stub._StubSheety__should_fail('GET', self.path):
+                    return self.reply(503, {'error': 'unavailable'})
+                self.reply(200, stub.data)
+
+            def do_PUT(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                time.sleep(stub.delay)
+                if stub._StubSheety__should_fail('PUT', self.path):
+                    return self.reply(503, {'error': 'unavailable'})
+                row = int(self.path.rstrip('/').rsplit('/', 1)[-1])
+                with stub._StubSheety__lock:
+                    stub.rows[row] = body
+                self.reply(200, body)
+
+        return Handler
@@ -0,0 +1,136 @@
+"""
+Synthetic rosters for the benchmarks.
+Makes 'employee_data.csv' shaped rosters and Sheety shaped availability data,
+so a SecurityDepartment can be built without the Google sheets API.
+Run from the project root to write a roster and its availability into files:
+python benchmarks/synthetic.py <guards> <output directory> [density] [seed]
+"""
+import csv
+import json
+import os
+import random
+import sys
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from SecurityDepartment import SecurityDepartment  # noqa: E402
+from SheetyClient import SheetyClient  # noqa: E402
+
+DAYS = ['ראשון', 'שני', 'שלישי', 'רביעי', 'חמישי', 'שישי', 'שבת']
+SHIFTS = ['בוקר', 'צהריים', 'לילה']
+CSV_COLUMNS = ['eID', 'E_Name', 'Is_Officer', 'Has_Height', 'Can_Drive', 'Shabat_Night', 'Shabat_Count',
+               'Nights_Count']
+
+
+def make_roster(num_guards, officer_ratio=0.2, driver_ratio=0.6, height_ratio=0.6, seed=0):
+    """
+    Make the rows of a roster CSV file.
+    :param num_guards: The number of guards in the roster
+    :param officer_ratio: The part of the guards that are officers
+    :param driver_ratio: The part of the guards that have a driving approval
+    :param height_ratio: The part of the guards that have a height permission
+    :param seed: The seed of the roster
+    :return: List of dictionaries, one per guard, with the columns of 'employee_data.csv'
+    """
+    rng = random.Random(seed)
+    rows = []
+    for i in range(num_guards):
+        is_officer = rng.random() < officer_ratio
+        rows.append({
+            'eID': 10000 + i,
+            'E_Name': f'guard {i}',
+            'Is_Officer': int(is_officer),
+            # Officers have drive permission and height permission
+            'Has_Height': int(is_officer or rng.random() < height_ratio),
+            'Can_Drive': int(is_officer or rng.random() < driver_ratio),
+            'Shabat_Night': int(rng.random() < 0.1),
+            'Shabat_Count': rng.randint(0, 3),
+            'Nights_Count': 0
+        })
+    return rows
+
+
+def write_roster_csv(rows, path):
+    """ Write the roster rows into a CSV file in the format of 'employee_data.csv'."""
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def make_availability(rows, density=0.5, seed=0):
+    """
+    Make the Sheety data of the availability sheet of a roster.
+    The first row is the title and the last row is the summary row, like in the sheets document.
+    :param rows: The roster rows from 'make_roster'
+    :param density: The chance of a guard to mark each shift
+    :param seed: The seed of the availability
+    :return: Dictionary in the format of the Sheety GET response
+    """
+    rng = random.Random(seed)
+    columns = [day + shift for day in DAYS for shift in SHIFTS]
+
+    title = {'שם': 'שם'}
+    title.update({column: column for column in columns})
+    title['משמרות'] = 'משמרות'
+    title['id'] = 2
+    sheet = [title]
+
+    for row in rows:
+        line = {'שם': row['E_Name']}
+        line.update({column: 'X' if rng.random() < density else '' for column in columns})
+        line['משמרות'] = rng.randint(3, 6)
+        line['id'] = len(sheet) + 2
+        sheet.append(line)
+
+    summary = {'שם': ''}
+    summary.update({column: '' for column in columns})
+    summary['משמרות'] = ''
+    summary['id'] = len(sheet) + 2
+    sheet.append(summary)
+    return {'security': sheet}
+
+
+def make_department(num_guards, directory, density=0.5, seed=0, **ratios):
+    """
+    Make a SecurityDepartment of a synthetic roster.
+    :param num_guards: The number of guards in the roster
+    :param directory: The directory to write the roster CSV file into
+    :param density: The chance of a guard to mark each shift
+    :param seed: The seed of the roster and the availability
+    :param ratios: The officer_ratio, driver_ratio and height_ratio of 'make_roster'
+    :return: SecurityDepartment object
+    """
+    rows = make_roster(num_guards, seed=seed, **ratios)
+    path = os.path.join(directory, f'roster_{num_guards}_{seed}.csv')
+    write_roster_csv(rows, path)
+    return SecurityDepartment(data=make_availability(rows, density, seed), csv_file_path=path)
+
+
+def offline_fetch(data):
+    """
+    Fixture that replaces the Sheety GET of the department with the given data, so the department is built
+    through its normal fetch path without the network.
+    Use as a context manager: with offline_fetch(data): SecurityDepartment(...)
+    """
+    return mock.patch.object(SheetyClient, 'fetch', return_value=data)
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(__doc__)
+        return
+    num_guards, directory = int(sys.argv[1]), sys.argv[2]
+    density = float(sys.argv[3]) if len(sys.argv) > 3 else 0.5
+    seed = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+
+    os.makedirs(directory, exist_ok=True)
+    rows = make_roster(num_guards, seed=seed)
+    write_roster_csv(rows, os.path.join(directory, 'employee_data.csv'))
+    with open(os.path.join(directory, 'availability.json'), 'w', encoding='utf-8') as file:
+        json.dump(make_availability(rows, density, seed), file, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,58 +1,368 @@
 from SecurityDepartment import SecurityDepartment
+from ExactSolver import ExactSolver
+from ResultCache import ResultCache
+from Instrumentation import Instrumentation
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import heapq
+import json
+import multiprocessing
 import time
+import os
 
+# The department of a worker process, set once by '_init_worker' so it's not sent with every restart
+_worker_department = None
 
-def get_optimal(department: SecurityDepartment):
+
+def calculate_accuracy(emp_shortness_amount, warnings_amount):
+    """
+    Calculate the accuracy scores of an arrangement.
+    :param emp_shortness_amount: The total number of employees that are short from all the week
+    :param warnings_amount: The number of warnings from the week
+    :return: Tuple of the two accuracy scores, rounded to 3 digits
+    """
+    accuracy_1 = 1 - (emp_shortness_amount / 100)
+    accuracy_2 = (21 - warnings_amount) / 21
+    return round(accuracy_1, 3), round(accuracy_2, 3)
+
+
+def run_arrangement(department: SecurityDepartment, seed=None, render=True):
+    """
+    Reset the department and run the work arrangement once.
+    :param department: object from type SecurityDepartment
+    :param seed: The seed of the run, the same seed gives the same arrangement. None for a random run
+    :param render: True to prepare the arrangement to be posted, False to calculate only the scores
+    :return: The arrangement (only when render is True), the amount of employees that are short
+    and the number of warnings
+    """
+    # Reset the data structure and count the shifts
+    department.reset_data_structure()
+    department.count_shifts()
+    department.set_seed(seed)
+
+    # Do the work arrangement, return the arrangement, the amount of employees that are short,
+    # and the number of warnings
+    if not render:
+        return department.do_work_arrangement(render=False)[:2]
+    return department.do_work_arrangement()
+
+
+def search_optimal(department: SecurityDepartment, runs=50, time_budget=None, stall_limit=None, top_k=5):
+    """
+    Anytime search of the optimal arrangement, runs the work arrangement until one of the stop conditions:
+    1. 'runs' runs were done.
+    2. The time budget is over.
+    3. No improvement in the last 'stall_limit' runs.
+    4. An arrangement reached the best scores possible ('score_lower_bound').
+    The search keeps snapshots of the top_k distinct arrangements and the scores over time.
+    :param department: object from type SecurityDepartment
+    :param runs: The maximum number of runs, None for no limit
+    :param time_budget: The maximum time of the search in seconds, None for no limit
+    :param stall_limit: The maximum number of runs without improvement, None for no limit
+    :param top_k: The number of arrangements to keep
+    :return: Dictionary with:
+        'top' - list of (emp_shortness_amount, warnings_amount, state), best first.
+        'trace' - list of (seconds, run, emp_shortness_amount, warnings_amount) of each improvement.
+        'runs' - the number of runs.
+        'stop' - the reason the search stopped.
     """
-    This function will run the work arrangement N times and return the optimal arrangement
+    if runs is None and time_budget is None and stall_limit is None:
+        raise ValueError("At least one of runs, time_budget and stall_limit must be set.")
+
+    start = time.perf_counter()
+    bound = department.score_lower_bound()
+
+    # Heap of the top arrangements, the worst on top: (-penalty, -run, fingerprint, shortness, warnings, state)
+    top = []
+    fingerprints = set()
+    trace = []
+    best_penalty = None
+    last_improvement = 0
+    run = 0
+    stop = 'runs'
+
+    while runs is None or run < runs:
+        if time_budget is not None and time.perf_counter() - start >= time_budget:
+            stop = 'time_budget'
+            break
+        if stall_limit is not None and run - last_improvement >= stall_limit:
+            stop = 'stall_limit'
+            break
+
+        emp_shortness_amount, warnings_amount = run_arrangement(department, render=False)
+        penalty = department.SHORTNESS_WEIGHT * emp_shortness_amount + department.WARNING_WEIGHT * warnings_amount
+        department.instrumentation.record_score(penalty)
+        run += 1
+
+        if best_penalty is None or penalty < best_penalty:
+            best_penalty = penalty
+            last_improvement = run
+            trace.append((time.perf_counter() - start, run, emp_shortness_amount, warnings_amount))
+
+        # Keep the arrangement if it's one of the top ones and not already kept
+        if len(top) < top_k or -top[0][0] > penalty:
+            fingerprint = tuple(employee.get_shifts_mask() for employee in department.problem.guards)
+            if fingerprint not in fingerprints:
+                fingerprints.add(fingerprint)
+                heapq.heappush(top, (-penalty, -run, fingerprint, emp_shortness_amount, warnings_amount,
+                                     department.capture_state()))
+                if len(top) > top_k:
+                    fingerprints.discard(heapq.heappop(top)[2])
+
+        if (emp_shortness_amount, warnings_amount) == bound:
+            stop = 'bound'
+            break
+
+    top = [(entry[3], entry[4], entry[5]) for entry in sorted(top, reverse=True)]
+    return {'top': top, 'trace': trace, 'runs': run, 'stop': stop}
+
+
+def get_optimal(department: SecurityDepartment, runs=50, time_budget=None, stall_limit=None, trace_path=None):
+    """
+    This function will run the work arrangement up to N times and return the optimal arrangement.
+    Each run is only scored, a snapshot of the optimal run is restored and prepared to be posted once.
     :param department: object from type SecurityDepartment
+    :param runs: The maximum number of runs, None for no limit
+    :param time_budget: The maximum time of the search in seconds, None for no limit
+    :param stall_limit: The maximum number of runs without improvement, None for no limit
+    :param trace_path: Path of a JSON file to save the scores over time of the search, None to not save them
     :return: dictionary of the optimal arrangement
     """
-    # Dictionary to store arrangements and their accuracy scores
-    optimal = {}
+    result = search_optimal(department, runs, time_budget, stall_limit, top_k=1)
+
+    if trace_path is not None:
+        with open(trace_path, 'w') as file:
+            json.dump({'runs': result['runs'], 'stop': result['stop'],
+                       'trace': [dict(zip(('seconds', 'run', 'shortness', 'warnings'), x)) for x in result['trace']]},
+                      file, indent=2)
+
+    emp_shortness_amount, warnings_amount, state = result['top'][0]
+    print(result['runs'], result['stop'])  # Debugging Purpose
+    print(calculate_accuracy(emp_shortness_amount, warnings_amount))  # Debugging Purpose
+
+    # Restore the optimal arrangement and prepare it to be posted
+    department.restore_state(state)
+    with department.instrumentation.phase('render'):
+        return department.ready_arrangment()[0]
+
+
+def get_optimal_batch(department: SecurityDepartment, restarts=1000, seed=0):
+    """
+    Run the greedy 'restarts' times in lockstep with the NumPy engine and return the optimal arrangement.
+    All the runs are scored at once, only the optimal run is written into the department and improved by the
+    local search.
+    :param department: object from type SecurityDepartment
+    :param restarts: The number of runs of the greedy
+    :param seed: The seed of the batch
+    :return: The optimal arrangement and the index of its run in the batch
+    """
+    engine = department.get_vector_engine()
+    department.reset_data_structure()
+    batch = engine.do_batch(restarts, seed)
+    with department.instrumentation.phase('score'):
+        emp_shortness_amount, warnings_amount = engine.score_batch(batch)
+
+    # The lowest penalty wins, on a tie the first run wins
+    penalty = department.SHORTNESS_WEIGHT * emp_shortness_amount + department.WARNING_WEIGHT * warnings_amount
+    best_run = int(penalty.argmin())
+    if department.instrumentation.enabled:
+        for value in penalty.tolist():
+            department.instrumentation.record_score(value)
+    print(calculate_accuracy(int(emp_shortness_amount[best_run]), int(warnings_amount[best_run])),
+          best_run)  # Debugging Purpose
+
+    # Write the optimal run into the department and improve it like the other runs
+    department.reset_data_structure()
+    engine.load_run(batch, best_run)
+    department.set_seed(seed)
+    department.optimize_assignment()
+    with department.instrumentation.phase('render'):
+        return department.ready_arrangment()[0], best_run
+
+
+def worker_context():
+    """
+    The multiprocessing context of the pools that are started while other threads run (BatchRunner, the
+    SchedulerService). A fork could copy a lock a thread holds (of SQLite, of a connection pool) into a worker,
+    so the workers are started by a fork server, or spawned where there is none. Like on Windows, the script
+    that starts the pool needs the "if __name__ == '__main__'" guard.
+    """
+    return multiprocessing.get_context('forkserver' if 'forkserver' in multiprocessing.get_all_start_methods()
+                                       else 'spawn')
+
 
-    # Run the work arrangement N times and store the optimal arrangement
-    for i in range(50):
-        # Reset the data structure and count the shifts
-        department.reset_data_structure()
-        department.count_shifts()
+def _init_worker(department: SecurityDepartment):
+    """ Keep the department of the worker process, it's sent once per worker and not once per restart."""
+    global _worker_department
+    _worker_department = department
 
-        # Do the work arrangement, return the arrangement, the amount of employees that are short,
-        # and the number of warnings
-        arrangement, emp_shortness_amount, warnings_amount = department.do_work_arrangement()
 
-        # Calculate the accuracy of the arrangement
-        accuracy_1 = 1 - (emp_shortness_amount / 100)
-        accuracy_2 = (21 - warnings_amount) / 21
+def _run_seed(seed):
+    """
+    Run one restart in a worker process.
+    :return: The seed and the accuracy scores of the arrangement, the arrangement itself stays in the worker
+    """
+    emp_shortness_amount, warnings_amount = run_arrangement(_worker_department, seed, render=False)
+    return seed, calculate_accuracy(emp_shortness_amount, warnings_amount)
 
-        # If the accuracy score is already in the dictionary, skip the arrangement
-        if (round(accuracy_1, 3), round(accuracy_2, 3)) in optimal.keys():
-            continue
 
-        # Store the arrangement and its accuracy
-        optimal[round(accuracy_1, 3), round(accuracy_2, 3)] = arrangement
+def get_optimal_parallel(department: SecurityDepartment, restarts=500, workers=None, base_seed=0):
+    """
+    Run the work arrangement 'restarts' times over a pool of worker processes and return the optimal arrangement.
+    Restart number i runs with the seed base_seed + i, the workers return only the seed and the accuracy scores
+    and the winning arrangement is rebuilt here from its seed.
+    :param department: object from type SecurityDepartment
+    :param restarts: The number of runs of the work arrangement
+    :param workers: The number of worker processes, None for the number of CPUs
+    :param base_seed: The seed of the first run
+    :return: The optimal arrangement and its seed
+    """
+    seeds = range(base_seed, base_seed + restarts)
+    workers = workers or os.cpu_count()
+
+    # Send the seeds in chunks to reduce the inter process traffic
+    chunksize = max(1, restarts // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(department,)) as executor:
+        results = list(executor.map(_run_seed, seeds, chunksize=chunksize))
 
-    print(optimal.keys())  # Debugging Purpose
-    # Get the arrangement with the highest accuracy score
-    max_key = max(optimal.keys(), key=lambda x: x[0] + x[1])
-    print(max_key)  # Debugging Purpose
+    # The highest accuracy score wins, on a tie the lowest seed wins so the result doesn't depend on the workers
+    best_seed, best_accuracy = max(results, key=lambda x: (x[1][0] + x[1][1], -x[0]))
+    print(best_accuracy, best_seed)  # Debugging Purpose
 
-    # Return the optimal arrangement
-    return optimal[max_key]
+    # Rebuild the winning arrangement from its seed
+    arrangement, _, _ = run_arrangement(department, best_seed)
+    return arrangement, best_seed
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Make the weekly work arrangement of the security department.")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Run the restarts over a pool of worker processes, 0 for the number of CPUs.")
+    parser.add_argument('--restarts', type=int, default=500, help="The number of restarts of the parallel mode.")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="The seed of the first restart of the parallel mode, or the seed of the batch.")
+    parser.add_argument('--exact', action='store_true', help="Use the exact solver instead of the greedy restarts.")
+    parser.add_argument('--time-limit', type=float, default=10.0, help="The time limit of the exact solver.")
+    parser.add_argument('--runs', type=int, default=50, help="The maximum number of runs of the greedy search.")
+    parser.add_argument('--time-budget', type=float, default=None, help="The time budget of the greedy search.")
+    parser.add_argument('--stall-limit', type=int, default=None,
+                        help="Stop the greedy search after this number of runs without improvement.")
+    parser.add_argument('--trace', default=None, help="Save the scores over time of the greedy search to a JSON file.")
+    parser.add_argument('--batch', type=int, default=None,
+                        help="Run this number of greedy restarts in lockstep with the NumPy engine.")
+    parser.add_argument('--engine', choices=['object', 'numpy'], default='object',
+                        help="The engine of the greedy, 'numpy' is experimental, see bench_vector_engine.")
+    parser.add_argument('--slot-order', choices=['static', 'dynamic'], default='static',
+                        help="The order of the shifts in the greedy, 'dynamic' for the most constrained shift first.")
+    parser.add_argument('--manifest', default=None,
+                        help="Schedule all the departments of a manifest file, see BatchRunner.")
+    parser.add_argument('--report', default=None,
+                        help="Save the reports of the departments of the manifest to a JSON file.")
+    parser.add_argument('--serve', type=int, default=None,
+                        help="Run the scheduler service on this local port, see SchedulerService.")
+    parser.add_argument('--refresh-interval', type=float, default=None,
+                        help="Refresh the availability of the service every this number of seconds.")
+    parser.add_argument('--instrument', default=None,
+                        help="Save the timings of the phases, the rejections of the greedy and the scores of the "
+                             "runs to a JSON file.")
+    parser.add_argument('--profile', default=None, help="Save a cProfile of the run to a stats file.")
+    parser.add_argument('--posted-state', default=None,
+                        help="JSON file of the rows posted last, only the rows that changed since then are posted.")
+    parser.add_argument('--cache', default=None,
+                        help="Directory of the result cache, unchanged inputs take the arrangement from it.")
+    parser.add_argument('--cache-max-entries', type=int, default=64, help="The maximum entries of the cache.")
+    parser.add_argument('--cache-max-age', type=float, default=168.0,
+                        help="The maximum age of an entry of the cache in hours.")
+    args = parser.parse_args()
+
     # Start the timer
     start_time = time.time()
 
-    # Create a SecurityDepartment object
-    security_department = SecurityDepartment()
+    if args.manifest is not None:
+        # Load, solve and post all the departments of the manifest, the workers solve the departments
+        from BatchRunner import BatchRunner, print_reports
+        reports = BatchRunner.from_file(args.manifest, runs=args.runs, workers=args.workers or None).run()
+        print_reports(reports)
+        if args.report is not None:
+            with open(args.report, 'w', encoding='utf-8') as report_file:
+                json.dump(reports, report_file, ensure_ascii=False, indent=2)
+
+    elif args.serve is not None:
+        # Keep the department in memory and answer the requests until the service is stopped
+        from SchedulerService import SchedulerService
+        security_department = SecurityDepartment()
+        security_department.ENGINE = args.engine
+        security_department.SLOT_ORDER = args.slot_order
+        security_department.client.state_path = args.posted_state
+        service = SchedulerService(security_department, workers=args.workers or None,
+                                   refresh_interval=args.refresh_interval,
+                                   port=args.serve)
+        print("Serving on", service.url)
+        try:
+            service.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+    else:
+        # The measurements of the run, only when asked for
+        instrumentation = None
+        if args.instrument is not None or args.profile is not None:
+            instrumentation = Instrumentation(profile_path=args.profile)
+            instrumentation.start_profile()
+
+        # Create a SecurityDepartment object
+        security_department = SecurityDepartment(instrumentation=instrumentation)
+        security_department.ENGINE = args.engine
+        security_department.SLOT_ORDER = args.slot_order
+        security_department.client.state_path = args.posted_state
+
+        # Look for the arrangement of the same inputs in the cache
+        cache = cache_key = cached = None
+        if args.cache is not None:
+            cache = ResultCache(args.cache, max_entries=args.cache_max_entries, max_age=args.cache_max_age * 3600)
+            params = {name: getattr(args, name) for name in ('exact', 'time_limit', 'runs', 'time_budget',
+                                                             'stall_limit', 'batch', 'restarts', 'seed')}
+            params['parallel'] = args.workers is not None
+            cache_key = ResultCache.key(security_department, params)
+            cached = cache.get(cache_key)
+
+        # Get the optimal arrangement from N possible arrangements
+        with security_department.instrumentation.phase('solve'):
+            if cached is not None:
+                optimal_arrangement = cached['updates']
+                print("Cache Hit: ", cache_key[:12], calculate_accuracy(cached['shortness'], cached['warnings']))
+            elif args.exact:
+                exact_solver = ExactSolver(time_limit=args.time_limit)
+                optimal_arrangement, _, _ = exact_solver.solve(security_department)
+                print(exact_solver.status, exact_solver.get_gap())  # Debugging Purpose
+            elif args.batch is not None:
+                optimal_arrangement, _ = get_optimal_batch(security_department, args.batch, args.seed)
+            elif args.workers is None:
+                optimal_arrangement = get_optimal(security_department, args.runs, args.time_budget, args.stall_limit,
+                                                  args.trace)
+            else:
+                optimal_arrangement, optimal_seed = get_optimal_parallel(security_department, args.restarts,
+                                                                         args.workers or None, args.seed)
+                print("Optimal Seed: ", optimal_seed)
+
+        if cache is not None and cached is None:
+            cache.put(cache_key, optimal_arrangement, *security_department.score_arrangement()[:2])
 
-    # Get the optimal arrangement from N possible arrangements
-    optimal_arrangement = get_optimal(security_department)
+        # Post the optimal arrangement, unless the same arrangement was already posted
+        if cached is not None and cached['posted']:
+            print("The arrangement was already posted")
+        elif security_department.post_arrangement(optimal_arrangement) and cache is not None:
+            cache.mark_posted(cache_key)
+        print("Posting: ", security_department.client.savings)  # Debugging Purpose
 
-    # Post the optimal arrangement
-    security_department.post_arrangement(optimal_arrangement)
+        if instrumentation is not None:
+            instrumentation.stop_profile()
+            if args.instrument is not None:
+                # The rejections are counted only by the greedy of the engine, not by the batch or the exact solver
+                solver = 'exact' if args.exact else 'batch' if args.batch is not None else args.engine
+                instrumentation.save(args.instrument, solver=solver, cached=cached is not None,
+                                     requests=security_department.client.metrics,
+                                     posting=security_department.client.savings)
 
     # End the timer
     end_time = time.time()